@@ -1,20 +1,63 @@
 # handsfree/__main__.py
+import argparse
 import logging
 import sys
 import threading
-import time
-import re
 
 from .config import load_config
-from .hotkey import GlobalHotkeyListener, DoubleTapListener, parse_single_key
-from .recorder import Recorder
-from .transcriber import transcribe_audio
-from . import utils
-from .gui import HandsfreeGUI
+from .dispatch import KeyEventDispatcher
+from .startup import HotkeyGate, StartupProfile
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m handsfree")
+    parser.add_argument(
+        "--startup-profile", action="store_true",
+        help="print how long each startup phase took and what it imported",
+    )
+    parser.add_argument(
+        "--headless", action="store_true",
+        help="run without window, tray icon and global hotkeys, controlled through the control socket (see `ctl`)",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    transcribe_parser = subparsers.add_parser(
+        "transcribe",
+        help="transcribe saved recordings and print one JSON line per file",
+    )
+    transcribe_parser.add_argument("paths", nargs="+", help="WAV/FLAC/Ogg files or directories (searched recursively)")
+    transcribe_parser.add_argument("-j", "--workers", type=int, help="concurrent requests / CLI processes")
+    transcribe_parser.add_argument("-o", "--output", help="write JSONL here instead of stdout")
+
+    archive_parser = subparsers.add_parser(
+        "archive",
+        help="list or search the recording archive (SAVE_RECORDINGS), or export a recording",
+    )
+    archive_parser.add_argument("-n", "--limit", type=int, default=20, help="number of recordings to list")
+    archive_parser.add_argument("-s", "--search", help="only recordings whose transcript contains this text")
+    archive_parser.add_argument(
+        "--export", nargs=2, metavar=("ID", "WAV"), help="write recording ID as a WAV file"
+    )
+
+    ctl_parser = subparsers.add_parser(
+        "ctl",
+        help="send a command to the running instance over the control socket",
+    )
+    ctl_parser.add_argument(
+        "action", help="start, stop, toggle, cancel, retype, status, last, stats or quit (headless only)"
+    )
+    ctl_parser.add_argument("--json", action="store_true", help="print the raw JSON reply for `last` too")
+    ctl_parser.add_argument("--timeout", type=float, default=5.0, help="seconds to wait for the reply")
+
+    return parser.parse_args(argv)
+
 
 def main():
+    args = parse_args()
+    profile = StartupProfile()
+
     # 1. Load config from .env
-    config = load_config()
+    with profile.phase("load config"):
+        config = load_config()
 
     # 2. Logging setup
     logging.basicConfig(
@@ -22,111 +65,89 @@ def main():
         format="%(asctime)s:%(levelname)s:%(name)s:%(message)s"
     )
     logger = logging.getLogger("handsfree")
+
+    if args.command == "transcribe":
+        from . import batch
+
+        sys.exit(batch.run_command(args, config))
+    if args.command == "archive":
+        from . import archive
+
+        sys.exit(archive.run_command(args, config))
+    if args.command == "ctl":
+        from . import control
+
+        sys.exit(control.run_command(args, config))
+
     logger.info("Starting handsfree application...")
 
-    # 3. Initialize Recorder
-    recorder = Recorder(max_seconds=config["MAX_RECORD_SECONDS"])
-    recorder.save_recordings = config["SAVE_RECORDINGS"]
-
-    is_recording = False
-
-    # 4. Create GUI (Tk + optional tray icon on Linux)
-    gui = HandsfreeGUI()
-    gui.set_status("IDLE")
-
-    # 5. Callback for global hotkey (start/stop recording)
-    def on_hotkey_triggered():
-        nonlocal is_recording
-
-        if not is_recording:
-            logger.debug("Hotkey pressed -> START recording.")
-            utils.play_sound(config["SOUND_START"])
-            recorder.start_recording()
-            is_recording = True
-            gui.set_status("RECORDING")
-        else:
-            logger.debug("Hotkey pressed -> STOP recording.")
-            audio_data = recorder.stop_recording()
-            utils.play_sound(config["SOUND_STOP"])
-            is_recording = False
-            gui.set_status("PROCESSING")
-
-            def worker():
-                try:
-                    # 1. Call transcriber
-                    transcription = transcribe_audio(
-                        audio_data,
-                        whisper_url=config["WHISPER_URL"],
-                        api_key=config["API_KEY"],
-                        model=config["WHISPER_MODEL"],
-                        language=config["WHISPER_LANGUAGE"],
-                        mode=config["WHISPER_MODE"],
-                        cli_command=config["WHISPER_CLI_COMMAND"],
-                        cli_args=config["WHISPER_CLI_ARGS"]
-                    )
-
-                    # 2. Post-process the text
-                    transcription = transcription.strip()
-                    if config["REPLACE_ALL_WHITESPACE_WITH_SPACE"]:
-                        transcription = re.sub(r"\s+", " ", transcription)
-
-                    logger.debug(f"Final transcription after transformations: '{transcription}'")
-
-                    # 3. Optional delay
-                    delay = config["TYPE_START_DELAY"]
-                    if delay > 0:
-                        logger.debug(f"Sleeping {delay}s before typing text.")
-                        time.sleep(delay)
-
-                    # 4. Type the text
-                    utils.type_text(transcription)
-
-                except Exception as e:
-                    # If something goes wrong, log it
-                    logger.exception(f"Transcription worker error: {e}")
-
-                finally:
-                    # Always go back to IDLE, even if there's an error
-                    gui.set_status("IDLE")
-
-            # Run the worker in a separate thread
-            threading.Thread(target=worker, daemon=True).start()
-
-    # 6. Start the input listener in a thread (double-tap if configured,
-    #    otherwise the legacy KEYBOARD_SHORTCUT combo).
-    if config["DOUBLE_PRESS_WINDOW_MS"] > 0:
-        listener = DoubleTapListener(
-            on_activate=on_hotkey_triggered,
-            key=parse_single_key(config["DOUBLE_PRESS_KEY"]),
-            window_ms=config["DOUBLE_PRESS_WINDOW_MS"],
-        )
-        logger.info(
-            "Trigger: double-tap %s within %d ms.",
-            config["DOUBLE_PRESS_KEY"], config["DOUBLE_PRESS_WINDOW_MS"],
-        )
-    else:
-        listener = GlobalHotkeyListener(
-            shortcut=config["KEYBOARD_SHORTCUT"],
-            on_activate=on_hotkey_triggered,
-        )
-        logger.info("Trigger: keyboard shortcut %s.", config["KEYBOARD_SHORTCUT"])
-    hotkey_thread = threading.Thread(target=listener.start, daemon=True)
-    hotkey_thread.start()
-
-    # 7. Clean shutdown callback
-    def on_close():
-        logger.info("Exiting handsfree...")
-        if is_recording:
-            recorder.stop_recording()
-        recorder.terminate()
-        listener.stop()
-        gui.close()
-        sys.exit(0)
-
-    gui.set_on_close_callback(on_close)
-
-    # 8. Run the GUI main loop
-    gui.run()
+    # 3. Arm the hotkey before anything heavy is loaded; presses that arrive
+    #    while the application is still starting are replayed afterwards.
+    #    The listener threads only queue key events; the dispatcher runs them.
+    #    Headless mode has no hotkeys (nor Tk/GTK) and is driven by the socket.
+    gate = None
+    if not args.headless:
+        gate = HotkeyGate()
+        dispatcher = KeyEventDispatcher()
+        with profile.phase("hotkey listener"):
+            from .hotkey import create_listeners
+
+            listeners = create_listeners(
+                config,
+                gate.bind("on_hotkey_triggered"),
+                on_retype=gate.bind("on_retype"),
+                on_cancel=gate.bind("on_cancel"),
+                dispatcher=dispatcher,
+            )
+            for listener in listeners:
+                threading.Thread(target=listener.start, daemon=True).start()
+        profile.mark("hotkey armed")
+
+    # 4. Backends, GUI, job queue
+    with profile.phase("import application"):
+        from .app import HandsfreeApp
+    with profile.phase("application init"):
+        gui = None
+        if args.headless:
+            from .headless import HeadlessGUI
+
+            gui = HeadlessGUI()
+        app = HandsfreeApp(config, gui=gui)
+    if gate:
+        app.listeners = listeners
+        app.dispatcher = dispatcher
+        gate.open(app)
+
+    # The control socket is always on when headless, optional with the GUI
+    socket_path = config["CONTROL_SOCKET"]
+    if args.headless and not socket_path:
+        from .control import default_socket_path
+
+        socket_path = default_socket_path()
+    if socket_path:
+        try:
+            with profile.phase("control socket"):
+                app.start_control(socket_path, on_quit=gui.request_close if args.headless else None)
+        except OSError as e:
+            logger.error(f"Cannot open the control socket {socket_path}: {e}")
+            if args.headless:
+                app.shutdown()
+                sys.exit(1)
+    profile.mark("application ready")
+
+    # 5. Audio devices and codecs load in the background
+    def warm_up():
+        try:
+            with profile.phase("warm-up (audio devices, codecs)"):
+                app.warm_up()
+        except Exception as e:
+            logger.exception(f"Warm-up failed (will retry on first use): {e}")
+        if args.startup_profile:
+            profile.report()
+
+    threading.Thread(target=warm_up, daemon=True).start()
+
+    app.run(hotkeys=not args.headless)
 
 if __name__ == "__main__":
     main()
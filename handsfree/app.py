@@ -0,0 +1,682 @@
+# handsfree/app.py
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import sys
+import threading
+import time
+
+from .recorder import Recorder
+from .transcriber import (
+    TranscriptionError, clean_transcription, close_transports, finish_streamed_upload, get_transport,
+    open_streamed_upload, stream_transcription, transcribe_audio, transcribe_cli_async,
+)
+from .router import Backend, TranscriptionRouter, parse_endpoints
+from .cache import TranscriptionCache, cache_key
+from .metrics import DictationTrace, LatencyMetrics
+from .injection import TextInjector
+from .postprocess import PostProcessor
+from .cues import CuePlayer
+from .archive import RecordingArchive
+from .chunking import ChunkedTranscriber
+from .eventloop import EventLoop
+from .dispatch import KeyEventDispatcher
+from .jobs import JobQueue
+from .streaming import DeltaCleaner, PauseSegmenter, SegmentPipeline
+from .whisper_server import WhisperServer
+from . import codec
+
+logger = logging.getLogger("handsfree")
+
+
+class HandsfreeApp:
+    """
+    The dictation pipeline: hotkey -> Recorder -> transcription backend -> typed text.
+    Recorder, GUI and the text typer can be injected (benchmarks and tests replace
+    them with fakes); everything else is built from the config dict.
+
+    The recording state machine runs on an asyncio EventLoop: the hotkey
+    callbacks only hand the transition over to it, so transitions never race
+    and are applied in the order the keys were pressed.
+    """
+
+    def __init__(self, config, recorder=None, gui=None, type_text=None):
+        self.config = config
+        self.loop = EventLoop()
+        # Held while a start/stop/cancel transition awaits the recorder
+        self._transition = asyncio.Lock()
+        # Running CLI transcriptions (concurrent futures), killed by on_cancel
+        self._cli_runs = set()
+        self.injector = TextInjector(
+            method=config["TYPE_METHOD"],
+            paste_threshold=config["TYPE_PASTE_THRESHOLD"],
+            key_delay_ms=config["TYPE_KEY_DELAY_MS"],
+            paste_keys=config["TYPE_PASTE_KEYS"],
+            clipboard_restore_delay=config["TYPE_CLIPBOARD_RESTORE_DELAY"],
+        )
+        self.type_text = type_text or self.injector.type_text
+
+        # 1. Recorder
+        self.recorder = recorder or Recorder(max_seconds=config["MAX_RECORD_SECONDS"])
+        self._configure_recorder()
+
+        # Start/stop cues, decoded once and played through the recorder's PyAudio
+        self.cues = CuePlayer(self.recorder.audio_interface)
+        self.cues.load("start", config["SOUND_START"])
+        self.cues.load("stop", config["SOUND_STOP"])
+
+        # 2. Transcription backend(s)
+        self.mode = config["WHISPER_MODE"]
+        self.whisper_server = None
+        self._transport_keys = []
+        self._whisper_url = config["WHISPER_URL"]
+        self._setup_backend()
+        self.chunker = None
+        if config["CHUNKED_TRANSCRIPTION"]:
+            # Long recordings: concurrent ~30 s chunks instead of one serial request
+            self.chunker = ChunkedTranscriber(
+                self._transcribe_request,
+                fan_out=config["CHUNK_FAN_OUT"],
+                chunk_seconds=config["CHUNK_SECONDS"],
+                overlap_seconds=config["CHUNK_OVERLAP_SECONDS"],
+            )
+        self.streaming_response = config["STREAMING_RESPONSE"] and self.mode in ("api", "server")
+        if config["STREAMING_RESPONSE"] and not self.streaming_response:
+            logger.warning(f"STREAMING_RESPONSE is only supported in api and server mode, not {self.mode}.")
+        self.streaming_upload = config["STREAMING_UPLOAD"] and self.mode in ("api", "server")
+        if config["STREAMING_UPLOAD"] and not self.streaming_upload:
+            logger.warning(f"STREAMING_UPLOAD is only supported in api and server mode, not {self.mode}.")
+        self.transports = [get_transport(url, api_key) for url, api_key in self._transport_keys]
+        for transport in self.transports:
+            transport.start_keepalive(config["WHISPER_KEEPALIVE_SECONDS"])
+
+        self.cache = None
+        if config["CACHE_ENABLED"]:
+            self.cache = TranscriptionCache(
+                config["CACHE_DIR"],
+                max_bytes=config["CACHE_MAX_MB"] * 1024 * 1024,
+                memory_entries=config["CACHE_MEMORY_ENTRIES"],
+            )
+
+        self.archive = None
+        if config["SAVE_RECORDINGS"]:
+            self.archive = RecordingArchive(
+                config["ARCHIVE_DIR"],
+                fmt=config["ARCHIVE_FORMAT"],
+                max_bytes=config["ARCHIVE_MAX_MB"] * 1024 * 1024,
+                max_days=config["ARCHIVE_MAX_DAYS"],
+            )
+
+        # Replacement rules, compiled once and reloaded when the file changes
+        self.postprocessor = PostProcessor(
+            config["REPLACEMENTS_FILE"], collapse_whitespace=config["REPLACE_ALL_WHITESPACE_WITH_SPACE"]
+        )
+
+        self.metrics = LatencyMetrics(
+            config["METRICS_FILE"], fmt=config["METRICS_FORMAT"], window=config["METRICS_WINDOW"]
+        )
+
+        self.jobs = JobQueue(
+            self._process_job,
+            self._deliver_job,
+            workers=config["JOB_WORKERS"],
+            coalesce=config["JOB_COALESCE"],
+            coalesce_max_seconds=config["JOB_COALESCE_MAX_SECONDS"],
+            on_idle=self._on_jobs_idle,
+            loop=self.loop,
+        )
+
+        self.is_recording = False
+        self.pipeline = None
+        # StreamingUpload of the running recording (STREAMING_UPLOAD)
+        self.upload_stream = None
+        self.last_transcription = ""
+        self.listeners = []
+        self.dispatcher = None
+        self.control = None
+
+        # 3. GUI (Tk + optional tray icon on Linux)
+        if gui is None:
+            from .gui import HandsfreeGUI
+            gui = HandsfreeGUI()
+        self.gui = gui
+        self.gui.set_status("IDLE")
+
+    def _configure_recorder(self):
+        config = self.config
+        recorder = self.recorder
+        recorder.upload_format = config["UPLOAD_FORMAT"]
+        recorder.capture_mode = config["CAPTURE_MODE"]
+        recorder.always_open = config["MIC_ALWAYS_OPEN"]
+        recorder.preroll_ms = config["MIC_PREROLL_MS"]
+        if config["STREAMING_TRANSCRIPTION"]:
+            recorder.segmenter = PauseSegmenter(
+                rate=recorder.rate,
+                chunk=recorder.chunk,
+                silence_threshold=config["STREAMING_SILENCE_THRESHOLD"],
+                min_pause_ms=config["STREAMING_MIN_PAUSE_MS"],
+                min_segment_seconds=config["STREAMING_MIN_SEGMENT_SECONDS"],
+            )
+            logger.info("Streaming transcription enabled (segments cut at pauses).")
+
+    def _setup_backend(self):
+        config = self.config
+        mode = self.mode
+
+        # Resident whisper.cpp server: load the model once, keep it in memory
+        whisper_url = config["WHISPER_URL"]
+        if mode == "server" or (mode == "router" and config["ROUTER_LOCAL"] == "server"):
+            self.whisper_server = WhisperServer(
+                command=config["WHISPER_SERVER_COMMAND"],
+                args=config["WHISPER_SERVER_ARGS"],
+                port=config["WHISPER_SERVER_PORT"],
+            )
+            self.whisper_server.start()
+            if mode == "server":
+                whisper_url = self._whisper_url = self.whisper_server.url
+
+        common_args = dict(
+            language=config["WHISPER_LANGUAGE"],
+            cli_command=config["WHISPER_CLI_COMMAND"],
+            cli_args=config["WHISPER_CLI_ARGS"]
+        )
+        if mode == "router":
+            # Several backends: fastest healthy one first, hedged on slow answers
+            backends = []
+            for url, model, api_key in parse_endpoints(
+                config["ROUTER_ENDPOINTS"], config["WHISPER_MODEL"], config["API_KEY"]
+            ):
+                backends.append(Backend(url, functools.partial(
+                    transcribe_audio, whisper_url=url, api_key=api_key, model=model,
+                    mode="api", raise_errors=True, **common_args
+                )))
+                self._transport_keys.append((url, api_key))
+            if config["ROUTER_LOCAL"] == "cli":
+                backends.append(Backend("cli", functools.partial(
+                    transcribe_audio, whisper_url="", api_key="", mode="cli",
+                    raise_errors=True, **common_args
+                )))
+            elif self.whisper_server:
+                backends.append(Backend("server", functools.partial(
+                    transcribe_audio, whisper_url=self.whisper_server.url, api_key="", mode="server",
+                    raise_errors=True, **common_args
+                )))
+            self.router = TranscriptionRouter(
+                backends,
+                hedge_factor=config["ROUTER_HEDGE_FACTOR"],
+                hedge_min_seconds=config["ROUTER_HEDGE_MIN_SECONDS"],
+                cooldown=config["ROUTER_COOLDOWN_SECONDS"],
+            )
+            logger.info(f"Routing between {len(backends)} backends: {', '.join(b.name for b in backends)}.")
+            self._transcribe_request = self.router.transcribe
+        elif mode == "cli":
+            self._transcribe_request = self._transcribe_cli
+        else:
+            self._transcribe_request = functools.partial(
+                transcribe_audio,
+                whisper_url=whisper_url,
+                api_key=config["API_KEY"],
+                model=config["WHISPER_MODEL"],
+                mode=mode,
+                **common_args
+            )
+            if mode in ("api", "server"):
+                self._transport_keys.append((whisper_url, config["API_KEY"]))
+
+    def transcribe(self, audio_data, upload=None, trace=None, on_delta=None):
+        """
+        Preprocess (silence trimming), consult the cache and call the backend.
+        :param trace: optional DictationTrace receiving the stage timings
+        :param on_delta: if given, request streamed output and pass each raw text
+                         delta to it as it arrives (not called on a cache hit)
+        :return: recognized text (str)
+        """
+        config = self.config
+        trace = trace or DictationTrace(None)
+        reencode = False
+        if config["VAD_TRIM"]:
+            from .vad import trim_silence
+
+            with trace.span("vad"):
+                trimmed = trim_silence(
+                    audio_data,
+                    threshold=config["VAD_THRESHOLD"],
+                    padding_ms=config["VAD_PADDING_MS"],
+                    max_pause_ms=config["VAD_MAX_PAUSE_MS"],
+                )
+            if trimmed is None:
+                logger.info("No speech detected, skipping transcription.")
+                return ""
+            if trimmed is not audio_data:
+                audio_data = trimmed
+                # The incrementally encoded copy no longer matches the audio
+                reencode, upload = bool(upload), None
+        key = None
+        if self.cache:
+            with trace.span("cache"):
+                key = cache_key(audio_data, config["WHISPER_MODEL"], config["WHISPER_LANGUAGE"], self.mode)
+                cached = self.cache.get(key)
+            logger.debug(f"Transcription cache: {self.cache.stats()}")
+            if cached is not None:
+                logger.info(f"Transcription (cache) result: {cached}")
+                return cached
+        if reencode:
+            with trace.span("encode"):
+                upload = codec.encode_wav(audio_data, self.recorder.upload_format)
+        if self.mode == "server":
+            with trace.span("server_wait"):
+                ready = self.whisper_server.wait_ready(timeout=config["WHISPER_SERVER_STARTUP_TIMEOUT"])
+            if not ready:
+                logger.error("Whisper server is not ready, cannot transcribe.")
+                return ""
+        chunked = not on_delta and self.chunker and self.chunker.should_split(audio_data)
+        # Single HTTP request: split it into connect/upload/inference. The
+        # timings come back with this request, not from the shared transport.
+        timings = {}
+        with trace.span("transcribe"):
+            if on_delta:
+                transcription = self._stream_request(audio_data, upload, on_delta, timings)
+            elif chunked:
+                transcription = self.chunker.transcribe(audio_data, upload=upload)
+            elif self.mode in ("api", "server"):
+                transcription = self._transcribe_request(audio_data, upload=upload, timings=timings)
+            else:
+                transcription = self._transcribe_request(audio_data, upload=upload)
+        if timings:
+            trace.add("connect", timings["connect"])
+            trace.add("upload", timings["upload"])
+            trace.add("inference", timings["server"])
+        if self.cache and transcription:
+            self.cache.put(key, transcription)
+        return transcription
+
+    def _transcribe_cli(self, audio_data, upload=None):
+        """
+        CLI mode, called on a job worker thread. The whisper process runs on the
+        event loop, so on_cancel and WHISPER_CLI_TIMEOUT can kill it.
+        """
+        config = self.config
+        future = self.loop.submit(transcribe_cli_async(
+            audio_data,
+            cli_command=config["WHISPER_CLI_COMMAND"],
+            cli_args=config["WHISPER_CLI_ARGS"],
+            timeout=config["WHISPER_CLI_TIMEOUT"],
+        ))
+        self._cli_runs.add(future)
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError:
+            logger.info("Whisper CLI run cancelled.")
+            return ""
+        except TranscriptionError as e:
+            logger.exception(f"CLI transcription failed: {e}")
+            return ""
+        finally:
+            self._cli_runs.discard(future)
+
+    def _stream_request(self, audio_data, upload, on_delta, timings=None):
+        config = self.config
+        parts = []
+        try:
+            for delta in stream_transcription(
+                audio_data,
+                self._whisper_url,
+                config["API_KEY"] if self.mode == "api" else "",
+                model=config["WHISPER_MODEL"],
+                language=config["WHISPER_LANGUAGE"],
+                # whisper.cpp only decodes WAV unless built with ffmpeg
+                upload=upload if self.mode == "api" else None,
+                timings=timings,
+            ):
+                parts.append(delta)
+                on_delta(delta)
+        except TranscriptionError as e:
+            # Whatever arrived before the failure has already been typed
+            logger.exception(f"Streaming transcription failed: {e}")
+        transcription = clean_transcription("".join(parts))
+        logger.info(f"Transcription (API, streamed) result: {transcription}")
+        return transcription
+
+    def _finish_streamed(self, job):
+        """
+        Wait for the answer to a recording uploaded while it was made; if that
+        request failed, send the finished recording the usual way.
+        """
+        trace = job.trace
+        try:
+            with trace.span("transcribe"):
+                transcription = finish_streamed_upload(job.streamed)
+        except TranscriptionError as e:
+            logger.warning(f"{e} - sending the whole recording instead.")
+            return self.transcribe(job.audio_data, upload=job.upload, trace=trace)
+        trace.add("upload", job.streamed.timings["upload"])
+        trace.add("inference", job.streamed.timings["server"])
+        return transcription
+
+    def _type_delay(self, trace):
+        delay = self.config["TYPE_START_DELAY"]
+        if delay > 0:
+            logger.debug(f"Sleeping {delay}s before typing text.")
+            with trace.span("type_delay"):
+                time.sleep(delay)
+
+    def on_hotkey_triggered(self):
+        """
+        Callback for the global hotkey (any thread): start/stop recording.
+        :return: concurrent.futures.Future, done once the transition is applied
+        """
+        return self.loop.call(self._toggle_recording)
+
+    def on_start(self):
+        """
+        Start recording unless already recording (any thread).
+        :return: concurrent.futures.Future, done once the transition is applied
+        """
+        return self.loop.call(self._set_recording, True)
+
+    def on_stop(self):
+        """
+        Stop recording, if recording (any thread).
+        :return: concurrent.futures.Future
+        """
+        return self.loop.call(self._set_recording, False)
+
+    async def _set_recording(self, recording):
+        async with self._transition:
+            if recording and not self.is_recording:
+                await self._start_recording()
+            elif not recording and self.is_recording:
+                await self._stop_recording()
+
+    async def _toggle_recording(self):
+        async with self._transition:
+            if not self.is_recording:
+                await self._start_recording()
+            else:
+                await self._stop_recording()
+
+    async def _start_recording(self):
+        config = self.config
+        logger.debug("Hotkey pressed -> START recording.")
+        on_segment = on_audio = None
+        if self.recorder.segmenter:
+            self.pipeline = SegmentPipeline(self.transcribe)
+            on_segment = self.pipeline.submit
+        elif self.streaming_upload:
+            # The request itself opens the connection, no prewarm needed
+            self.upload_stream = self._open_upload_stream()
+            on_audio = self.upload_stream.write
+        if config["WHISPER_PREWARM"] and not on_audio:
+            for transport in self.transports:
+                transport.prewarm()
+        self.cues.play("start")
+        # Keep the start cue, as heard by the microphone, out of the recording
+        mute = self.cues.duration("start") if config["SOUND_MUTE_START_CUE"] else 0.0
+        try:
+            await self.loop.run_blocking(self.recorder.start_recording, on_segment, mute, on_audio)
+        except Exception:
+            self._abort_upload_stream()
+            raise
+        self.is_recording = True
+        self.gui.set_status("RECORDING")
+
+    async def _stop_recording(self):
+        logger.debug("Hotkey pressed -> STOP recording.")
+        trace = self.metrics.start_dictation()
+        audio_data = await self.loop.run_blocking(self.recorder.stop_recording)
+        if audio_data is None:
+            # The recorder wasn't running (a recording it stopped by itself at
+            # MAX_RECORD_SECONDS is still returned): nothing to archive or transcribe
+            logger.warning("No recording to stop; nothing to transcribe.")
+            self.is_recording = False
+            if self.pipeline:
+                self.pipeline.cancel()
+                self.pipeline = None
+            self._abort_upload_stream()
+            if not self.jobs.busy():
+                self.gui.set_status("IDLE")
+            return
+        for stage, seconds in self.recorder.last_timings.items():
+            trace.add(stage, seconds)
+        upload = self.recorder.last_upload
+        self.cues.play("stop")
+        self.is_recording = False
+        self.gui.set_status("PROCESSING")
+        segments, self.pipeline = self.pipeline, None
+        streamed, self.upload_stream = self.upload_stream, None
+        # Compressed and saved by the archive's writer thread
+        archive_id = self.archive.add(audio_data, upload) if self.archive else None
+
+        # Transcribed on the job pool, typed in order by the delivery thread
+        self.jobs.submit(
+            audio_data, upload=upload, segments=segments, trace=trace, archive_id=archive_id, streamed=streamed
+        )
+
+    def _open_upload_stream(self):
+        config = self.config
+        recorder = self.recorder
+        return open_streamed_upload(
+            self._whisper_url,
+            config["API_KEY"] if self.mode == "api" else "",
+            model=config["WHISPER_MODEL"],
+            language=config["WHISPER_LANGUAGE"],
+            channels=recorder.channels,
+            sample_width=2,  # the recorder captures paInt16
+            rate=recorder.rate,
+        )
+
+    def _abort_upload_stream(self):
+        if self.upload_stream:
+            self.upload_stream.abort()
+            self.upload_stream = None
+
+    def on_cancel(self):
+        """
+        Callback for the cancel shortcut (any thread): discard the current
+        recording and every dictation that hasn't been typed yet.
+        :return: concurrent.futures.Future
+        """
+        return self.loop.call(self._cancel)
+
+    async def _cancel(self):
+        logger.debug("Cancel shortcut pressed.")
+        async with self._transition:
+            await self._discard_recording()
+            for future in list(self._cli_runs):
+                future.cancel()
+            if not self.jobs.cancel_all():
+                self.gui.set_status("IDLE")
+
+    async def _discard_recording(self):
+        if not self.is_recording:
+            return
+        await self.loop.run_blocking(self.recorder.stop_recording)
+        self.is_recording = False
+        if self.pipeline:
+            self.pipeline.cancel()
+            self.pipeline = None
+        self._abort_upload_stream()
+        logger.info("Recording discarded.")
+
+    def _on_jobs_idle(self):
+        if not self.is_recording:
+            self.gui.set_status("IDLE")
+
+    def _process_job(self, job):
+        """
+        Transcribe one job (runs on a job worker thread).
+        :return: post-processed text
+        """
+        config = self.config
+        trace = job.trace
+        try:
+            trace.audio_seconds = job.audio_seconds()
+        except ValueError:
+            pass
+
+        # Streamed response: type each cleaned delta as soon as it arrives,
+        # once every earlier dictation has been typed
+        on_delta = None
+        if self.streaming_response and not job.segments:
+            cleaner = DeltaCleaner(collapse_whitespace=config["REPLACE_ALL_WHITESPACE_WITH_SPACE"])
+
+            def on_delta(delta):
+                text = cleaner.feed(delta)
+                if not text or job.cancelled:
+                    return
+                if not job.typed:
+                    if not self.jobs.wait_turn(job):
+                        return
+                    trace.add("first_text", trace.elapsed())
+                    self._type_delay(trace)
+                with trace.span("type"):
+                    self.type_text(text)
+                job.typed = True
+
+        # 1. Call transcriber (in streaming mode only the tail is
+        #    still pending; earlier segments are already done)
+        if job.segments:
+            with trace.span("transcribe"):
+                transcription = job.segments.finish()
+        elif job.streamed:
+            transcription = self._finish_streamed(job)
+        else:
+            transcription = self.transcribe(job.audio_data, upload=job.upload, trace=trace, on_delta=on_delta)
+
+        # 2. Post-process the text
+        with trace.span("postprocess"):
+            transcription = self.postprocessor.process(transcription)
+
+        logger.debug(f"Final transcription after transformations: '{transcription}'")
+        return transcription
+
+    def _deliver_job(self, job, transcription):
+        """
+        Type one job's text (runs on the delivery thread, in dictation order).
+        """
+        config = self.config
+        trace = job.trace
+        try:
+            if transcription:
+                self.last_transcription = transcription
+
+            if job.typed:
+                logger.debug("Text was already typed while streaming.")
+                return
+
+            # 3. Optional delay
+            self._type_delay(trace)
+
+            # 4. Type the text
+            with trace.span("type"):
+                self.type_text(transcription)
+
+        finally:
+            self.metrics.record(trace)
+            if config["METRICS_IN_GUI"]:
+                self.gui.set_metrics(self.metrics.status_line())
+            for archive_id in job.archive_ids:
+                self.archive.update(
+                    archive_id, transcript=transcription, backend=self.mode, latency=trace.spans["total"]
+                )
+
+    def on_retype(self):
+        """
+        Type the last result again, without the backend (any thread).
+        :return: concurrent.futures.Future
+        """
+        return self.loop.call(self._retype)
+
+    async def _retype(self):
+        logger.debug("Retype shortcut -> typing last transcription again.")
+        delay = self.config["TYPE_START_DELAY"]
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.loop.run_blocking(self.type_text, self.last_transcription)
+
+    def start_listeners(self):
+        """
+        Start the input listeners (see hotkey.create_listeners), each in a thread,
+        with their callbacks run by a KeyEventDispatcher.
+        """
+        from .hotkey import create_listeners
+
+        self.dispatcher = KeyEventDispatcher()
+        self.listeners = create_listeners(
+            self.config, self.on_hotkey_triggered, on_retype=self.on_retype, on_cancel=self.on_cancel,
+            dispatcher=self.dispatcher,
+        )
+        for listener in self.listeners:
+            threading.Thread(target=listener.start, daemon=True).start()
+
+    def start_control(self, path, on_quit=None):
+        """
+        Serve the control socket (see control.ControlServer) on the event loop.
+        :param on_quit: callable for the quit command (None: not supported)
+        :raise OSError: if the socket can't be created or is in use
+        """
+        from .control import ControlServer
+
+        control = ControlServer(self, path, on_quit=on_quit)
+        control.start()
+        self.control = control
+
+    def warm_up(self):
+        """
+        Load what the first dictation needs ahead of time, off the main thread:
+        the audio system (slow device probing), the cue output stream, the upload
+        encoder and numpy.
+        """
+        config = self.config
+        self.recorder.warm_up()
+        self.cues.warm_up()
+        if config["UPLOAD_FORMAT"] != "wav":
+            codec.create_encoder(config["UPLOAD_FORMAT"], self.recorder.rate, self.recorder.channels)
+        if config["VAD_TRIM"]:
+            from . import vad  # noqa: F401 (numpy)
+
+    def shutdown(self):
+        """
+        Stop recording and release the audio device, backends and listeners.
+        """
+        # No new key events while everything else is torn down
+        for listener in self.listeners:
+            listener.stop()
+        if self.dispatcher:
+            self.dispatcher.close()
+        if self.control:
+            self.control.close()
+        try:
+            self.loop.call(self._discard_recording).result(timeout=5)
+        except (concurrent.futures.TimeoutError, RuntimeError) as e:
+            logger.warning(f"Could not stop the recording cleanly: {e!r}")
+        self.jobs.close()
+        if self.chunker:
+            self.chunker.close()
+        self.loop.close()
+        self.cues.close()
+        if self.archive:
+            self.archive.close()
+        self.recorder.terminate()
+        self.injector.close()
+        close_transports()
+        if self.whisper_server:
+            self.whisper_server.stop()
+
+    def on_close(self):
+        logger.info("Exiting handsfree...")
+        self.shutdown()
+        self.gui.close()
+        sys.exit(0)
+
+    def run(self, hotkeys=True):
+        """
+        :param hotkeys: start the global hotkey listeners if not started yet
+                        (headless mode is driven through the control socket)
+        """
+        if hotkeys and not self.listeners:
+            self.start_listeners()
+        self.gui.set_on_close_callback(self.on_close)
+        # Run the GUI main loop
+        self.gui.run()
@@ -0,0 +1,262 @@
+# handsfree/archive.py
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from . import codec
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    duration REAL NOT NULL,
+    file TEXT NOT NULL,
+    format TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    backend TEXT,
+    latency REAL,
+    transcript TEXT
+);
+CREATE INDEX IF NOT EXISTS recordings_created ON recordings (created);
+"""
+
+
+class RecordingArchive:
+    """
+    Saved recordings (SAVE_RECORDINGS): compressed audio files in `directory`
+    plus a SQLite index of timestamp, duration, backend, latency and transcript.
+    - files and index rows are written by one background thread, so saving
+      costs the stop path only a queue put,
+    - recordings older than `max_days` and the oldest ones beyond `max_bytes`
+      are evicted after every write (0 = no limit).
+    """
+
+    def __init__(self, directory, fmt="flac", max_bytes=0, max_days=0):
+        self.directory = os.path.expanduser(directory)
+        if fmt not in codec.FORMATS:
+            logger.warning(f"Unknown archive format {fmt!r}, using WAV.")
+            fmt = "wav"
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        self.max_days = max_days
+        self.index_path = os.path.join(self.directory, INDEX_NAME)
+
+        os.makedirs(self.directory, exist_ok=True)
+        with self._index() as db:
+            # WAL: lookups don't wait for the writer
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def _connect(self):
+        db = sqlite3.connect(self.index_path, timeout=10)
+        db.row_factory = sqlite3.Row
+        return db
+
+    @contextmanager
+    def _index(self):
+        # One short-lived connection per lookup: sqlite3 connections are per thread
+        db = self._connect()
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _submit(self, item):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="handsfree-archive", daemon=True)
+                self._thread.start()
+        self._queue.put(item)
+
+    def add(self, wav_data, upload=None):
+        """
+        Queue a finished recording for saving.
+        :param upload: the recorder's compressed copy; reused if it is already
+                       in the archive format
+        :return: recording id, for `update`
+        """
+        created = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(created))
+        recording_id = f"{stamp}-{int(created * 1000) % 1000:03d}-{uuid.uuid4().hex[:6]}"
+        self._submit(("add", recording_id, created, wav_data, upload))
+        return recording_id
+
+    def update(self, recording_id, transcript=None, backend=None, latency=None):
+        """
+        Queue the transcription result of a recording added earlier.
+        """
+        self._submit(("update", recording_id, transcript, backend, latency))
+
+    def flush(self):
+        """
+        Wait until everything queued so far has been written.
+        """
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self, timeout=5):
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _run(self):
+        db = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                try:
+                    if item is None:
+                        return
+                    if item[0] == "add":
+                        self._write(db, *item[1:])
+                    else:
+                        self._update(db, *item[1:])
+                    db.commit()
+                except Exception as e:
+                    # One bad item must not end the writer thread (and block flush())
+                    logger.exception(f"Cannot archive recording {item[1]}: {e}")
+                    db.rollback()
+                finally:
+                    self._queue.task_done()
+        finally:
+            db.close()
+
+    def _encode(self, wav_data, upload):
+        """
+        :return: (format, bytes) to store
+        """
+        filename = codec.FORMATS[self.fmt][0]
+        if self.fmt == "wav":
+            return "wav", wav_data
+        if upload and upload[0] == filename:
+            return self.fmt, upload[1]
+        encoded = codec.encode_wav(wav_data, self.fmt)
+        if encoded is None:
+            return "wav", wav_data
+        return self.fmt, encoded[1]
+
+    def _write(self, db, recording_id, created, wav_data, upload):
+        channels, sample_width, rate, pcm = codec.parse_wav(wav_data)
+        duration = len(pcm) / float(rate * channels * sample_width)
+        fmt, data = self._encode(wav_data, upload)
+        filename = recording_id + os.path.splitext(codec.FORMATS[fmt][0])[1]
+        with open(os.path.join(self.directory, filename), "wb") as f:
+            f.write(data)
+        db.execute(
+            "INSERT INTO recordings (id, created, duration, file, format, bytes) VALUES (?, ?, ?, ?, ?, ?)",
+            (recording_id, created, duration, filename, fmt, len(data)),
+        )
+        logger.debug(f"Archived {duration:.1f}s recording as {filename} ({len(data)} bytes).")
+        self._evict(db)
+
+    def _update(self, db, recording_id, transcript, backend, latency):
+        db.execute(
+            "UPDATE recordings SET transcript = ?, backend = ?, latency = ? WHERE id = ?",
+            (transcript, backend, latency, recording_id),
+        )
+
+    def _evict(self, db):
+        if self.max_days:
+            cutoff = time.time() - self.max_days * 86400
+            self._delete(db, db.execute("SELECT id, file FROM recordings WHERE created < ?", (cutoff,)).fetchall())
+        if self.max_bytes:
+            excess = db.execute("SELECT COALESCE(SUM(bytes), 0) FROM recordings").fetchone()[0] - self.max_bytes
+            oldest = []
+            for row in db.execute("SELECT id, file, bytes FROM recordings ORDER BY created, rowid"):
+                if excess <= 0:
+                    break
+                oldest.append(row)
+                excess -= row["bytes"]
+            self._delete(db, oldest)
+
+    def _delete(self, db, rows):
+        for row in rows:
+            try:
+                os.remove(os.path.join(self.directory, row["file"]))
+            except FileNotFoundError:
+                pass
+            db.execute("DELETE FROM recordings WHERE id = ?", (row["id"],))
+            logger.debug(f"Evicted archived recording {row['id']}.")
+
+    def get(self, recording_id):
+        """
+        :return: dict with the index row of a recording, or None
+        """
+        with self._index() as db:
+            row = db.execute("SELECT * FROM recordings WHERE id = ?", (recording_id,)).fetchone()
+        return dict(row) if row else None
+
+    def recent(self, limit=20, search=None):
+        """
+        :param search: only recordings whose transcript contains this text
+        :return: index rows (dicts), newest first
+        """
+        query = "SELECT * FROM recordings"
+        params = []
+        if search:
+            query += " WHERE transcript LIKE ?"
+            params.append(f"%{search}%")
+        query += " ORDER BY created DESC, rowid DESC LIMIT ?"
+        params.append(limit)
+        with self._index() as db:
+            return [dict(row) for row in db.execute(query, params)]
+
+    def path(self, recording_id):
+        row = self.get(recording_id)
+        return os.path.join(self.directory, row["file"]) if row else None
+
+    def load_wav(self, recording_id):
+        """
+        :return: the recording as WAV bytes (decoded if compressed), for replay
+                 or re-transcription
+        :raise KeyError: if there is no such recording
+        """
+        row = self.get(recording_id)
+        if row is None:
+            raise KeyError(recording_id)
+        with open(os.path.join(self.directory, row["file"]), "rb") as f:
+            data = f.read()
+        return data if row["format"] == "wav" else codec.decode_to_wav(data)
+
+
+def run_command(args, config):
+    """
+    `python -m handsfree archive`: list or search saved recordings, or export one as WAV.
+    :return: process exit code
+    """
+    archive = RecordingArchive(config["ARCHIVE_DIR"], fmt=config["ARCHIVE_FORMAT"])
+    if args.export:
+        recording_id, out_path = args.export
+        try:
+            wav_data = archive.load_wav(recording_id)
+        except KeyError:
+            logger.error(f"No archived recording {recording_id!r}.")
+            return 1
+        with open(out_path, "wb") as f:
+            f.write(wav_data)
+        return 0
+
+    for row in archive.recent(limit=args.limit, search=args.search):
+        created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["created"]))
+        latency = f"{row['latency']:.2f}s" if row["latency"] is not None else "-"
+        print(
+            f"{row['id']}  {created}  {row['duration']:6.1f}s  {row['backend'] or '-':<7} "
+            f"{latency:>7}  {row['transcript'] or ''}"
+        )
+    return 0
@@ -0,0 +1,178 @@
+# handsfree/batch.py
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from .codec import decode_to_wav, parse_wav
+from .postprocess import PostProcessor
+from .transcriber import TranscriptionError, transcribe_audio
+
+logger = logging.getLogger(__name__)
+
+# WAV plus the compressed formats of the recording archive
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg")
+
+
+def collect_files(paths):
+    """
+    Expand files and directories (recursively) into a sorted list of audio files.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(
+                    os.path.join(root, name) for name in names
+                    if name.lower().endswith(AUDIO_EXTENSIONS)
+                )
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def transcribe_file(path, transcribe_kwargs, postprocessor=None):
+    """
+    Transcribe one saved recording. Runs in a worker thread or process, so it
+    never raises: errors are reported in the result.
+    :param postprocessor: optional PostProcessor applied to the text
+    :return: dict with file, text, duration, elapsed and error
+    """
+    result = {"file": path, "text": "", "duration": 0.0, "elapsed": 0.0, "error": None}
+    start = time.monotonic()
+    try:
+        with open(path, "rb") as f:
+            audio_data = f.read()
+        if not path.lower().endswith(".wav"):
+            audio_data = decode_to_wav(audio_data)
+        channels, sample_width, rate, pcm = parse_wav(audio_data)
+        result["duration"] = len(pcm) / float(rate * channels * sample_width)
+        text = transcribe_audio(audio_data, raise_errors=True, **transcribe_kwargs)
+        if postprocessor:
+            text = postprocessor.process(text)
+        result["text"] = text
+    except (OSError, ValueError, TranscriptionError) as e:
+        result["error"] = str(e)
+    result["elapsed"] = time.monotonic() - start
+    return result
+
+
+def run_batch(files, transcribe_kwargs, workers=4, use_processes=False, postprocessor=None, out=None):
+    """
+    Transcribe `files` on a bounded pool and write one JSON line per file, in
+    completion order, as soon as each result is ready.
+    :return: summary dict (files, failed, audio_seconds, wall_seconds, ...)
+    """
+    out = out or sys.stdout
+    pool_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    pending = set()
+    queued = iter(files)
+    failed = 0
+    audio_seconds = 0.0
+    start = time.monotonic()
+
+    with pool_cls(max_workers=workers) as pool:
+        def fill():
+            # Keep at most 2 jobs per worker in flight instead of queueing everything
+            while len(pending) < 2 * workers:
+                path = next(queued, None)
+                if path is None:
+                    return
+                pending.add(pool.submit(transcribe_file, path, transcribe_kwargs, postprocessor))
+
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                result = future.result()
+                if result["error"]:
+                    failed += 1
+                audio_seconds += result["duration"]
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+            fill()
+
+    wall_seconds = time.monotonic() - start
+    return {
+        "files": len(files),
+        "failed": failed,
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall_seconds,
+        "files_per_second": len(files) / wall_seconds if wall_seconds else 0.0,
+        "realtime_speedup": audio_seconds / wall_seconds if wall_seconds else 0.0,
+    }
+
+
+def run_command(args, config):
+    """
+    `python -m handsfree transcribe <files/dirs>`: batch-transcribe saved recordings.
+    :return: process exit code
+    """
+    mode = config["WHISPER_MODE"]
+    if mode not in ("api", "cli", "server"):
+        logger.error(f"Batch transcription supports WHISPER_MODE=api, cli or server, not {mode!r}.")
+        return 2
+
+    files = collect_files(args.paths)
+    if not files:
+        logger.error("No audio files found.")
+        return 1
+
+    transcribe_kwargs = dict(
+        whisper_url=config["WHISPER_URL"],
+        api_key=config["API_KEY"],
+        model=config["WHISPER_MODEL"],
+        language=config["WHISPER_LANGUAGE"],
+        mode=mode,
+        cli_command=config["WHISPER_CLI_COMMAND"],
+        cli_args=config["WHISPER_CLI_ARGS"],
+    )
+    # The API and the server are I/O bound (threads); each CLI run is its own
+    # heavy process, so a small process pool keeps the machine busy without thrashing
+    workers = args.workers or (2 if mode == "cli" else 8)
+
+    whisper_server = None
+    if mode == "server":
+        from .whisper_server import WhisperServer
+
+        whisper_server = WhisperServer(
+            command=config["WHISPER_SERVER_COMMAND"],
+            args=config["WHISPER_SERVER_ARGS"],
+            port=config["WHISPER_SERVER_PORT"],
+        )
+        whisper_server.start()
+        if not whisper_server.wait_ready(timeout=config["WHISPER_SERVER_STARTUP_TIMEOUT"]):
+            whisper_server.stop()
+            logger.error("Whisper server did not become ready.")
+            return 1
+        transcribe_kwargs["whisper_url"] = whisper_server.url
+
+    logger.info(f"Transcribing {len(files)} files with {workers} workers ({mode} mode).")
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        summary = run_batch(
+            files,
+            transcribe_kwargs,
+            workers=workers,
+            use_processes=(mode == "cli"),
+            postprocessor=PostProcessor(
+                config["REPLACEMENTS_FILE"], collapse_whitespace=config["REPLACE_ALL_WHITESPACE_WITH_SPACE"]
+            ),
+            out=out,
+        )
+    finally:
+        if args.output:
+            out.close()
+        if whisper_server:
+            whisper_server.stop()
+
+    print(
+        f"{summary['files']} files ({summary['failed']} failed), "
+        f"{summary['audio_seconds']:.1f}s of audio in {summary['wall_seconds']:.1f}s: "
+        f"{summary['files_per_second']:.2f} files/s, {summary['realtime_speedup']:.1f}x real time",
+        file=sys.stderr,
+    )
+    return 1 if summary["failed"] else 0
@@ -0,0 +1,132 @@
+# handsfree/cache.py
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from .codec import parse_wav
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(audio_data, model, language, mode):
+    """
+    Content address of a transcription: SHA-256 of the PCM samples (the WAV
+    header is ignored) plus everything that changes the result.
+    """
+    _, _, _, pcm = parse_wav(audio_data)
+    digest = hashlib.sha256(pcm)
+    digest.update(f"\0{model}\0{language}\0{mode}".encode())
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """
+    Two-tier cache of transcriptions:
+    - an in-memory LRU of the most recent `memory_entries` results,
+    - an on-disk store (one small file per key) capped at `max_bytes`,
+      evicting the least recently used files first.
+    """
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, memory_entries=128):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.txt")
+
+    def _disk_entries(self):
+        """
+        :return: list of (path, size, mtime) of the stored transcriptions
+        """
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".txt"):
+                    st = entry.stat()
+                    entries.append((entry.path, st.st_size, st.st_mtime))
+        return entries
+
+    def _remember(self, key, text):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        :return: cached transcription, or None
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+            path = self._path(key)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    text = f.read()
+                os.utime(path)  # mark as recently used
+            except OSError:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, text)
+            return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._remember(key, text)
+            path = self._path(key)
+            data = text.encode("utf-8")
+            try:
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Cannot write transcription cache entry: {e}")
+                return
+            self._disk_bytes += len(data) - old_size
+            if self._disk_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._disk_entries(), key=lambda e: e[2])
+        self._disk_bytes = sum(size for _, size, _ in entries)
+        # Drop down to 90% so every put doesn't trigger another directory scan
+        target = self.max_bytes * 0.9
+        for path, size, _ in entries:
+            if self._disk_bytes <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._disk_bytes -= size
+            self._memory.pop(os.path.basename(path)[:-len(".txt")], None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
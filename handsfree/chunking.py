@@ -0,0 +1,140 @@
+# handsfree/chunking.py
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from . import codec
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 30
+
+# Words compared when removing text repeated at a chunk boundary
+MAX_OVERLAP_WORDS = 8
+
+
+def split_points(samples, rate, chunk_seconds=30.0, search_seconds=5.0):
+    """
+    Where to cut a long recording: for every ~`chunk_seconds` boundary, the
+    quietest frame in the `search_seconds` before it.
+    :param samples: int16 numpy array (mono)
+    :return: sample offsets of the cuts (empty if the audio fits one chunk)
+    """
+    from .vad import frame_rms
+
+    rms = frame_rms(samples, rate, FRAME_MS)
+    frame_len = max(1, int(rate * FRAME_MS / 1000))
+    chunk_frames = max(1, int(chunk_seconds * 1000 / FRAME_MS))
+    search_frames = min(chunk_frames - 1, int(search_seconds * 1000 / FRAME_MS))
+
+    cuts = []
+    start = 0
+    while len(rms) - start > chunk_frames:
+        lo = start + chunk_frames - search_frames
+        hi = start + chunk_frames
+        cut = lo + int(rms[lo:hi + 1].argmin())
+        cuts.append(cut * frame_len)
+        start = cut
+    return cuts
+
+
+def split_wav(wav_data, chunk_seconds=30.0, overlap_seconds=1.0, search_seconds=5.0):
+    """
+    Cut a recording at low-energy points into chunks of about `chunk_seconds`;
+    every chunk but the first starts `overlap_seconds` before its cut.
+    :return: list of WAV bytes (just `[wav_data]` for short or non-mono audio)
+    """
+    import numpy as np
+
+    channels, sample_width, rate, pcm = codec.parse_wav(wav_data)
+    if channels != 1 or sample_width != 2:
+        logger.debug("Chunking supports only 16-bit mono audio, sending the recording whole.")
+        return [wav_data]
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    cuts = split_points(samples, rate, chunk_seconds, search_seconds)
+    if not cuts:
+        return [wav_data]
+
+    overlap = int(overlap_seconds * rate)
+    bounds = [0] + cuts + [samples.size]
+    chunks = []
+    for i in range(len(bounds) - 1):
+        start = max(0, bounds[i] - overlap) if i else 0
+        chunk = samples[start:bounds[i + 1]].tobytes()
+        chunks.append(codec.wav_header(len(chunk), channels, sample_width, rate) + chunk)
+    return chunks
+
+
+def _normalize(word):
+    return re.sub(r"\W+", "", word.lower())
+
+
+def stitch(texts, max_overlap_words=MAX_OVERLAP_WORDS):
+    """
+    Join chunk transcriptions in order, dropping the words at the start of a
+    chunk that repeat the end of the previous one (the overlapping audio).
+    """
+    words = []
+    for text in texts:
+        new = text.split()
+        if words and new:
+            for n in range(min(max_overlap_words, len(words), len(new)), 0, -1):
+                if [_normalize(w) for w in words[-n:]] == [_normalize(w) for w in new[:n]]:
+                    new = new[n:]
+                    break
+        words.extend(new)
+    return " ".join(words)
+
+
+class ChunkedTranscriber:
+    """
+    Transcribes recordings longer than 1.5 x `chunk_seconds` as concurrent
+    chunks (at most `fan_out` requests in flight, shared by all recordings),
+    so a long dictation takes about as long as its slowest chunk.
+    """
+
+    def __init__(self, transcribe, fan_out=4, chunk_seconds=30.0, overlap_seconds=1.0):
+        """
+        :param transcribe: callable(audio_data, upload=None) -> text, for one chunk
+        """
+        self._transcribe = transcribe
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, fan_out), thread_name_prefix="handsfree-chunk")
+
+    def should_split(self, audio_data):
+        channels, sample_width, rate, pcm = codec.parse_wav(audio_data)
+        return len(pcm) / float(rate * channels * sample_width) > 1.5 * self.chunk_seconds
+
+    def _transcribe_chunk(self, index, wav_data, fmt):
+        upload = codec.encode_wav(wav_data, fmt) if fmt else None
+        text = self._transcribe(wav_data, upload=upload)
+        if not text:
+            logger.warning(f"Chunk {index + 1} returned no text.")
+        return text
+
+    def transcribe(self, audio_data, upload=None):
+        """
+        :param upload: compressed copy of the whole recording; the chunks are
+                       encoded in the same format
+        :return: stitched text
+        """
+        chunks = split_wav(
+            audio_data,
+            chunk_seconds=self.chunk_seconds,
+            overlap_seconds=self.overlap_seconds,
+            search_seconds=min(5.0, self.chunk_seconds / 4),
+        )
+        if len(chunks) == 1:
+            return self._transcribe(audio_data, upload=upload)
+        fmt = None
+        if upload:
+            fmt = next((name for name, spec in codec.FORMATS.items() if spec[0] == upload[0]), None)
+        logger.info(f"Transcribing the recording as {len(chunks)} concurrent chunks.")
+        futures = [
+            self._executor.submit(self._transcribe_chunk, i, chunk, fmt) for i, chunk in enumerate(chunks)
+        ]
+        return stitch(future.result() for future in futures)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
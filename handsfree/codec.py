@@ -0,0 +1,222 @@
+# handsfree/codec.py
+import io
+import logging
+import struct
+
+logger = logging.getLogger(__name__)
+
+# Imported on first use: soundfile pulls in numpy and libsndfile (~100 ms)
+soundfile = None
+_soundfile_checked = False
+
+
+def _load_soundfile():
+    """
+    :return: the soundfile module, or None if it isn't installed
+    """
+    global soundfile, _soundfile_checked
+    if not _soundfile_checked:
+        try:
+            import soundfile as module
+            soundfile = module
+        except ImportError:
+            pass
+        _soundfile_checked = True
+    return soundfile
+
+# format name -> (upload filename, content type, libsndfile (format, subtype))
+FORMATS = {
+    "wav": ("recording.wav", "audio/wav", None),
+    "flac": ("recording.flac", "audio/flac", ("FLAC", "PCM_16")),
+    "opus": ("recording.ogg", "audio/ogg", ("OGG", "OPUS")),
+}
+
+WAV_HEADER_SIZE = 44
+
+# Size placeholder for a WAV streamed before its length is known; readers
+# (libsndfile, ffmpeg, dr_wav) then read the data chunk to the end of the file
+WAV_UNKNOWN_SIZE = 0xFFFFFFFF
+
+
+def wav_header(data_size, channels, sample_width, rate):
+    """
+    Canonical 44-byte PCM WAV header for `data_size` bytes of samples
+    (None: unknown length, for a streamed upload).
+    """
+    block_align = channels * sample_width
+    if data_size is None:
+        riff_size = data_size = WAV_UNKNOWN_SIZE
+    else:
+        riff_size = 36 + data_size
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", riff_size, b"WAVE",
+        b"fmt ", 16, 1, channels, rate, rate * block_align, block_align, sample_width * 8,
+        b"data", data_size,
+    )
+
+
+def parse_wav(wav_data):
+    """
+    Read a PCM WAV without copying the samples.
+    :param wav_data: WAV bytes, bytearray or memoryview
+    :return: (channels, sample_width, rate, memoryview of the PCM data)
+    """
+    view = memoryview(wav_data).cast("B")
+    if bytes(view[:4]) != b"RIFF" or bytes(view[8:12]) != b"WAVE":
+        raise ValueError("Not a WAV file")
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(view):
+        chunk_id, chunk_size = struct.unpack_from("<4sI", view, pos)
+        pos += 8
+        if chunk_id == b"fmt ":
+            _, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", view, pos)
+            fmt = (channels, bits // 8, rate)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            # Streamed WAVs may carry a placeholder size; clamp to what's there
+            return fmt + (view[pos:min(len(view), pos + chunk_size)],)
+        pos += chunk_size + (chunk_size & 1)
+    raise ValueError("WAV file has no data chunk")
+
+
+class WavBuffer:
+    """
+    Growable in-memory WAV file. PCM is appended after a reserved header, the
+    header is filled in by `finish()`, and the result is handed out as a
+    memoryview, so the recording is never copied on the way to the consumers.
+    """
+
+    def __init__(self):
+        # bytearray over-allocates and grows in place with realloc, which keeps
+        # both the append cost and the peak memory close to the recording size
+        self._buf = bytearray(WAV_HEADER_SIZE)
+
+    def __len__(self):
+        """
+        Number of PCM bytes written so far.
+        """
+        return len(self._buf) - WAV_HEADER_SIZE
+
+    def write(self, data):
+        self._buf += data
+
+    def pcm(self, start=0, end=None):
+        """
+        Copy of the PCM between byte offsets `start` and `end` (safe to keep
+        while recording continues, unlike a view that would pin the buffer).
+        """
+        end = len(self) if end is None else end
+        return bytes(self._buf[WAV_HEADER_SIZE + start:WAV_HEADER_SIZE + end])
+
+    def finish(self, channels, sample_width, rate):
+        """
+        :return: memoryview of the complete WAV file; don't write to the buffer afterwards
+        """
+        self._buf[:WAV_HEADER_SIZE] = wav_header(len(self), channels, sample_width, rate)
+        return memoryview(self._buf)
+
+
+def join_wav(wav_files, gap_seconds=0.0):
+    """
+    Concatenate WAV recordings of the same format, with `gap_seconds` of
+    silence between them.
+    :return: memoryview of the joined WAV file
+    """
+    fmt = None
+    out = WavBuffer()
+    for i, wav_data in enumerate(wav_files):
+        channels, sample_width, rate, pcm = parse_wav(wav_data)
+        if fmt is None:
+            fmt = (channels, sample_width, rate)
+        elif fmt != (channels, sample_width, rate):
+            raise ValueError(f"Cannot join WAV {channels}ch/{sample_width * 8}bit/{rate}Hz with {fmt}")
+        if i:
+            out.write(bytes(int(gap_seconds * rate) * channels * sample_width))
+        out.write(pcm)
+    if fmt is None:
+        raise ValueError("Nothing to join")
+    return out.finish(*fmt)
+
+
+class StreamEncoder:
+    """
+    Encodes 16-bit PCM chunks into a compressed in-memory file as they arrive,
+    so nothing is left to encode when the recording stops.
+    """
+
+    def __init__(self, fmt, rate, channels):
+        self.filename, self.content_type, (sf_format, sf_subtype) = FORMATS[fmt]
+        self._buffer = io.BytesIO()
+        self._file = soundfile.SoundFile(
+            self._buffer,
+            mode="w",
+            samplerate=rate,
+            channels=channels,
+            format=sf_format,
+            subtype=sf_subtype,
+        )
+
+    def write(self, data):
+        self._file.buffer_write(data, dtype="int16")
+
+    def finish(self):
+        """
+        :return: (filename, encoded bytes, content type) ready for a multipart upload
+        """
+        self._file.close()
+        return self.filename, self._buffer.getvalue(), self.content_type
+
+
+def create_encoder(fmt, rate, channels):
+    """
+    :param fmt: "wav", "flac" or "opus"
+    :return: StreamEncoder, or None if the audio should be uploaded as plain WAV
+    """
+    fmt = (fmt or "wav").lower()
+    if fmt not in FORMATS:
+        logger.warning(f"Unknown upload format {fmt!r}, using WAV.")
+        return None
+    if fmt == "wav":
+        return None
+    if _load_soundfile() is None:
+        logger.warning(f"soundfile is not installed - cannot encode {fmt}, using WAV.")
+        return None
+    try:
+        return StreamEncoder(fmt, rate, channels)
+    except Exception as e:
+        # e.g. a libsndfile build without Opus support
+        logger.warning(f"Cannot create {fmt} encoder ({e}), using WAV.")
+        return None
+
+
+def decode_to_wav(data):
+    """
+    Decode a compressed recording (FLAC, Ogg/Opus) back to 16-bit PCM WAV.
+    :raise ValueError: if soundfile is missing or can't read the data
+    """
+    if _load_soundfile() is None:
+        raise ValueError("soundfile is not installed - cannot decode compressed audio")
+    try:
+        samples, rate = soundfile.read(io.BytesIO(data), dtype="int16")
+    except RuntimeError as e:  # soundfile.LibsndfileError
+        raise ValueError(f"Cannot decode audio: {e}") from e
+    channels = 1 if samples.ndim == 1 else samples.shape[1]
+    pcm = samples.tobytes()
+    return wav_header(len(pcm), channels, 2, rate) + pcm
+
+
+def encode_wav(wav_data, fmt):
+    """
+    One-shot counterpart of StreamEncoder for audio that changed after recording
+    (e.g. trimmed), where the incrementally encoded copy no longer matches.
+    :return: (filename, encoded bytes, content type), or None to upload plain WAV
+    """
+    channels, _, rate, pcm = parse_wav(wav_data)
+    encoder = create_encoder(fmt, rate, channels)
+    if encoder is None:
+        return None
+    encoder.write(pcm)
+    return encoder.finish()
@@ -15,17 +15,43 @@ def load_config():
         # For API mode
         "API_KEY": os.getenv("API_KEY", ""),
         "WHISPER_URL": os.getenv("WHISPER_URL", "http://localhost:8000/inference"),
+        # Open a connection to WHISPER_URL as soon as recording starts
+        "WHISPER_PREWARM": os.getenv("WHISPER_PREWARM", "true").lower() == "true",
+        # Ping WHISPER_URL every N seconds to keep it warm (0 = off)
+        "WHISPER_KEEPALIVE_SECONDS": float(os.getenv("WHISPER_KEEPALIVE_SECONDS", "0")),
 
         # For both
         "WHISPER_MODEL": os.getenv("WHISPER_MODEL", "whisper-1"),
         "WHISPER_LANGUAGE": os.getenv("WHISPER_LANGUAGE", "en"),
 
-        # CLI vs. API
+        # CLI vs. API vs. resident local server
         "WHISPER_MODE": os.getenv("WHISPER_MODE", "api"),
         "WHISPER_CLI_COMMAND": os.getenv("WHISPER_CLI_COMMAND", "whisper"),
         "WHISPER_CLI_ARGS": os.getenv("WHISPER_CLI_ARGS", ""),
+        # Kill the CLI if it takes longer (seconds, 0 = no limit)
+        "WHISPER_CLI_TIMEOUT": float(os.getenv("WHISPER_CLI_TIMEOUT", "0")),
+
+        # For router mode: comma-separated `url[|model[|api_key]]` entries,
+        # optionally plus the local backend ("cli", "server" or "none")
+        "ROUTER_ENDPOINTS": os.getenv("ROUTER_ENDPOINTS", ""),
+        "ROUTER_LOCAL": os.getenv("ROUTER_LOCAL", "none").lower(),
+        "ROUTER_HEDGE_FACTOR": float(os.getenv("ROUTER_HEDGE_FACTOR", "2.0")),
+        "ROUTER_HEDGE_MIN_SECONDS": float(os.getenv("ROUTER_HEDGE_MIN_SECONDS", "2.0")),
+        "ROUTER_COOLDOWN_SECONDS": float(os.getenv("ROUTER_COOLDOWN_SECONDS", "30")),
+
+        # For server mode (whisper.cpp `whisper-server` managed by handsfree)
+        "WHISPER_SERVER_COMMAND": os.getenv("WHISPER_SERVER_COMMAND", "whisper-server"),
+        "WHISPER_SERVER_ARGS": os.getenv("WHISPER_SERVER_ARGS", ""),
+        "WHISPER_SERVER_PORT": int(os.getenv("WHISPER_SERVER_PORT", "8178")),
+        "WHISPER_SERVER_STARTUP_TIMEOUT": float(os.getenv("WHISPER_SERVER_STARTUP_TIMEOUT", "120")),
 
         "KEYBOARD_SHORTCUT": os.getenv("KEYBOARD_SHORTCUT", "ctrl+alt+f5"),
+        # Types the last transcription again (empty = disabled)
+        "RETYPE_SHORTCUT": os.getenv("RETYPE_SHORTCUT", ""),
+        "CANCEL_SHORTCUT": os.getenv("CANCEL_SHORTCUT", ""),
+        # Unix socket for `python -m handsfree ctl` (empty: on only with --headless,
+        # at $XDG_RUNTIME_DIR/handsfree.sock)
+        "CONTROL_SOCKET": os.getenv("CONTROL_SOCKET", ""),
 
         # Double-tap mode: if DOUBLE_PRESS_WINDOW_MS > 0, the app listens for
         # two quick presses of DOUBLE_PRESS_KEY instead of KEYBOARD_SHORTCUT.
@@ -33,10 +59,73 @@ def load_config():
         "DOUBLE_PRESS_KEY": os.getenv("DOUBLE_PRESS_KEY", "ctrl_r"),
         "MAX_RECORD_SECONDS": int(os.getenv("MAX_RECORD_SECONDS", "30")),
         "SAVE_RECORDINGS": os.getenv("SAVE_RECORDINGS", "false").lower() == "true",
+        # Recording archive: location, "flac", "opus" or "wav", size cap and age limit (0 = none)
+        "ARCHIVE_DIR": os.getenv("ARCHIVE_DIR", "~/.local/share/handsfree/recordings"),
+        "ARCHIVE_FORMAT": os.getenv("ARCHIVE_FORMAT", "flac").lower(),
+        "ARCHIVE_MAX_MB": float(os.getenv("ARCHIVE_MAX_MB", "500")),
+        "ARCHIVE_MAX_DAYS": float(os.getenv("ARCHIVE_MAX_DAYS", "0")),
+        # "blocking" (reader thread) or "callback" (PortAudio callback + queue,
+        # with overflow/underflow counting)
+        "CAPTURE_MODE": os.getenv("CAPTURE_MODE", "blocking").lower(),
+        # Keep the microphone open between recordings and prepend the last
+        # MIC_PREROLL_MS of audio, so starting is instant and nothing is clipped
+        "MIC_ALWAYS_OPEN": os.getenv("MIC_ALWAYS_OPEN", "false").lower() == "true",
+        "MIC_PREROLL_MS": int(os.getenv("MIC_PREROLL_MS", "300")),
+        # Audio format sent to the API: "wav", "flac" or "opus"
+        "UPLOAD_FORMAT": os.getenv("UPLOAD_FORMAT", "wav").lower(),
+        # Send the audio to the API while recording (chunked transfer encoding)
+        "STREAMING_UPLOAD": os.getenv("STREAMING_UPLOAD", "false").lower() == "true",
+
+        # Transcription cache keyed by a hash of the audio + model/language/mode
+        "CACHE_ENABLED": os.getenv("CACHE_ENABLED", "false").lower() == "true",
+        "CACHE_DIR": os.getenv("CACHE_DIR", "~/.cache/handsfree/transcriptions"),
+        "CACHE_MAX_MB": float(os.getenv("CACHE_MAX_MB", "50")),
+        "CACHE_MEMORY_ENTRIES": int(os.getenv("CACHE_MEMORY_ENTRIES", "128")),
+
+        # Voice-activity trimming of leading/trailing silence (and long pauses)
+        "VAD_TRIM": os.getenv("VAD_TRIM", "false").lower() == "true",
+        "VAD_THRESHOLD": int(os.getenv("VAD_THRESHOLD", "500")),
+        "VAD_PADDING_MS": int(os.getenv("VAD_PADDING_MS", "200")),
+        "VAD_MAX_PAUSE_MS": int(os.getenv("VAD_MAX_PAUSE_MS", "0")),
+
+        # Streaming mode: cut the recording at pauses and transcribe segments
+        # in the background while the user is still speaking.
+        "STREAMING_TRANSCRIPTION": os.getenv("STREAMING_TRANSCRIPTION", "false").lower() == "true",
+        "STREAMING_SILENCE_THRESHOLD": int(os.getenv("STREAMING_SILENCE_THRESHOLD", "500")),
+        "STREAMING_MIN_PAUSE_MS": int(os.getenv("STREAMING_MIN_PAUSE_MS", "600")),
+        "STREAMING_MIN_SEGMENT_SECONDS": float(os.getenv("STREAMING_MIN_SEGMENT_SECONDS", "5.0")),
+        # Split long recordings at pauses and transcribe the chunks concurrently
+        "CHUNKED_TRANSCRIPTION": os.getenv("CHUNKED_TRANSCRIPTION", "false").lower() == "true",
+        "CHUNK_SECONDS": float(os.getenv("CHUNK_SECONDS", "30")),
+        "CHUNK_OVERLAP_SECONDS": float(os.getenv("CHUNK_OVERLAP_SECONDS", "1.0")),
+        "CHUNK_FAN_OUT": int(os.getenv("CHUNK_FAN_OUT", "4")),
+        # Request streamed output (SSE) and type text deltas as they arrive
+        "STREAMING_RESPONSE": os.getenv("STREAMING_RESPONSE", "false").lower() == "true",
 
         "SOUND_START": os.getenv("SOUND_START", "handsfree/sounds/start.wav"),
         "SOUND_STOP": os.getenv("SOUND_STOP", "handsfree/sounds/stop.wav"),
+        # Replace the start cue (as picked up by the microphone) with silence
+        "SOUND_MUTE_START_CUE": os.getenv("SOUND_MUTE_START_CUE", "false").lower() == "true",
+
+        # Dictation job queue: transcription workers, merging of queued clips
+        "JOB_WORKERS": int(os.getenv("JOB_WORKERS", "2")),
+        "JOB_COALESCE": os.getenv("JOB_COALESCE", "false").lower() == "true",
+        "JOB_COALESCE_MAX_SECONDS": float(os.getenv("JOB_COALESCE_MAX_SECONDS", "15")),
 
         "TYPE_START_DELAY": float(os.getenv("TYPE_START_DELAY", "0.0")),
+        # Text injection: auto (xdotool), xdotool, clipboard, uinput or pyautogui
+        "TYPE_METHOD": os.getenv("TYPE_METHOD", "auto").lower(),
+        "TYPE_PASTE_THRESHOLD": int(os.getenv("TYPE_PASTE_THRESHOLD", "200")),
+        "TYPE_KEY_DELAY_MS": int(os.getenv("TYPE_KEY_DELAY_MS", "1")),
+        "TYPE_PASTE_KEYS": os.getenv("TYPE_PASTE_KEYS", "ctrl+v"),
+        "TYPE_CLIPBOARD_RESTORE_DELAY": float(os.getenv("TYPE_CLIPBOARD_RESTORE_DELAY", "0.3")),
         "REPLACE_ALL_WHITESPACE_WITH_SPACE": os.getenv("REPLACE_ALL_WHITESPACE_WITH_SPACE", "false").lower() == "true",
+        # `phrase => replacement` rules applied to every transcription (empty = none)
+        "REPLACEMENTS_FILE": os.getenv("REPLACEMENTS_FILE", ""),
+
+        # Per-stage latency metrics (empty file = log only)
+        "METRICS_FILE": os.getenv("METRICS_FILE", ""),
+        "METRICS_FORMAT": os.getenv("METRICS_FORMAT", "json").lower(),
+        "METRICS_WINDOW": int(os.getenv("METRICS_WINDOW", "1000")),
+        "METRICS_IN_GUI": os.getenv("METRICS_IN_GUI", "false").lower() == "true",
     }
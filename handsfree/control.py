@@ -0,0 +1,219 @@
+# handsfree/control.py
+import asyncio
+import errno
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+COMMANDS = ("start", "stop", "toggle", "cancel", "retype", "status", "last", "stats", "quit")
+
+
+def default_socket_path():
+    """
+    $XDG_RUNTIME_DIR/handsfree.sock, or a per-user name in the temp directory.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "handsfree.sock")
+    return os.path.join(tempfile.gettempdir(), f"handsfree-{os.getuid()}.sock")
+
+
+def _remove_stale_socket(path):
+    """
+    Delete a socket file left behind by a crashed instance.
+    :raise OSError: (EADDRINUSE) if another instance is still listening on it
+    """
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    probe.settimeout(0.5)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(errno.EADDRINUSE, f"Another handsfree instance is listening on {path}")
+
+
+def parse_request(line):
+    """
+    A request is one line: a JSON object with "cmd" or just the command name
+    (`echo toggle | socat - UNIX-CONNECT:...`).
+    :return: command name
+    :raise ValueError: if the line is neither
+    """
+    line = line.strip()
+    if line.startswith(b"{"):
+        request = json.loads(line)
+        command = request.get("cmd") if isinstance(request, dict) else None
+        if not isinstance(command, str):
+            raise ValueError('expected {"cmd": "<command>"}')
+        return command
+    return line.decode("utf-8").lower()
+
+
+class ControlServer:
+    """
+    Local control API: JSON lines over a Unix socket, served on the app's
+    EventLoop, so a command reaches the state machine without a thread hop
+    or the pynput listener. One request per line (see `parse_request`), one
+    JSON object per reply, always with "ok" and, on success, "state"
+    (IDLE, RECORDING or PROCESSING). Commands:
+    - start, stop, toggle, cancel, retype: reply once the transition is applied,
+    - status: also "recording" and "busy" (dictations not typed yet),
+    - last: "text" of the last transcription,
+    - stats: "metrics" (LatencyMetrics snapshot) and "keys" (hotkey dispatch),
+    - quit: shut the application down (only if `on_quit` is given).
+    The socket file is created with mode 0600.
+    """
+
+    def __init__(self, app, path, on_quit=None):
+        self._app = app
+        self.path = os.path.expanduser(path)
+        self._on_quit = on_quit
+        self._server = None
+
+    def start(self):
+        """
+        :raise OSError: if the socket can't be created or is in use
+        """
+        _remove_stale_socket(self.path)
+        self._app.loop.call(self._start).result(timeout=5)
+        logger.info(f"Control socket listening on {self.path}.")
+
+    async def _start(self):
+        # Only this user may drive the dictation (the socket grants typing and
+        # reading transcripts): never let the socket exist with looser permissions,
+        # not even between bind() and chmod()
+        umask = os.umask(0o077)
+        try:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        finally:
+            os.umask(umask)
+        os.chmod(self.path, 0o600)
+
+    def state(self):
+        app = self._app
+        if app.is_recording:
+            return "RECORDING"
+        return "PROCESSING" if app.jobs.busy() else "IDLE"
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than the StreamReader limit (64 KiB): not a command
+                    writer.write(json.dumps({"ok": False, "error": "request line too long"}).encode() + b"\n")
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    command = parse_request(line)
+                    reply = await self.execute(command)
+                except ValueError as e:
+                    command, reply = None, {"ok": False, "error": f"bad request: {e}"}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+                if command == "quit" and reply["ok"]:
+                    self._on_quit()
+        except ConnectionError:
+            pass
+        except asyncio.CancelledError:
+            # Loop shutting down with the client still connected; ending
+            # normally keeps asyncio from logging the cancellation as an error
+            pass
+        finally:
+            writer.close()
+
+    async def execute(self, command):
+        """
+        Run one command (on the loop thread).
+        :return: reply dict
+        """
+        app = self._app
+        transitions = {
+            "start": app.on_start,
+            "stop": app.on_stop,
+            "toggle": app.on_hotkey_triggered,
+            "cancel": app.on_cancel,
+            "retype": app.on_retype,
+        }
+        try:
+            if command in transitions:
+                await asyncio.wrap_future(transitions[command]())
+            elif command == "status":
+                return {"ok": True, "state": self.state(), "recording": app.is_recording, "busy": app.jobs.busy()}
+            elif command == "last":
+                return {"ok": True, "state": self.state(), "text": app.last_transcription}
+            elif command == "stats":
+                keys = app.dispatcher.stats() if app.dispatcher else {}
+                return {"ok": True, "state": self.state(), "metrics": app.metrics.snapshot(), "keys": keys}
+            elif command == "quit":
+                if self._on_quit is None:
+                    return {"ok": False, "error": "quit is only supported in headless mode"}
+            else:
+                return {"ok": False, "error": f"unknown command {command!r} (one of: {', '.join(COMMANDS)})"}
+        except Exception as e:
+            logger.exception(f"Control command {command} failed: {e}")
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "state": self.state()}
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._app.loop.call(self._server.close).result(timeout=2)
+        except Exception as e:
+            logger.debug(f"Control socket already closed: {e!r}")
+        self._server = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def send_command(path, command, timeout=5.0):
+    """
+    Client side: send one command to a running instance.
+    :return: reply dict
+    :raise OSError: if nothing listens on `path`
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(os.path.expanduser(path))
+        sock.sendall(json.dumps({"cmd": command}).encode() + b"\n")
+        with sock.makefile("rb") as replies:
+            line = replies.readline()
+    if not line:
+        raise ConnectionError("connection closed without a reply")
+    return json.loads(line)
+
+
+def run_command(args, config):
+    """
+    `python -m handsfree ctl <command>`: print the reply of a running instance.
+    :return: process exit code
+    """
+    path = config["CONTROL_SOCKET"] or default_socket_path()
+    try:
+        reply = send_command(path, args.action, timeout=args.timeout)
+    except (OSError, ValueError) as e:
+        print(f"Cannot reach handsfree on {path}: {e}", file=sys.stderr)
+        return 2
+    if args.action == "last" and reply.get("ok") and not args.json:
+        print(reply["text"])
+    else:
+        print(json.dumps(reply, ensure_ascii=False))
+    return 0 if reply.get("ok") else 1
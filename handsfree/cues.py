@@ -0,0 +1,177 @@
+# handsfree/cues.py
+import logging
+import queue
+import threading
+import time
+
+from . import codec
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+
+class Cue:
+    """
+    A notification sound decoded into memory once, at startup.
+    """
+
+    def __init__(self, path, channels, sample_width, rate, pcm):
+        self.path = path
+        self.channels = channels
+        self.sample_width = sample_width
+        self.rate = rate
+        self.pcm = pcm
+
+    @property
+    def duration(self):
+        return len(self.pcm) / float(self.rate * self.channels * self.sample_width)
+
+    @property
+    def stream_format(self):
+        return self.channels, self.sample_width, self.rate
+
+
+class CuePlayer:
+    """
+    Plays the start/stop cues from memory through one long-lived PyAudio output
+    stream, written by a single cue thread: no file reads, decoding, thread or
+    device setup per cue. If the output stream cannot be opened, cues fall back
+    to `utils.play_sound`.
+    `latencies[name]` holds the seconds between `play(name)` and the cue's
+    samples being handed to the device (plus `output_latency` in the device).
+    """
+
+    def __init__(self, audio_interface=None):
+        """
+        :param audio_interface: callable returning the PyAudio instance to play
+            through (e.g. `Recorder.audio_interface`, to share it); None plays
+            every cue with `utils.play_sound`
+        """
+        self._audio_interface = audio_interface
+        self.cues = {}
+        self.latencies = {}
+        self.output_latency = 0.0
+        self._stream = None
+        self._stream_format = None
+        self._stream_lock = threading.Lock()
+        self._fallback = audio_interface is None
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def load(self, name, path):
+        """
+        Decode the WAV file at `path` as cue `name`. An empty path disables the cue.
+        """
+        if not path:
+            self.cues.pop(name, None)
+            return
+        try:
+            with open(path, "rb") as f:
+                channels, sample_width, rate, pcm = codec.parse_wav(f.read())
+        except (OSError, ValueError) as e:
+            # Not a PCM WAV (or unreadable): leave it to playsound
+            logger.warning(f"Cannot preload sound {path}: {e}")
+            self.cues[name] = Cue(path, 0, 0, 0, b"")
+            return
+        self.cues[name] = Cue(path, channels, sample_width, rate, bytes(pcm))
+        logger.debug(f"Loaded cue {name!r}: {self.cues[name].duration:.2f}s from {path}.")
+
+    def duration(self, name):
+        """
+        :return: seconds from `play(name)` until the cue has been heard
+                 (0.0 if the cue is disabled or its length is unknown)
+        """
+        cue = self.cues.get(name)
+        if cue is None or not cue.pcm:
+            return 0.0
+        return cue.duration + self.output_latency + self.latencies.get(name, 0.0)
+
+    def warm_up(self):
+        """
+        Open the output stream ahead of the first cue.
+        """
+        cue = next((c for c in self.cues.values() if c.pcm), None)
+        if cue is None or self._fallback:
+            return
+        with self._stream_lock:
+            try:
+                self._output(cue)
+            except Exception as e:
+                self._disable_stream(e)
+
+    def play(self, name):
+        cue = self.cues.get(name)
+        if cue is None:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="handsfree-cues", daemon=True)
+            self._thread.start()
+        self._queue.put((name, time.perf_counter()))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            name, queued = item
+            cue = self.cues.get(name)
+            if cue is None:
+                continue
+            if self._fallback or not cue.pcm:
+                utils.play_sound(cue.path)
+                continue
+            with self._stream_lock:
+                try:
+                    stream = self._output(cue)
+                    self.latencies[name] = time.perf_counter() - queued
+                    stream.write(cue.pcm)
+                except Exception as e:
+                    self._disable_stream(e)
+                    utils.play_sound(cue.path)
+                    continue
+            logger.debug(
+                f"Cue {name!r} started {self.latencies[name] * 1000:.1f} ms after the request "
+                f"(+{self.output_latency * 1000:.1f} ms device latency)."
+            )
+
+    def _output(self, cue):
+        # Reopened only if a cue has a different sample format than the last one
+        if self._stream is not None and self._stream_format == cue.stream_format:
+            return self._stream
+        self._close_stream()
+        audio = self._audio_interface()
+        self._stream = audio.open(
+            format=audio.get_format_from_width(cue.sample_width),
+            channels=cue.channels,
+            rate=cue.rate,
+            output=True,
+        )
+        self._stream_format = cue.stream_format
+        try:
+            self.output_latency = self._stream.get_output_latency()
+        except (AttributeError, OSError):
+            self.output_latency = 0.0
+        return self._stream
+
+    def _disable_stream(self, error):
+        logger.warning(f"Cannot play cues through an output stream ({error}), using playsound.")
+        self._fallback = True
+        self._close_stream()
+
+    def _close_stream(self):
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except OSError as e:
+                logger.debug(f"Error closing the cue stream: {e}")
+            self._stream = None
+            self._stream_format = None
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=2)
+            self._thread = None
+        with self._stream_lock:
+            self._close_stream()
@@ -0,0 +1,93 @@
+# handsfree/dispatch.py
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class KeyEventDispatcher:
+    """
+    Keeps the pynput listener threads - the OS key-event hook - free of
+    application work: a listener only timestamps the event and puts it on a
+    queue, and one dispatcher thread runs the callbacks. Keyboard input on the
+    whole desktop stays responsive however long a start or stop takes.
+    Measured, over the last `window` events:
+    - `hook`: time spent inside the listener for every key press/release,
+    - `dispatch`: time from the hotkey to its callback being run.
+    """
+
+    def __init__(self, window=1000):
+        self._queue = queue.SimpleQueue()
+        self._hook = deque(maxlen=window)
+        self._dispatch = deque(maxlen=window)
+        self._thread = threading.Thread(target=self._run, name="handsfree-keys", daemon=True)
+        self._thread.start()
+
+    def post(self, callback, name):
+        """
+        :return: a function for the listener that queues `callback` when the
+                 hotkey `name` fires
+        """
+        def fire():
+            self._queue.put((name, callback, time.perf_counter()))
+
+        return fire
+
+    def timed(self, handler):
+        """
+        Wrap a pynput on_press/on_release handler to measure the time spent in it.
+        """
+        def wrapper(key):
+            start = time.perf_counter()
+            try:
+                return handler(key)
+            finally:
+                self._hook.append(time.perf_counter() - start)
+
+        return wrapper
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            name, callback, fired = item
+            waited = time.perf_counter() - fired
+            self._dispatch.append(waited)
+            logger.debug(f"Hotkey {name} dispatched after {waited * 1000:.2f} ms.")
+            try:
+                callback()
+            except Exception as e:
+                logger.exception(f"Hotkey {name} handler failed: {e}")
+
+    def stats(self):
+        """
+        :return: {"hook": {...}, "dispatch": {...}} with count, p50, p99 and max
+                 in seconds (empty dicts before the first event)
+        """
+        result = {}
+        for name, samples in (("hook", self._hook), ("dispatch", self._dispatch)):
+            ordered = sorted(samples)
+            if not ordered:
+                result[name] = {}
+                continue
+            result[name] = {
+                "count": len(ordered),
+                "p50": ordered[len(ordered) // 2],
+                "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+                "max": ordered[-1],
+            }
+        return result
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=2)
+        hook = self.stats()["hook"]
+        if hook:
+            logger.info(
+                f"Key events: {hook['count']} handled in the listener in "
+                f"p50 {hook['p50'] * 1e6:.0f} us, p99 {hook['p99'] * 1e6:.0f} us, max {hook['max'] * 1e6:.0f} us."
+            )
@@ -0,0 +1,89 @@
+# handsfree/eventloop.py
+import asyncio
+import concurrent.futures
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoop:
+    """
+    An asyncio event loop on its own thread. It owns the dictation state
+    machine: the blocking parts (pynput listeners, PyAudio, Tk, the job
+    workers) hand work to it with `call`/`submit`, and it hands blocking
+    calls back to a thread pool with `run_blocking`. Every state change thus
+    happens on one thread, in the order it was requested.
+    """
+
+    def __init__(self, name="handsfree-loop", workers=4):
+        self.loop = asyncio.new_event_loop()
+        self._executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix=f"{name}-blocking")
+        self.loop.set_default_executor(self._executor)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+            # Closing: let cancelled tasks run their cleanup (e.g. kill a CLI process)
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        finally:
+            self.loop.close()
+
+    def in_loop(self):
+        return threading.current_thread() is self._thread
+
+    async def _invoke(self, fn, args):
+        result = fn(*args)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+    def call(self, fn, *args):
+        """
+        Run `fn(*args)` on the loop thread (awaited if it's a coroutine function).
+        Safe to call from any thread.
+        :return: concurrent.futures.Future with the result; cancelling it
+                 cancels the call
+        """
+        return asyncio.run_coroutine_threadsafe(self._invoke(fn, args), self.loop)
+
+    def call_sync(self, fn, *args, timeout=None):
+        """
+        Like `call`, but wait for the result (directly on the loop thread,
+        where `fn` must not be a coroutine function).
+        """
+        if self.in_loop():
+            return fn(*args)
+        return self.call(fn, *args).result(timeout)
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the loop from any thread.
+        :return: concurrent.futures.Future
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run_blocking(self, fn, *args, executor=None):
+        """
+        Awaitable running a blocking `fn(*args)` on a thread pool (the loop's
+        own one unless `executor` is given).
+        """
+        return self.loop.run_in_executor(executor, lambda: fn(*args))
+
+    def close(self, timeout=2):
+        if self.loop.is_closed():
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        except RuntimeError:  # closed meanwhile
+            pass
+        if not self.in_loop():
+            self._thread.join(timeout)
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -127,7 +127,11 @@ class HandsfreeGUI:
 
         # A label to display status
         self.status_label = tk.Label(self.root, text="Status: IDLE", font=("Arial", 14))
-        self.status_label.pack(pady=20)
+        self.status_label.pack(pady=(20, 0))
+
+        # Optional latency summary (METRICS_IN_GUI)
+        self.metrics_label = tk.Label(self.root, text="", font=("Arial", 9))
+        self.metrics_label.pack()
 
         # Callback for closing the app
         self.on_close_callback = None
@@ -175,6 +179,12 @@ class HandsfreeGUI:
                 # Fallback if unknown status
                 self.tray.set_icon_idle()
 
+    def set_metrics(self, text):
+        """
+        Show a short latency summary under the status.
+        """
+        self.metrics_label.config(text=text)
+
     def set_on_close_callback(self, callback):
         """
         Allows the main script to define what should happen when the user closes the window or
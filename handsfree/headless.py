@@ -0,0 +1,50 @@
+# handsfree/headless.py
+import logging
+import signal
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class HeadlessGUI:
+    """
+    Stand-in for HandsfreeGUI with no window and no tray icon, so neither Tk
+    nor GTK is loaded: the status is only kept (and logged), and `run()`
+    waits until SIGINT/SIGTERM or `request_close()`, e.g. the control
+    socket's quit command.
+    """
+
+    def __init__(self):
+        self.status = "IDLE"
+        self.metrics = ""
+        self.on_close_callback = None
+        self._close_requested = threading.Event()
+
+    def set_status(self, status_text):
+        self.status = status_text.upper()
+        logger.debug("Status changed to: %s", self.status)
+
+    def set_metrics(self, text):
+        self.metrics = text
+
+    def set_on_close_callback(self, callback):
+        self.on_close_callback = callback
+
+    def request_close(self):
+        """
+        Ask `run()` to return (from any thread); it calls the close callback
+        on its own thread.
+        """
+        self._close_requested.set()
+
+    def run(self):
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *args: self.request_close())
+        logger.info("Running headless; waiting for control commands.")
+        self._close_requested.wait()
+        if self.on_close_callback:
+            self.on_close_callback()
+
+    def close(self):
+        self._close_requested.set()
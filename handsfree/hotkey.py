@@ -61,14 +61,30 @@ def parse_shortcut(shortcut_str):
                 keys.append(keyboard.KeyCode.from_char(part))
     return frozenset(keys)
 
+def _hooks(dispatcher, on_activate, name, on_press, on_release):
+    """
+    With a KeyEventDispatcher, `on_activate` only queues the event and the
+    pynput handlers are timed.
+    """
+    if dispatcher is None:
+        return on_activate, on_press, on_release
+    return dispatcher.post(on_activate, name), dispatcher.timed(on_press), dispatcher.timed(on_release)
+
+
 class GlobalHotkeyListener:
-    def __init__(self, shortcut, on_activate):
-        self.on_activate = on_activate
+    def __init__(self, shortcut, on_activate, dispatcher=None):
+        """
+        :param dispatcher: optional KeyEventDispatcher running `on_activate`
+                           off the listener thread
+        """
         combo = parse_shortcut(shortcut)
+        self.on_activate, on_press, on_release = _hooks(
+            dispatcher, on_activate, shortcut, self.on_press, self.on_release
+        )
         self.hotkey = keyboard.HotKey(combo, self._on_hotkey_triggered)
         self.listener = keyboard.Listener(
-            on_press=self.on_press,
-            on_release=self.on_release
+            on_press=on_press,
+            on_release=on_release
         )
 
     def start(self):
@@ -87,7 +103,6 @@ class GlobalHotkeyListener:
         self.hotkey.release(key)
 
     def _on_hotkey_triggered(self):
-        logger.debug("Global hotkey triggered.")
         if self.on_activate:
             self.on_activate()
 
@@ -99,15 +114,21 @@ class DoubleTapListener:
     holding the key is filtered out via press/release tracking.
     """
 
-    def __init__(self, on_activate, key=keyboard.Key.ctrl_r, window_ms=400):
-        self.on_activate = on_activate
+    def __init__(self, on_activate, key=keyboard.Key.ctrl_r, window_ms=400, dispatcher=None):
+        """
+        :param dispatcher: optional KeyEventDispatcher running `on_activate`
+                           off the listener thread
+        """
         self.key = key
         self.window = window_ms / 1000.0
         self._last_press_time = 0.0
         self._is_held = False
+        self.on_activate, on_press, on_release = _hooks(
+            dispatcher, on_activate, f"double-tap {key}", self._on_press, self._on_release
+        )
         self.listener = keyboard.Listener(
-            on_press=self._on_press,
-            on_release=self._on_release,
+            on_press=on_press,
+            on_release=on_release,
         )
 
     def start(self):
@@ -130,7 +151,6 @@ class DoubleTapListener:
         self._is_held = True
         now = time.monotonic()
         if self._last_press_time and (now - self._last_press_time) <= self.window:
-            logger.debug("Double-tap detected.")
             self._last_press_time = 0.0
             if self.on_activate:
                 self.on_activate()
@@ -140,3 +160,49 @@ class DoubleTapListener:
     def _on_release(self, key):
         if key == self.key:
             self._is_held = False
+
+
+def create_listeners(config, on_toggle, on_retype=None, on_cancel=None, dispatcher=None):
+    """
+    Build the input listeners from the config: double-tap if configured,
+    otherwise the legacy KEYBOARD_SHORTCUT combo, plus the optional retype
+    and cancel shortcuts.
+    :param dispatcher: KeyEventDispatcher the callbacks are handed to
+    :return: list of listeners (not started yet)
+    """
+    listeners = []
+    if config["DOUBLE_PRESS_WINDOW_MS"] > 0:
+        listeners.append(DoubleTapListener(
+            on_activate=on_toggle,
+            key=parse_single_key(config["DOUBLE_PRESS_KEY"]),
+            window_ms=config["DOUBLE_PRESS_WINDOW_MS"],
+            dispatcher=dispatcher,
+        ))
+        logger.info(
+            "Trigger: double-tap %s within %d ms.",
+            config["DOUBLE_PRESS_KEY"], config["DOUBLE_PRESS_WINDOW_MS"],
+        )
+    else:
+        listeners.append(GlobalHotkeyListener(
+            shortcut=config["KEYBOARD_SHORTCUT"],
+            on_activate=on_toggle,
+            dispatcher=dispatcher,
+        ))
+        logger.info("Trigger: keyboard shortcut %s.", config["KEYBOARD_SHORTCUT"])
+
+    if config["RETYPE_SHORTCUT"] and on_retype:
+        listeners.append(GlobalHotkeyListener(
+            shortcut=config["RETYPE_SHORTCUT"],
+            on_activate=on_retype,
+            dispatcher=dispatcher,
+        ))
+        logger.info("Retype last result: keyboard shortcut %s.", config["RETYPE_SHORTCUT"])
+
+    if config["CANCEL_SHORTCUT"] and on_cancel:
+        listeners.append(GlobalHotkeyListener(
+            shortcut=config["CANCEL_SHORTCUT"],
+            on_activate=on_cancel,
+            dispatcher=dispatcher,
+        ))
+        logger.info("Cancel pending dictations: keyboard shortcut %s.", config["CANCEL_SHORTCUT"])
+    return listeners
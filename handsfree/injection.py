@@ -0,0 +1,304 @@
+# handsfree/injection.py
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import time
+
+evdev = None  # optional (TYPE_METHOD=uinput), imported on first use, see _load_evdev()
+_evdev_loaded = False
+
+logger = logging.getLogger(__name__)
+
+IS_LINUX = (platform.system().lower() == "linux")
+
+METHODS = ("auto", "xdotool", "clipboard", "uinput", "pyautogui")
+
+
+def _load_evdev():
+    """
+    :return: the python-evdev module, or None if it isn't installed
+    """
+    global evdev, _evdev_loaded
+    if not _evdev_loaded:
+        try:
+            import evdev as module
+        except ImportError:
+            module = None
+        evdev, _evdev_loaded = module, True
+    return evdev
+
+
+class InjectionError(Exception):
+    """
+    A backend could not start delivering the text (tool missing, process or
+    device could not be opened); nothing was typed, the injector tries the next one.
+    """
+
+
+class InjectionAborted(InjectionError):
+    """
+    A backend failed after it may have typed part of the text; another backend
+    would type it again, so the injector stops.
+    """
+
+
+class XdotoolTyper:
+    """
+    `xdotool type` with a short inter-key delay (xdotool's default is 12 ms per
+    character). The text goes through stdin, so there is no argv length limit.
+    """
+    name = "xdotool"
+
+    def __init__(self, key_delay_ms=1):
+        self.key_delay_ms = key_delay_ms
+
+    def available(self):
+        return IS_LINUX and shutil.which("xdotool") is not None
+
+    def can_type(self, text):
+        return True
+
+    def type_text(self, text):
+        try:
+            subprocess.run(
+                ["xdotool", "type", "--clearmodifiers", "--delay", str(self.key_delay_ms), "--file", "-"],
+                input=text.encode("utf-8"), check=True,
+            )
+        except OSError as e:
+            raise InjectionError(f"Cannot run xdotool: {e}") from e
+        except subprocess.CalledProcessError as e:
+            raise InjectionAborted(f"xdotool error: {e}") from e
+
+
+class ClipboardPaster:
+    """
+    Put the whole text on the clipboard, send the paste shortcut and restore
+    the previous (text) clipboard content afterwards, or clear it if it was
+    empty. Constant time regardless of length. Uses wl-copy/wl-paste on
+    Wayland, xclip or xsel on X11; the shortcut is sent with xdotool.
+    """
+    name = "clipboard"
+
+    def __init__(self, paste_keys="ctrl+v", restore_delay=0.3):
+        self.paste_keys = paste_keys
+        self.restore_delay = restore_delay
+
+    def _commands(self):
+        """
+        :return: (copy, paste, clear) commands for the available clipboard tool, or None
+        """
+        if os.environ.get("WAYLAND_DISPLAY") and shutil.which("wl-copy") and shutil.which("wl-paste"):
+            return ["wl-copy"], ["wl-paste", "--no-newline"], ["wl-copy", "--clear"]
+        if shutil.which("xclip"):
+            copy = ["xclip", "-selection", "clipboard", "-i"]
+            # xclip has no clear option: copying nothing empties the clipboard
+            return copy, ["xclip", "-selection", "clipboard", "-o"], copy
+        if shutil.which("xsel"):
+            return (
+                ["xsel", "--clipboard", "--input"],
+                ["xsel", "--clipboard", "--output"],
+                ["xsel", "--clipboard", "--clear"],
+            )
+        return None
+
+    def available(self):
+        return IS_LINUX and shutil.which("xdotool") is not None and self._commands() is not None
+
+    def can_type(self, text):
+        return True
+
+    def _copy(self, command, data):
+        # The clipboard tools fork a process that keeps serving the selection,
+        # so their stdout must not be a pipe we wait on
+        subprocess.run(command, input=data, stdout=subprocess.DEVNULL, check=True, timeout=5)
+
+    def type_text(self, text):
+        copy_cmd, paste_cmd, clear_cmd = self._commands()
+        try:
+            previous = subprocess.run(paste_cmd, capture_output=True, timeout=5).stdout
+        except (OSError, subprocess.TimeoutExpired):
+            previous = None
+        try:
+            self._copy(copy_cmd, text.encode("utf-8"))
+        except (OSError, subprocess.SubprocessError) as e:
+            raise InjectionError(f"Cannot copy the text to the clipboard: {e}") from e
+        try:
+            subprocess.run(["xdotool", "key", "--clearmodifiers", self.paste_keys], check=True)
+        except OSError as e:
+            raise InjectionError(f"Cannot run xdotool: {e}") from e
+        except subprocess.CalledProcessError as e:
+            # The shortcut may have been sent: don't paste or type the text again
+            raise InjectionAborted(f"clipboard paste error: {e}") from e
+        if previous is not None:
+            # The target application reads the clipboard asynchronously
+            time.sleep(self.restore_delay)
+            try:
+                # An empty clipboard is emptied again rather than left holding the text
+                self._copy(copy_cmd if previous else clear_cmd, previous)
+            except (OSError, subprocess.SubprocessError) as e:
+                logger.warning(f"Could not restore the clipboard: {e}")
+
+
+# US-layout characters: (evdev key name, needs shift)
+_UINPUT_KEYS = {" ": ("KEY_SPACE", False), "\n": ("KEY_ENTER", False), "\t": ("KEY_TAB", False)}
+for _c in "abcdefghijklmnopqrstuvwxyz":
+    _UINPUT_KEYS[_c] = (f"KEY_{_c.upper()}", False)
+    _UINPUT_KEYS[_c.upper()] = (f"KEY_{_c.upper()}", True)
+for _c, _shifted in zip("1234567890", "!@#$%^&*()"):
+    _UINPUT_KEYS[_c] = (f"KEY_{_c}", False)
+    _UINPUT_KEYS[_shifted] = (f"KEY_{_c}", True)
+for _name, _plain, _shifted in [
+    ("KEY_MINUS", "-", "_"), ("KEY_EQUAL", "=", "+"), ("KEY_LEFTBRACE", "[", "{"),
+    ("KEY_RIGHTBRACE", "]", "}"), ("KEY_BACKSLASH", "\\", "|"), ("KEY_SEMICOLON", ";", ":"),
+    ("KEY_APOSTROPHE", "'", '"'), ("KEY_GRAVE", "`", "~"), ("KEY_COMMA", ",", "<"),
+    ("KEY_DOT", ".", ">"), ("KEY_SLASH", "/", "?"),
+]:
+    _UINPUT_KEYS[_plain] = (_name, False)
+    _UINPUT_KEYS[_shifted] = (_name, True)
+
+
+class UinputTyper:
+    """
+    Virtual keyboard on /dev/uinput (python-evdev). Works under X11 and Wayland
+    and needs no per-character process, but only knows the US layout: text with
+    other characters (e.g. Polish letters) is left to the next backend.
+    """
+    name = "uinput"
+
+    def __init__(self):
+        self._device = None
+
+    def available(self):
+        return IS_LINUX and os.access("/dev/uinput", os.W_OK) and _load_evdev() is not None
+
+    def can_type(self, text):
+        return all(c in _UINPUT_KEYS for c in text)
+
+    def _open(self):
+        if self._device is None:
+            ecodes = evdev.ecodes
+            keys = {getattr(ecodes, name) for name, _ in _UINPUT_KEYS.values()}
+            keys.add(ecodes.KEY_LEFTSHIFT)
+            self._device = evdev.UInput({ecodes.EV_KEY: sorted(keys)}, name="handsfree-keyboard")
+            # Give the compositor a moment to pick up the new input device
+            time.sleep(0.2)
+        return self._device
+
+    def type_text(self, text):
+        try:
+            device = self._open()
+        except OSError as e:
+            raise InjectionError(f"Cannot open /dev/uinput: {e}") from e
+        try:
+            ecodes = evdev.ecodes
+            for c in text:
+                name, shift = _UINPUT_KEYS[c]
+                code = getattr(ecodes, name)
+                if shift:
+                    device.write(ecodes.EV_KEY, ecodes.KEY_LEFTSHIFT, 1)
+                device.write(ecodes.EV_KEY, code, 1)
+                device.write(ecodes.EV_KEY, code, 0)
+                if shift:
+                    device.write(ecodes.EV_KEY, ecodes.KEY_LEFTSHIFT, 0)
+                device.syn()
+        except OSError as e:
+            raise InjectionAborted(f"uinput error: {e}") from e
+
+    def close(self):
+        if self._device is not None:
+            self._device.close()
+            self._device = None
+
+
+class PyautoguiTyper:
+    name = "pyautogui"
+
+    def available(self):
+        return True
+
+    def can_type(self, text):
+        return True
+
+    def type_text(self, text):
+        try:
+            import pyautogui
+        except Exception as e:  # missing, or no display to connect to
+            raise InjectionError(f"pyautogui not available: {e}") from e
+        pyautogui.typewrite(text)
+
+
+class TextInjector:
+    """
+    Delivers the transcription to the focused window.
+    - `method="auto"`: `xdotool type` (it releases held modifiers and follows
+      the keyboard layout); uinput only if xdotool is missing,
+    - `method="clipboard"`: texts of at least `paste_threshold` characters are
+      pasted, shorter ones typed as with "auto". Opt-in, since the paste
+      shortcut differs between applications (terminals need ctrl+shift+v),
+    - `method="uinput"` or `"xdotool"` is tried first, with the others as
+      fallbacks; the clipboard is never a fallback. pyautogui is the last resort.
+    A fallback is used only if a backend couldn't start; one that fails part-way
+    (see InjectionAborted) is not followed by another, which would retype the text.
+    Each call's throughput is kept in `last_stats` and logged.
+    """
+
+    def __init__(self, method="auto", paste_threshold=200, key_delay_ms=1,
+                 paste_keys="ctrl+v", clipboard_restore_delay=0.3):
+        if method not in METHODS:
+            raise ValueError(f"Unknown TYPE_METHOD {method!r}, expected one of {', '.join(METHODS)}")
+        self.method = method
+        self.paste_threshold = paste_threshold
+        self.backends = {
+            "xdotool": XdotoolTyper(key_delay_ms),
+            "clipboard": ClipboardPaster(paste_keys, clipboard_restore_delay),
+            "uinput": UinputTyper(),
+            "pyautogui": PyautoguiTyper(),
+        }
+        self.last_stats = None
+
+    def _candidates(self, text):
+        order = []
+        if self.method == "clipboard":
+            if len(text) >= self.paste_threshold:
+                order.append("clipboard")
+        elif self.method != "auto":
+            order.append(self.method)
+        order += ["xdotool", "uinput", "pyautogui"]
+        for name in dict.fromkeys(order):
+            backend = self.backends[name]
+            if backend.available() and backend.can_type(text):
+                yield backend
+
+    def type_text(self, text):
+        text = text or ""
+        if not text.strip():
+            return
+
+        for backend in self._candidates(text):
+            start = time.perf_counter()
+            try:
+                backend.type_text(text)
+            except InjectionAborted as e:
+                logger.error(f"{e}; the text may be partly typed, not trying another input method.")
+                return
+            except InjectionError as e:
+                logger.warning(f"{e}; trying the next input method.")
+                continue
+            seconds = time.perf_counter() - start
+            self.last_stats = {
+                "method": backend.name,
+                "chars": len(text),
+                "seconds": seconds,
+                "chars_per_second": len(text) / seconds if seconds else 0.0,
+            }
+            logger.info(
+                "Injected %d chars via %s in %.3fs (%.0f chars/s).",
+                len(text), backend.name, seconds, self.last_stats["chars_per_second"],
+            )
+            return
+        logger.error("No input method could type the text.")
+
+    def close(self):
+        self.backends["uinput"].close()
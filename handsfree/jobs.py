@@ -0,0 +1,227 @@
+# handsfree/jobs.py
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from . import codec
+from .eventloop import EventLoop
+
+logger = logging.getLogger(__name__)
+
+# Silence inserted between coalesced clips, so Whisper sees a sentence break
+COALESCE_GAP_SECONDS = 0.3
+
+
+def _audio_seconds(audio_data):
+    if audio_data is None:
+        return 0.0
+    channels, sample_width, rate, pcm = codec.parse_wav(audio_data)
+    return len(pcm) / float(rate * channels * sample_width)
+
+
+class DictationJob:
+    """
+    One finished recording on its way to the typer.
+    """
+
+    def __init__(self, seq, audio_data, upload=None, segments=None, trace=None, archive_id=None, streamed=None):
+        self.seq = seq
+        self.audio_data = audio_data
+        self.upload = upload
+        self.segments = segments
+        # StreamingUpload that already sent the audio while recording
+        self.streamed = streamed
+        self.trace = trace
+        self.clips = 1
+        # RecordingArchive ids of the clips (several once coalesced)
+        self.archive_ids = [archive_id] if archive_id else []
+        self.cancelled = False
+        # Set by `process` when it already typed the text (streamed response)
+        self.typed = False
+
+    def audio_seconds(self):
+        return _audio_seconds(self.audio_data)
+
+
+class JobQueue:
+    """
+    Transcribes dictations on a bounded pool of worker threads and hands the
+    results to `deliver` strictly in submission order, from a single thread.
+    - `cancel_all()` drops every job that hasn't been delivered yet,
+    - with `coalesce`, a recording that arrives while the previous one is still
+      waiting for a worker is merged into it (one backend request), as long as
+      the joined audio stays under `coalesce_max_seconds`,
+    - `on_idle` is called when the last outstanding job has been delivered.
+    The bookkeeping runs on an EventLoop, one task per job, so the queue needs
+    no locks; `on_idle` is called on the loop thread.
+    """
+
+    def __init__(self, process, deliver, workers=2, coalesce=False, coalesce_max_seconds=15.0, on_idle=None,
+                 loop=None):
+        """
+        :param process: callable(job) -> text, runs on a worker thread
+        :param deliver: callable(job, text), runs on the delivery thread in order
+        :param loop: EventLoop to schedule the jobs on (default: a private one)
+        """
+        self._process = process
+        self._deliver = deliver
+        self.coalesce = coalesce
+        self.coalesce_max_seconds = coalesce_max_seconds
+        self._on_idle = on_idle
+
+        self._own_loop = loop is None
+        self._loop = loop or EventLoop(name="handsfree-jobs", workers=1)
+        workers = max(1, workers)
+        self._workers = asyncio.Semaphore(workers)
+        self._process_pool = ThreadPoolExecutor(workers, thread_name_prefix="handsfree-job")
+        self._deliver_pool = ThreadPoolExecutor(1, thread_name_prefix="handsfree-deliver")
+
+        # Only touched on the loop thread
+        self._pending = deque()   # submitted, not picked up by a worker
+        self._outstanding = {}    # seq -> job, until delivered
+        self._processing = {}     # seq -> task transcribing the job
+        self._delivery = {}       # seq -> task delivering the job after its predecessor
+        self._predecessor = {}    # seq -> delivery task of the job before
+        self._last_delivery = None
+        self._next_seq = 0
+        self._closed = False
+
+    def submit(self, audio_data, upload=None, segments=None, trace=None, archive_id=None, streamed=None):
+        """
+        :return: the DictationJob now carrying this recording (None once closed)
+        """
+        if self._closed:
+            logger.warning("Job queue is closed, dropping the recording.")
+            return None
+        return self._loop.call_sync(self._submit, audio_data, upload, segments, trace, archive_id, streamed)
+
+    def _submit(self, audio_data, upload, segments, trace, archive_id, streamed):
+        tail = self._pending[-1] if self._pending else None
+        if self.coalesce and tail and self._can_merge(tail, audio_data, segments, streamed):
+            tail.audio_data = codec.join_wav([tail.audio_data, audio_data], COALESCE_GAP_SECONDS)
+            tail.upload = None  # the compressed copy only covered the first clip
+            tail.clips += 1
+            if archive_id:
+                tail.archive_ids.append(archive_id)
+            logger.info(f"Merged recording into queued job {tail.seq} ({tail.clips} clips).")
+            return tail
+        job = DictationJob(self._next_seq, audio_data, upload, segments, trace, archive_id, streamed)
+        self._next_seq += 1
+        self._pending.append(job)
+        self._outstanding[job.seq] = job
+        loop = self._loop.loop
+        self._predecessor[job.seq] = self._last_delivery
+        self._processing[job.seq] = loop.create_task(self._process_job(job))
+        self._last_delivery = self._delivery[job.seq] = loop.create_task(self._deliver_job(job))
+        logger.debug(f"Queued job {job.seq} ({len(self._outstanding)} outstanding).")
+        return job
+
+    def _can_merge(self, tail, audio_data, segments, streamed):
+        # Segments and streamed uploads are already on their way to the backend
+        if segments or streamed or tail.segments or tail.streamed or tail.cancelled:
+            return False
+        if audio_data is None or tail.audio_data is None:
+            return False
+        try:
+            merged = _audio_seconds(audio_data) + tail.audio_seconds()
+        except ValueError:
+            return False
+        return merged + COALESCE_GAP_SECONDS <= self.coalesce_max_seconds
+
+    async def _process_job(self, job):
+        async with self._workers:
+            # Picked up: nothing gets merged into it any more
+            if job in self._pending:
+                self._pending.remove(job)
+            if job.cancelled:
+                return ""
+            return await self._loop.run_blocking(self._process, job, executor=self._process_pool)
+
+    async def _deliver_job(self, job):
+        processing = self._processing[job.seq]
+        previous = self._predecessor[job.seq]
+        try:
+            # asyncio.wait doesn't propagate the inner task's cancellation
+            await asyncio.wait([processing])
+            text = ""
+            if not processing.cancelled():
+                error = processing.exception()
+                if error:
+                    logger.error(f"Transcription worker error: {error}", exc_info=error)
+                else:
+                    text = processing.result()
+            if previous is not None:
+                await asyncio.wait([previous])
+            if job.cancelled:
+                logger.debug(f"Dropping cancelled job {job.seq}.")
+                return
+            try:
+                await self._loop.run_blocking(self._deliver, job, text, executor=self._deliver_pool)
+            except Exception as e:
+                logger.exception(f"Delivery of job {job.seq} failed: {e}")
+        finally:
+            del self._outstanding[job.seq]
+            del self._processing[job.seq]
+            del self._delivery[job.seq]
+            del self._predecessor[job.seq]
+            if self._last_delivery is asyncio.current_task():
+                self._last_delivery = None
+            if not self._outstanding and not self._closed and self._on_idle:
+                self._on_idle()
+
+    def cancel_all(self):
+        """
+        Cancel every job not delivered yet. Requests already running finish in
+        the background, but their text is discarded.
+        :return: number of cancelled jobs
+        """
+        if self._closed:
+            return 0
+        return self._loop.call_sync(self._cancel_all)
+
+    def _cancel_all(self):
+        jobs = [job for job in self._outstanding.values() if not job.cancelled]
+        for job in jobs:
+            job.cancelled = True
+            self._processing[job.seq].cancel()
+        self._pending.clear()
+        if jobs:
+            logger.info(f"Cancelled {len(jobs)} dictation job(s).")
+        return len(jobs)
+
+    def wait_turn(self, job):
+        """
+        Block until every earlier job has been delivered, so `job` may type now.
+        Called from the job's worker thread.
+        :return: False if the job was cancelled meanwhile
+        """
+        try:
+            return self._loop.call(self._wait_turn, job).result()
+        except (CancelledError, RuntimeError):
+            return False
+
+    async def _wait_turn(self, job):
+        previous = self._predecessor.get(job.seq)
+        if previous is not None and not previous.done():
+            # The processing task ends early only when the job is cancelled
+            await asyncio.wait([previous, self._processing[job.seq]], return_when=asyncio.FIRST_COMPLETED)
+        return not job.cancelled and not self._closed
+
+    def busy(self):
+        return bool(self._outstanding)
+
+    def close(self):
+        self._closed = True
+        try:
+            self._loop.call_sync(self._cancel_tasks, timeout=2)
+        except (RuntimeError, TimeoutError) as e:
+            logger.debug(f"Job queue loop already stopped: {e!r}")
+        self._process_pool.shutdown(wait=False, cancel_futures=True)
+        self._deliver_pool.shutdown(wait=False, cancel_futures=True)
+        if self._own_loop:
+            self._loop.close()
+
+    def _cancel_tasks(self):
+        for task in list(self._processing.values()) + list(self._delivery.values()):
+            task.cancel()
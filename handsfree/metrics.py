@@ -0,0 +1,176 @@
+# handsfree/metrics.py
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class DictationTrace:
+    """
+    Timing spans of one dictation (stop hotkey -> typed text), keyed by stage name.
+    """
+
+    def __init__(self, dictation_id):
+        self.id = dictation_id
+        self.spans = {}
+        self.audio_seconds = 0.0
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage, seconds):
+        # Repeated stages (e.g. a retried upload) accumulate
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+
+    def elapsed(self):
+        """
+        :return: seconds since the dictation started (the stop hotkey)
+        """
+        return time.perf_counter() - self._start
+
+    def finish(self):
+        self.spans["total"] = self.elapsed()
+
+    @property
+    def realtime_factor(self):
+        if not self.audio_seconds or "transcribe" not in self.spans:
+            return None
+        return self.spans["transcribe"] / self.audio_seconds
+
+    def summary(self):
+        parts = [f"{stage}={seconds:.3f}s" for stage, seconds in self.spans.items()]
+        parts.append(f"audio={self.audio_seconds:.1f}s")
+        if self.realtime_factor is not None:
+            parts.append(f"rtf={self.realtime_factor:.2f}")
+        return " ".join(parts)
+
+
+def _quantile(sorted_values, q):
+    # Nearest-rank: the value below which a fraction q of the samples fall
+    index = max(0, int(round(q * len(sorted_values))) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class LatencyMetrics:
+    """
+    Aggregates finished DictationTraces: per-stage p50/p95/p99 over the last
+    `window` dictations plus lifetime counts and sums, optionally exported after
+    every dictation to `path` as JSON or as a Prometheus textfile
+    (node_exporter textfile collector).
+    """
+
+    def __init__(self, path="", fmt="json", window=1000):
+        self.path = os.path.expanduser(path) if path else ""
+        self.fmt = fmt
+        self.window = window
+        self._ids = itertools.count(1)
+        self._samples = {}
+        self._sums = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def start_dictation(self):
+        return DictationTrace(next(self._ids))
+
+    def _observe(self, name, value):
+        if name not in self._samples:
+            self._samples[name] = deque(maxlen=self.window)
+            self._sums[name] = 0.0
+            self._counts[name] = 0
+        self._samples[name].append(value)
+        self._sums[name] += value
+        self._counts[name] += 1
+
+    def record(self, trace):
+        trace.finish()
+        logger.info(f"Dictation {trace.id} timings: {trace.summary()}")
+        with self._lock:
+            for stage, seconds in trace.spans.items():
+                self._observe(stage, seconds)
+            if trace.audio_seconds:
+                self._observe("audio_seconds", trace.audio_seconds)
+            if trace.realtime_factor is not None:
+                self._observe("realtime_factor", trace.realtime_factor)
+        if self.path:
+            self.write()
+
+    def snapshot(self):
+        """
+        :return: {name: {"count", "sum", "p50", "p95", "p99"}} (stages in seconds,
+                 plus "audio_seconds" and "realtime_factor")
+        """
+        with self._lock:
+            result = {}
+            for name, samples in self._samples.items():
+                ordered = sorted(samples)
+                stats = {"count": self._counts[name], "sum": self._sums[name]}
+                for q in QUANTILES:
+                    stats[f"p{int(q * 100)}"] = _quantile(ordered, q)
+                result[name] = stats
+            return result
+
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+
+        def summary(metric, help_text, label, names):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} summary")
+            for name in names:
+                stats = snapshot[name]
+                labels = f'{label}="{name}",' if label else ""
+                for q in QUANTILES:
+                    lines.append(f'{metric}{{{labels}quantile="{q}"}} {stats[f"p{int(q * 100)}"]:.6f}')
+                labels = f'{{{label}="{name}"}}' if label else ""
+                lines.append(f"{metric}_sum{labels} {stats['sum']:.6f}")
+                lines.append(f"{metric}_count{labels} {stats['count']}")
+
+        stages = [name for name in snapshot if name not in ("audio_seconds", "realtime_factor")]
+        if stages:
+            summary("handsfree_stage_seconds", "Duration of each dictation stage.", "stage", stages)
+        if "audio_seconds" in snapshot:
+            summary("handsfree_audio_seconds", "Length of the recorded audio.", None, ["audio_seconds"])
+        if "realtime_factor" in snapshot:
+            summary("handsfree_realtime_factor", "Transcription time divided by audio length.",
+                    None, ["realtime_factor"])
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        if self.fmt == "prometheus":
+            data = self.to_prometheus()
+        else:
+            data = json.dumps(self.snapshot(), indent=2, sort_keys=True) + "\n"
+        # Atomic replace, so a scraper never reads a half-written file
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Cannot write metrics file {self.path}: {e}")
+
+    def status_line(self):
+        """
+        :return: short text for the GUI, e.g. "last 1.20s | p50 0.90s | p95 2.10s"
+        """
+        stats = self.snapshot().get("total")
+        if not stats:
+            return ""
+        with self._lock:
+            last = self._samples["total"][-1]
+        return f"last {last:.2f}s | p50 {stats['p50']:.2f}s | p95 {stats['p95']:.2f}s"
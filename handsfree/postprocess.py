@@ -0,0 +1,215 @@
+# handsfree/postprocess.py
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+RULE_SEPARATOR = "=>"
+REGEX_PREFIX = "re:"
+
+# A replacement starting with one of these (or an empty one) takes the place
+# of the whitespace before the phrase too: "Ala przecinek ma" -> "Ala, ma"
+ATTACH_LEFT = ",.;:!?…)]}"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RuleError(ValueError):
+    """
+    Raised for a malformed rules file; the message names the line.
+    """
+
+
+def _key(phrase):
+    return " ".join(phrase.lower().split())
+
+
+def _trie_pattern(phrases):
+    """
+    One regex matching any of `phrases`, with common prefixes factored out
+    (abc|abd -> ab(?:c|d)), so the engine doesn't try every phrase in turn at
+    each position. A space matches any run of whitespace.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}  # a phrase ends here
+
+    def pattern(node):
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + pattern(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        if "" not in node and len(branches) == 1:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        # Optional and greedy: the longest phrase wins
+        return group + "?" if "" in node else group
+
+    return pattern(trie)
+
+
+class RuleSet:
+    """
+    Compiled replacement rules:
+    - literal rules (`wrong => right`) match case-insensitively on word
+      boundaries and are all applied in one pass by a single regex, longest
+      phrase first; a capitalized match gets a capitalized replacement,
+    - regex rules (`re:pattern => replacement`) run afterwards, in file order.
+    """
+
+    def __init__(self, literals=(), regexes=()):
+        """
+        :param literals: iterable of (phrase, replacement)
+        :param regexes: iterable of (pattern, replacement); `replacement` may use \\1 etc.
+        """
+        self._replacements = {}
+        for phrase, replacement in literals:
+            if _key(phrase):
+                self._replacements[_key(phrase)] = replacement
+        self._matcher = None
+        if self._replacements:
+            self._matcher = re.compile(rf"(?<!\w)(?:{_trie_pattern(self._replacements)})(?!\w)", re.IGNORECASE)
+        self._regexes = [(re.compile(pattern), replacement) for pattern, replacement in regexes]
+
+    def __len__(self):
+        return len(self._replacements) + len(self._regexes)
+
+    def _apply_literals(self, text):
+        out = []
+        pos = 0
+        for match in self._matcher.finditer(text):
+            phrase = match.group()
+            replacement = self._replacements.get(_key(phrase))
+            if replacement is None:
+                # Case-insensitive match whose lower() differs (rare Unicode cases)
+                continue
+            before = text[pos:match.start()]
+            if not replacement or replacement[0] in ATTACH_LEFT:
+                before = before.rstrip()
+            elif phrase[0].isupper() and replacement[0].islower():
+                replacement = replacement[0].upper() + replacement[1:]
+            out.append(before)
+            out.append(replacement)
+            pos = match.end()
+        if not out:
+            return text
+        out.append(text[pos:])
+        return "".join(out)
+
+    def apply(self, text):
+        if self._matcher:
+            text = self._apply_literals(text)
+        for pattern, replacement in self._regexes:
+            text = pattern.sub(replacement, text)
+        return text
+
+
+def parse_rules(lines, source="<rules>"):
+    """
+    One rule per line, `phrase => replacement` or `re:pattern => replacement`;
+    blank lines and lines starting with # are skipped.
+    :return: RuleSet
+    :raise RuleError: on a line without `=>` or with an invalid regex
+    """
+    literals = []
+    regexes = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if RULE_SEPARATOR not in line:
+            raise RuleError(f"{source}:{number}: expected 'phrase {RULE_SEPARATOR} replacement'")
+        phrase, replacement = (part.strip() for part in line.split(RULE_SEPARATOR, 1))
+        if phrase.startswith(REGEX_PREFIX):
+            pattern = phrase[len(REGEX_PREFIX):].strip()
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise RuleError(f"{source}:{number}: invalid regex {pattern!r}: {e}") from e
+            regexes.append((pattern, replacement))
+        elif phrase:
+            literals.append((phrase, replacement))
+        else:
+            raise RuleError(f"{source}:{number}: empty phrase")
+    return RuleSet(literals, regexes)
+
+
+def load_rules(path):
+    """
+    :raise OSError: if the file can't be read
+    :raise RuleError: if it is malformed
+    """
+    with open(path, encoding="utf-8") as f:
+        return parse_rules(f, source=path)
+
+
+class PostProcessor:
+    """
+    The clean-up applied to every transcription: the replacement rules from
+    `rules_path` (compiled once, reloaded when the file changes), then optional
+    whitespace collapsing. The file is checked at most every `check_interval`
+    seconds; a broken edit is logged and the previous rules stay in use.
+    """
+
+    def __init__(self, rules_path="", collapse_whitespace=False, check_interval=2.0):
+        self.rules_path = os.path.expanduser(rules_path) if rules_path else ""
+        self.collapse_whitespace = collapse_whitespace
+        self.check_interval = check_interval
+        self.rules = RuleSet()
+        self._mtime = None
+        self._next_check = 0.0
+        if self.rules_path:
+            self.reload()
+
+    def reload(self):
+        """
+        :return: True if the rules were (re)loaded
+        """
+        try:
+            mtime = os.stat(self.rules_path).st_mtime_ns
+            start = time.perf_counter()
+            rules = load_rules(self.rules_path)
+        except OSError as e:
+            logger.warning(f"Cannot read replacement rules: {e}")
+            return False
+        except RuleError as e:
+            # Don't parse the same broken file again on every check
+            self._mtime = mtime
+            logger.error(f"Replacement rules not reloaded, keeping the previous ones: {e}")
+            return False
+        self.rules, self._mtime = rules, mtime
+        logger.info(
+            f"Loaded {len(rules)} replacement rules from {self.rules_path} "
+            f"in {(time.perf_counter() - start) * 1000:.1f} ms."
+        )
+        return True
+
+    def _check_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            mtime = os.stat(self.rules_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    def process(self, text):
+        """
+        :return: the cleaned-up text (stripped)
+        """
+        if self.rules_path:
+            self._check_reload()
+        text = self.rules.apply(text.strip())
+        if self.collapse_whitespace:
+            text = _WHITESPACE.sub(" ", text)
+        return text.strip()
@@ -1,97 +1,417 @@
 # handsfree/recorder.py
-import pyaudio
-import wave
 import time
 import logging
-import io
-import os
-from threading import Thread
+from collections import deque
+from threading import Thread, Lock, RLock, current_thread
+
+from . import codec
 
 logger = logging.getLogger(__name__)
 
+pyaudio = None  # imported on first use, see Recorder.audio_interface()
+
+# PortAudio constants (portaudio.h), so that recording from an injected
+# audio interface doesn't need the pyaudio module at all
+PA_INT16 = 0x8
+PA_CONTINUE = 0
+PA_INPUT_UNDERFLOW = 0x1
+PA_INPUT_OVERFLOW = 0x2
+
+# Always-open stream: back off after a failed read (e.g. the device was
+# unplugged), reopen the stream every few failures in a row, give up after
+# a few reopens; the next recording then opens the input again
+READ_RETRY_DELAY = 0.05
+READ_RETRY_MAX_DELAY = 1.0
+REOPEN_AFTER_FAILURES = 5
+MAX_READ_FAILURES = 15
+
+
+def _load_pyaudio():
+    global pyaudio
+    if pyaudio is None:
+        import pyaudio as module
+        pyaudio = module
+    return pyaudio
+
 class Recorder:
-    def __init__(self, max_seconds=30):
+    def __init__(self, max_seconds=30, audio_interface=None):
+        """
+        :param audio_interface: PyAudio-compatible object to record from
+            (default: a new pyaudio.PyAudio())
+        """
         self.chunk = 1024
-        self.format = pyaudio.paInt16
+        self.format = PA_INT16
         self.channels = 1
         self.rate = 16000
         self.max_seconds = max_seconds
 
-        self._pyaudio = pyaudio.PyAudio()
+        self._pyaudio = audio_interface
+        self._init_lock = Lock()
         self._stream = None
-        self._frames = []
+        self._buffer = None
         self._is_recording = False
         self._recording_thread = None
+        # A recording the recorder stopped itself (time limit, lost input) is
+        # kept for the caller's next stop_recording()
+        self._auto_stopped = None
+        self._stop_lock = RLock()
 
-        self.save_recordings = False
+        # Durations of the stop_recording() steps, for the latency metrics
+        self.last_timings = {}
 
-    def start_recording(self):
-        if self._is_recording:
-            logger.debug("Already recording!")
-            return
+        # Compressed copy of the recording for upload ("wav", "flac" or "opus"),
+        # encoded chunk by chunk while recording
+        self.upload_format = "wav"
+        self.last_upload = None
+        self._encoder = None
 
-        logger.info("Starting recording...")
-        self._frames = []
-        self._stream = self._pyaudio.open(
+        # Streaming mode: a PauseSegmenter plus a per-recording on_segment callback
+        self.segmenter = None
+        self._on_segment = None
+        self._segment_start = 0
+
+        # Per-recording callback receiving every PCM chunk (streamed upload)
+        self._chunk_listener = None
+
+        # Always-open mode: one input stream runs for the app's lifetime and the
+        # last `preroll_ms` of audio is kept in a ring buffer between recordings
+        self.always_open = False
+        self.preroll_ms = 0
+        self._preroll = None
+        self._capture_thread = None
+        self._capturing = False
+        self._lock = Lock()
+
+        # Callback mode: PortAudio pushes chunks from its own thread into a deque
+        # (append/popleft are atomic, so the audio thread never waits on a lock)
+        # and a Python thread drains it. Overflow/underflow flags are counted.
+        self.capture_mode = "blocking"
+        self._queue = deque()
+        self.input_overflows = 0
+        self.input_underflows = 0
+        self._frames_recorded = 0
+        self._mute_bytes = 0
+        self._overflows_at_start = 0
+        self._underflows_at_start = 0
+
+    def audio_interface(self):
+        """
+        The PyAudio instance, created on first use: initializing PortAudio
+        probes every audio device, which can take a second or more. Shared
+        with the CuePlayer, so the devices are probed only once.
+        """
+        with self._init_lock:
+            if self._pyaudio is None:
+                self._pyaudio = _load_pyaudio().PyAudio()
+            return self._pyaudio
+
+    def warm_up(self):
+        """
+        Initialize the audio system ahead of the first recording (and open the
+        always-open input stream), e.g. on a background thread at startup.
+        """
+        self.audio_interface()
+        self.open_input()
+
+    def _open_stream(self):
+        kwargs = {}
+        if self.capture_mode == "callback":
+            self._queue.clear()
+            kwargs["stream_callback"] = self._on_audio
+        return self.audio_interface().open(
             format=self.format,
             channels=self.channels,
             rate=self.rate,
             input=True,
-            frames_per_buffer=self.chunk
+            frames_per_buffer=self.chunk,
+            **kwargs
         )
+
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        # Runs on PortAudio's thread: no blocking, no logging
+        if status & PA_INPUT_OVERFLOW:
+            self.input_overflows += 1
+        if status & PA_INPUT_UNDERFLOW:
+            self.input_underflows += 1
+        self._queue.append(in_data)
+        return None, PA_CONTINUE
+
+    def _read_chunk(self):
+        """
+        :return: next chunk of PCM, or None if none is available yet (callback mode)
+        """
+        if self.capture_mode != "callback":
+            return self._stream.read(self.chunk, exception_on_overflow=False)
+        try:
+            return self._queue.popleft()
+        except IndexError:
+            time.sleep(self.chunk / self.rate / 4)
+            return None
+
+    def _drain_queue(self):
+        while self._queue:
+            self._handle_chunk(self._queue.popleft())
+
+    def open_input(self):
+        """
+        Always-open mode: start the persistent input stream ahead of the first recording.
+        """
+        if not self.always_open or self._capture_thread:
+            return
+        preroll_chunks = int(self.preroll_ms / 1000.0 * self.rate / self.chunk)
+        self._preroll = deque(maxlen=max(preroll_chunks, 0))
+        logger.info(f"Opening input stream permanently (pre-roll {self.preroll_ms} ms).")
+        self._stream = self._open_stream()
+        self._capturing = True
+        self._capture_thread = Thread(target=self._capture, daemon=True)
+        self._capture_thread.start()
+
+    def start_recording(self, on_segment=None, mute_seconds=0.0, on_audio=None):
+        """
+        :param on_segment: optional callable receiving WAV bytes of each segment
+                           cut at a pause (requires `segmenter` to be set)
+        :param on_audio: optional callable receiving every chunk of PCM as it is
+                         recorded, pre-roll included; called on the capture thread
+        :param mute_seconds: replace the first seconds of live audio with silence
+                             (e.g. the start cue picked up by the microphone);
+                             pre-roll audio is kept
+        """
+        if self._is_recording:
+            logger.debug("Already recording!")
+            return
+
+        logger.info("Starting recording...")
+        if self.always_open and not self._capture_thread:
+            self.open_input()
+        self._buffer = codec.WavBuffer()
+        self._auto_stopped = None
+        self.last_upload = None
+        self._on_segment = on_segment if self.segmenter else None
+        self._chunk_listener = on_audio
+        self._segment_start = 0
+        if self._on_segment:
+            # Segments are short and sent as WAV; the full upload isn't needed
+            self.segmenter.reset()
+            self._encoder = None
+        else:
+            self._encoder = codec.create_encoder(self.upload_format, self.rate, self.channels)
+        self._frames_recorded = 0
+        self._mute_bytes = 0
+        self._overflows_at_start = self.input_overflows
+        self._underflows_at_start = self.input_underflows
+
+        if self._capture_thread:
+            # The stream is already running: start from the pre-roll, no device open
+            with self._lock:
+                for data in self._preroll:
+                    self._handle_chunk(data)
+                logger.debug(f"Recording starts with {len(self._preroll)} pre-roll chunks.")
+                self._preroll.clear()
+                self._mute_bytes = self._bytes_for(mute_seconds)
+                self._is_recording = True
+            return
+
+        self._mute_bytes = self._bytes_for(mute_seconds)
+        self._stream = self._open_stream()
         self._is_recording = True
         self._recording_thread = Thread(target=self._record)
         self._recording_thread.start()
 
+    def _bytes_for(self, seconds):
+        return int(seconds * self.rate) * 2 * self.channels
+
+    def _handle_chunk(self, data):
+        if self._mute_bytes:
+            muted = min(self._mute_bytes, len(data))
+            data = bytes(muted) + data[muted:]
+            self._mute_bytes -= muted
+        self._frames_recorded += len(data) // (2 * self.channels)
+        self._buffer.write(data)
+        if self._encoder:
+            self._encoder.write(data)
+        if self._chunk_listener:
+            self._chunk_listener(data)
+        if self._on_segment and self.segmenter.feed(data):
+            self._emit_segment()
+
+    def _max_time_reached(self):
+        # Count captured frames rather than wall-clock time, so gaps don't shorten the limit
+        if self._frames_recorded >= self.max_seconds * self.rate:
+            logger.info("Reached max recording time, stopping automatically.")
+            return True
+        return False
+
     def _record(self):
-        start_time = time.time()
         while self._is_recording:
-            data = self._stream.read(self.chunk, exception_on_overflow=False)
-            self._frames.append(data)
-            if (time.time() - start_time) >= self.max_seconds:
-                logger.info("Reached max recording time, stopping automatically.")
-                self.stop_recording()
+            data = self._read_chunk()
+            if data is None:
+                continue
+            self._handle_chunk(data)
+            if self._max_time_reached():
+                self._auto_stop()
                 break
 
+    def _capture(self):
+        failures = 0
+        while self._capturing:
+            try:
+                data = self._read_chunk()
+            except OSError as e:
+                failures += 1
+                if not self._recover_input(e, failures):
+                    self._abandon_input()
+                    return
+                continue
+            failures = 0
+            if data is None:
+                continue
+            with self._lock:
+                if self._is_recording:
+                    self._handle_chunk(data)
+                    stop = self._max_time_reached()
+                else:
+                    self._preroll.append(data)
+                    stop = False
+            if stop:
+                self._auto_stop()
+
+    def _recover_input(self, error, failures):
+        """
+        Wait after a failed read, reopening the stream every REOPEN_AFTER_FAILURES.
+        :return: False if capturing should stop
+        """
+        if failures == 1:
+            logger.warning(f"Input stream read failed: {error}")
+        if failures >= MAX_READ_FAILURES:
+            logger.error(f"Input stream still failing after {failures} reads ({error}), closing it.")
+            return False
+        time.sleep(min(READ_RETRY_DELAY * 2 ** (failures - 1), READ_RETRY_MAX_DELAY))
+        if failures % REOPEN_AFTER_FAILURES == 0 and self._capturing:
+            logger.warning(f"Reopening the input stream after {failures} failed reads.")
+            self._close_stream()
+            self._stream = None
+            try:
+                self._stream = self._open_stream()
+            except OSError as e:
+                logger.error(f"Cannot reopen the input stream: {e}")
+                return False
+        return True
+
+    def _abandon_input(self):
+        """
+        Capture thread giving up on a broken stream: end the current recording
+        and close the stream; the next recording opens the input again.
+        """
+        if self._is_recording:
+            self._auto_stop()
+        self._capturing = False
+        self._close_stream()
+        self._capture_thread = None
+
+    def _close_stream(self):
+        if self._stream is None:
+            return
+        try:
+            self._stream.stop_stream()
+            self._stream.close()
+        except OSError as e:
+            logger.debug(f"Closing the input stream failed: {e}")
+
+    def _auto_stop(self):
+        """
+        Stop from the recording/capture thread and keep the WAV for the next
+        stop_recording(). Left to a stop_recording() call already under way
+        (it may be waiting for this thread to end).
+        """
+        if not self._stop_lock.acquire(blocking=False):
+            return
+        try:
+            if self._is_recording:
+                self._auto_stopped = self._stop_recording()
+        finally:
+            self._stop_lock.release()
+
     def stop_recording(self):
+        """
+        :return: memoryview of the WAV recording (valid until the next recording),
+                 also after the recorder stopped itself at `max_seconds`; or None
+        """
+        with self._stop_lock:
+            return self._stop_recording()
+
+    def _stop_recording(self):
         if not self._is_recording:
-            logger.debug("Not recording right now.")
-            return None
+            wav_data, self._auto_stopped = self._auto_stopped, None
+            if wav_data is None:
+                logger.debug("Not recording right now.")
+            return wav_data
 
         logger.info("Stopping recording...")
-        self._is_recording = False
-        if self._recording_thread:
-            self._recording_thread.join()
+        start = time.perf_counter()
+        if self._capture_thread:
+            # Keep the stream running; the lock guarantees no chunk is half-handled
+            with self._lock:
+                self._is_recording = False
+        else:
+            self._is_recording = False
+            if self._recording_thread and self._recording_thread is not current_thread():
+                self._recording_thread.join()
+            self._stream.stop_stream()
+            self._stream.close()
+            # Chunks delivered by the callback after the reader thread exited
+            self._drain_queue()
+        self._chunk_listener = None
+
+        overflows = self.input_overflows - self._overflows_at_start
+        underflows = self.input_underflows - self._underflows_at_start
+        if overflows or underflows:
+            logger.warning(
+                f"Audio input glitches during recording: {overflows} overflow(s), "
+                f"{underflows} underflow(s) - some audio was dropped."
+            )
+
+        stopped = time.perf_counter()
 
-        self._stream.stop_stream()
-        self._stream.close()
+        if self._on_segment:
+            # Only the tail after the last pause is left to transcribe
+            self._emit_segment()
+            self._on_segment = None
 
-        wav_data = self._generate_wav_bytes(self._frames)
-        if self.save_recordings:
-            self._save_to_file(wav_data)
+        if self._encoder:
+            self.last_upload = self._encoder.finish()
+            self._encoder = None
+            logger.debug(f"Encoded upload: {self.last_upload[0]}, {len(self.last_upload[1])} bytes.")
+
+        wav_data = self._buffer.finish(
+            self.channels, self.audio_interface().get_sample_size(self.format), self.rate
+        )
+        self.last_timings = {
+            "stop_stream": stopped - start,
+            "finish_audio": time.perf_counter() - stopped,
+        }
 
         return wav_data
 
-    def _generate_wav_bytes(self, frames):
-        wav_buffer = io.BytesIO()
-        wf = wave.open(wav_buffer, 'wb')
-        wf.setnchannels(self.channels)
-        wf.setsampwidth(self._pyaudio.get_sample_size(self.format))
-        wf.setframerate(self.rate)
-        wf.writeframes(b''.join(frames))
-        wf.close()
-        wav_buffer.seek(0)
-        return wav_buffer.read()
-
-    def _save_to_file(self, wav_data):
-        timestamp = int(time.time())
-        filename = f"recording_{timestamp}.wav"
-        folder = os.path.join(os.path.dirname(__file__), "recordings")
-        os.makedirs(folder, exist_ok=True)
-        filepath = os.path.join(folder, filename)
-        with open(filepath, "wb") as f:
-            f.write(wav_data)
-        logger.info(f"Saved recording to {filepath}")
+    def _emit_segment(self):
+        end = len(self._buffer)
+        pcm = self._buffer.pcm(self._segment_start, end)
+        self._segment_start = end
+        has_speech = self.segmenter.has_speech
+        self.segmenter.reset()
+        if not pcm or not has_speech:
+            logger.debug("Skipping silent segment.")
+            return
+        logger.debug(f"Emitting segment of {len(pcm)} bytes.")
+        sample_width = self.audio_interface().get_sample_size(self.format)
+        self._on_segment(codec.wav_header(len(pcm), self.channels, sample_width, self.rate) + pcm)
 
     def terminate(self):
-        self._pyaudio.terminate()
+        if self._capture_thread:
+            self._capturing = False
+            if self._capture_thread is not current_thread():
+                self._capture_thread.join(timeout=1)
+            self._capture_thread = None
+            self._stream.stop_stream()
+            self._stream.close()
+        if self._pyaudio is not None:
+            self._pyaudio.terminate()
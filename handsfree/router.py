@@ -0,0 +1,200 @@
+# handsfree/router.py
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .codec import parse_wav
+from .transcriber import TranscriptionError
+
+logger = logging.getLogger(__name__)
+
+
+class Backend:
+    """
+    One transcription backend as seen by the router: a callable plus its
+    observed speed, tracked as an EWMA of the real-time factor
+    (processing seconds per second of audio).
+    """
+
+    def __init__(self, name, transcribe):
+        """
+        :param name: label for logs, e.g. the endpoint URL or "cli"
+        :param transcribe: callable(audio_data, upload=None) -> str, raising TranscriptionError
+        """
+        self.name = name
+        self.transcribe = transcribe
+        self.rtf = None
+        self.requests = 0
+        self.failures = 0
+        self.unhealthy_until = 0.0
+
+    def is_healthy(self, now=None):
+        return (now or time.monotonic()) >= self.unhealthy_until
+
+
+class TranscriptionRouter:
+    """
+    Sends each recording to the fastest healthy backend. If it hasn't answered
+    within a latency budget proportional to the audio length, a hedged copy goes
+    to the next backend and whichever result arrives first wins. A backend that
+    fails is skipped for `cooldown` seconds.
+    """
+
+    def __init__(
+        self,
+        backends,
+        alpha=0.3,
+        initial_rtf=0.5,
+        hedge_factor=2.0,
+        hedge_min_seconds=2.0,
+        cooldown=30.0
+    ):
+        """
+        :param backends: list of Backend, in order of preference for ties
+        :param alpha: EWMA smoothing factor for the real-time factor
+        :param initial_rtf: assumed real-time factor of a backend not measured yet
+        :param hedge_factor: budget = hedge_factor * expected latency of the primary
+        :param hedge_min_seconds: lower bound of the budget (fixed overhead of short clips)
+        :param cooldown: seconds a failed backend is avoided
+        """
+        if not backends:
+            raise ValueError("TranscriptionRouter needs at least one backend")
+        self.backends = list(backends)
+        self.alpha = alpha
+        self.initial_rtf = initial_rtf
+        self.hedge_factor = hedge_factor
+        self.hedge_min_seconds = hedge_min_seconds
+        self.cooldown = cooldown
+        self.hedges = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=2 * len(self.backends), thread_name_prefix="handsfree-router"
+        )
+
+    def _ranked(self):
+        now = time.monotonic()
+        with self._lock:
+            return sorted(
+                self.backends,
+                key=lambda b: (
+                    not b.is_healthy(now),
+                    b.rtf if b.rtf is not None else self.initial_rtf,
+                    self.backends.index(b),
+                ),
+            )
+
+    def _record(self, backend, elapsed, duration, ok):
+        with self._lock:
+            backend.requests += 1
+            if ok:
+                backend.unhealthy_until = 0.0
+                if duration > 0:
+                    rtf = elapsed / duration
+                    backend.rtf = rtf if backend.rtf is None else (
+                        self.alpha * rtf + (1 - self.alpha) * backend.rtf
+                    )
+            else:
+                backend.failures += 1
+                backend.unhealthy_until = time.monotonic() + self.cooldown
+
+    def _run(self, backend, audio_data, upload, duration):
+        start = time.monotonic()
+        try:
+            text = backend.transcribe(audio_data, upload=upload)
+        except Exception:
+            self._record(backend, time.monotonic() - start, duration, ok=False)
+            raise
+        elapsed = time.monotonic() - start
+        self._record(backend, elapsed, duration, ok=True)
+        logger.debug(f"Backend {backend.name}: {elapsed:.2f}s for {duration:.2f}s of audio.")
+        return text
+
+    def transcribe(self, audio_data, upload=None):
+        """
+        :param audio_data: WAV bytes or memoryview
+        :param upload: optional compressed copy, see transcribe_audio
+        :return: recognized text, or "" if every backend failed
+        """
+        channels, sample_width, rate, pcm = parse_wav(audio_data)
+        duration = len(pcm) / float(rate * channels * sample_width)
+
+        candidates = self._ranked()
+        pending = {}
+
+        def launch():
+            backend = candidates.pop(0)
+            future = self._executor.submit(self._run, backend, audio_data, upload, duration)
+            pending[future] = backend
+            return backend
+
+        primary = launch()
+        expected = (primary.rtf if primary.rtf is not None else self.initial_rtf) * duration
+        budget = max(self.hedge_min_seconds, self.hedge_factor * expected)
+        deadline = time.monotonic() + budget
+
+        while pending:
+            timeout = None
+            if candidates:
+                timeout = max(0.0, deadline - time.monotonic())
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Budget exceeded: hedge with the next backend, keep the first one running
+                with self._lock:
+                    self.hedges += 1
+                backend = launch()
+                logger.info(
+                    f"No answer within {budget:.1f}s, hedging request to {backend.name}."
+                )
+                deadline = time.monotonic() + budget
+                continue
+
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    return future.result()
+                except TranscriptionError as e:
+                    logger.warning(f"Backend {backend.name} failed: {e}")
+                except Exception:
+                    logger.exception(f"Backend {backend.name} crashed.")
+
+            if not pending and candidates:
+                launch()
+                deadline = time.monotonic() + budget
+
+        logger.error("All transcription backends failed.")
+        return ""
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hedges": self.hedges,
+                "backends": [
+                    {
+                        "name": b.name,
+                        "rtf": b.rtf,
+                        "requests": b.requests,
+                        "failures": b.failures,
+                        "healthy": b.is_healthy(),
+                    }
+                    for b in self.backends
+                ],
+            }
+
+
+def parse_endpoints(spec, model, api_key):
+    """
+    Parse a comma-separated list of API endpoints. Each entry is
+    `url[|model[|api_key]]`; missing parts fall back to the given defaults.
+    :return: list of (url, model, api_key)
+    """
+    endpoints = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, _, rest = entry.partition("|")
+        entry_model, _, entry_key = rest.partition("|")
+        endpoints.append((url.strip(), entry_model.strip() or model, entry_key.strip() or api_key))
+    return endpoints
@@ -0,0 +1,90 @@
+# handsfree/startup.py
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """
+    Wall time and newly imported modules of each startup phase, for
+    `--startup-profile`. Phases may run on different threads.
+    """
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._phases = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        modules_before = set(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            # Top-level packages imported during the phase (approximate when
+            # phases overlap on different threads)
+            new = {m.split(".")[0] for m in set(sys.modules) - modules_before}
+            with self._lock:
+                self._phases.append((name, start - self._start, end - start, sorted(new)))
+
+    def mark(self, name):
+        """
+        Record a point in time (e.g. "hotkey usable") without a duration.
+        """
+        with self._lock:
+            self._phases.append((name, time.perf_counter() - self._start, 0.0, []))
+
+    def report(self, out=None):
+        out = out or sys.stderr
+        with self._lock:
+            phases = sorted(self._phases, key=lambda p: p[1])
+        print("Startup profile (seconds since start):", file=out)
+        for name, at, duration, packages in phases:
+            line = f"  {at:7.3f}  {duration:7.3f}  {name}"
+            if packages:
+                shown = ", ".join(packages[:8]) + (", ..." if len(packages) > 8 else "")
+                line += f"  [imports: {shown}]"
+            print(line, file=out)
+        out.flush()
+
+
+class HotkeyGate:
+    """
+    Lets the hotkey listener run before the application exists: callbacks
+    fired early are queued and replayed, in order, once `open(app)` is called.
+    Presses arriving during the replay are queued behind the older ones.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._queued = []
+        self._lock = threading.Lock()
+
+    def bind(self, method_name):
+        def callback():
+            with self._lock:
+                if self._app is None:
+                    logger.info(f"Application still starting, deferring {method_name}.")
+                    self._queued.append(method_name)
+                    return
+                app = self._app
+            getattr(app, method_name)()
+
+        return callback
+
+    def open(self, app):
+        while True:
+            with self._lock:
+                if not self._queued:
+                    # Only now do callbacks go straight to the app
+                    self._app = app
+                    return
+                queued, self._queued = self._queued, []
+            for method_name in queued:
+                getattr(app, method_name)()
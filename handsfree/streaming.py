@@ -0,0 +1,133 @@
+# handsfree/streaming.py
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_rms(data):
+    """
+    Root-mean-square energy of a chunk of 16-bit mono PCM.
+    :param data: raw int16 PCM bytes
+    :return: RMS as float (0.0 for an empty chunk)
+    """
+    import numpy as np  # only needed in streaming mode; keeps startup light
+
+    samples = np.frombuffer(data, dtype=np.int16)
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(samples.astype(np.float32) ** 2)))
+
+
+class PauseSegmenter:
+    """
+    Decides where a running recording can be cut into segments.
+    A cut is suggested once the current segment is at least
+    `min_segment_seconds` long and the speaker has paused for `min_pause_ms`.
+    """
+
+    def __init__(self, rate, chunk, silence_threshold=500, min_pause_ms=600, min_segment_seconds=5.0):
+        self.silence_threshold = silence_threshold
+        self._min_pause_chunks = max(1, int(min_pause_ms / 1000.0 * rate / chunk))
+        self._min_segment_chunks = max(1, int(min_segment_seconds * rate / chunk))
+        self.reset()
+
+    def reset(self):
+        self._segment_chunks = 0
+        self._silent_run = 0
+        self.has_speech = False
+
+    def feed(self, data):
+        """
+        Account for one captured chunk.
+        :return: True if the segment should be cut right after this chunk
+        """
+        self._segment_chunks += 1
+        if chunk_rms(data) < self.silence_threshold:
+            self._silent_run += 1
+        else:
+            self._silent_run = 0
+            self.has_speech = True
+
+        return (
+            self.has_speech
+            and self._segment_chunks >= self._min_segment_chunks
+            and self._silent_run >= self._min_pause_chunks
+        )
+
+
+class SegmentPipeline:
+    """
+    Transcribes segments in the background while the recording is still running.
+    Segments are processed one at a time, in submission order, so the final
+    text can simply be joined.
+    """
+
+    def __init__(self, transcribe):
+        """
+        :param transcribe: callable taking WAV bytes and returning text
+        """
+        self._transcribe = transcribe
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="handsfree-segment")
+        self._futures = []
+
+    def submit(self, wav_data):
+        logger.debug(f"Queueing segment #{len(self._futures) + 1} for transcription.")
+        self._futures.append(self._executor.submit(self._transcribe, wav_data))
+
+    def finish(self):
+        """
+        Wait for all submitted segments and join their transcriptions in order.
+        :return: recognized text (str)
+        """
+        try:
+            parts = [future.result() for future in self._futures]
+        finally:
+            self._executor.shutdown(wait=False)
+        return " ".join(part for part in parts if part)
+
+    def cancel(self):
+        """
+        Drop segments that haven't started; a running one finishes in the background.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class DeltaCleaner:
+    """
+    Applies `clean_transcription` (strip, drop leading dashes) and optional
+    whitespace collapsing to text that arrives in pieces, so each piece can be
+    typed right away. Whitespace is held back until the next visible character:
+    the concatenated output equals cleaning the whole text at once.
+    """
+    _LEADING_SPACE, _LEADING_DASHES, _SPACE_AFTER_DASHES, _BODY = range(4)
+
+    def __init__(self, collapse_whitespace=False):
+        self.collapse_whitespace = collapse_whitespace
+        self._state = self._LEADING_SPACE
+        self._pending_space = ""
+
+    def feed(self, delta):
+        """
+        :return: text that is safe to type now (may be "")
+        """
+        out = []
+        for c in delta:
+            if self._state != self._BODY:
+                if c.isspace() and self._state != self._LEADING_DASHES:
+                    continue
+                if c == "-" and self._state in (self._LEADING_SPACE, self._LEADING_DASHES):
+                    self._state = self._LEADING_DASHES
+                    continue
+                if c.isspace():
+                    self._state = self._SPACE_AFTER_DASHES
+                    continue
+                self._state = self._BODY
+            if c.isspace():
+                self._pending_space += c
+                continue
+            if self._pending_space:
+                out.append(" " if self.collapse_whitespace else self._pending_space)
+                self._pending_space = ""
+            out.append(c)
+        return "".join(out)
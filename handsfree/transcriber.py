@@ -1,13 +1,52 @@
 # handsfree/transcriber.py
+import asyncio
+import json
 import re
 import requests
 import logging
 import os
 import subprocess
 import tempfile
+import threading
+
+from . import codec
+from .transport import HttpTransport
 
 logger = logging.getLogger(__name__)
 
+_LEADING_DASHES = re.compile(r'^[-]+\s*')
+
+# One keep-alive transport per (endpoint, key), shared by all recordings
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(whisper_url, api_key=""):
+    """
+    Return the pooled HttpTransport for this endpoint, creating it on first use.
+    """
+    key = (whisper_url, api_key)
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = HttpTransport(whisper_url, api_key=api_key)
+            _transports[key] = transport
+        return transport
+
+
+def close_transports():
+    with _transports_lock:
+        for transport in _transports.values():
+            transport.close()
+        _transports.clear()
+
+
+class TranscriptionError(Exception):
+    """
+    Raised by transcribe_audio(..., raise_errors=True) when a backend fails.
+    """
+
+
 def transcribe_audio(
     audio_data,
     whisper_url,
@@ -16,36 +55,46 @@ def transcribe_audio(
     language="en",
     mode="api",
     cli_command="whisper",
-    cli_args=""
+    cli_args="",
+    upload=None,
+    raise_errors=False,
+    timings=None
 ):
     """
-    :param audio_data: bytes (WAV)
-    :param whisper_url: e.g. http://localhost:8000/inference if mode=api
+    :param audio_data: bytes or memoryview (WAV)
+    :param whisper_url: e.g. http://localhost:8000/inference if mode=api or mode=server
     :param api_key: token if needed
     :param model: relevant for API or fallback
     :param language: relevant for API or fallback
-    :param mode: "api" or "cli"
+    :param mode: "api", "server" (resident whisper.cpp server on localhost) or "cli"
     :param cli_command: e.g. "x 127 x /path/to/whisper-cli"
     :param cli_args: e.g. "-l pl -nt -m /path/to/model.bin"
+    :param upload: optional (filename, bytes, content_type) compressed copy of audio_data
+                   to send in API mode; WAV is used if the server rejects it
+    :param raise_errors: raise TranscriptionError instead of logging and returning ""
+    :param timings: optional dict receiving this request's connect/upload/server
+                    timings (API and server mode)
     :return: recognized text (str)
     """
 
-    if mode == "api":
-        # -- REST API mode --
-        files = {
-            "file": ("recording.wav", audio_data, "audio/wav"),
-            "model": (None, model, "text"),
-            "language": (None, language, "text")
-        }
-        headers = {}
-        if api_key:
-            headers["Authorization"] = f"Bearer {api_key}"
-
-        data = {
+    if mode in ("api", "server"):
+        # -- REST API mode (remote endpoint or the local whisper.cpp server) --
+        if mode == "server":
+            # Upload size doesn't matter over localhost, and whisper.cpp only
+            # decodes WAV unless it was built with ffmpeg support
+            upload = None
+        wav_upload = ("recording.wav", audio_data, "audio/wav")
+        fields = {
+            "file": wav_upload,
+            "model": model,
+            "language": language
         }
 
         try:
-            resp = requests.post(whisper_url, headers=headers, files=files, data=data, timeout=120)
+            transport = get_transport(whisper_url, api_key)
+            resp = _post(transport, fields, upload)
+            if timings is not None:
+                timings.update(resp.timings)
             resp.raise_for_status()
             result = resp.json()
             transcription = result.get("transcription") or result.get("text") or ""
@@ -53,25 +102,15 @@ def transcribe_audio(
             logger.info(f"Transcription (API) result: {transcription}")
             return transcription
         except requests.exceptions.RequestException as e:
+            if raise_errors:
+                raise TranscriptionError(f"Error sending audio to Whisper server: {e}") from e
             logger.exception(f"Error sending audio to Whisper server: {e}")
             return ""
 
     elif mode == "cli":
         # -- Local CLI mode --
-        # 1. Write WAV to a temp file
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_wav:
-            tmp_wav.write(audio_data)
-            tmp_wav.flush()
-            tmp_wav_path = tmp_wav.name
-
-        logger.debug(f"Created temp WAV file at {tmp_wav_path}")
-
-        # 2. Build the command
-        command_parts = cli_command.split()     # e.g. ["x","127","x","/media/.../whisper-cli"]
-        extra_args = cli_args.split()           # e.g. ["-l","pl","-nt","-m","/path/to/model.bin"]
-        full_cmd = command_parts + extra_args + [tmp_wav_path]
-
-        logger.info(f"Running local whisper CLI: {' '.join(full_cmd)} (stderr -> /dev/null)")
+        tmp_wav_path = _write_temp_wav(audio_data)
+        full_cmd = _cli_command_line(cli_command, cli_args, tmp_wav_path)
 
         try:
             # We cannot use capture_output=True with a custom stderr=... 
@@ -87,23 +126,210 @@ def transcribe_audio(
             logger.info(f"Transcription (CLI) result: {transcription}")
             return transcription
 
-        except FileNotFoundError:
+        except FileNotFoundError as e:
+            if raise_errors:
+                raise TranscriptionError(f"Whisper CLI tool not found. Command: {cli_command}") from e
             logger.exception(f"Whisper CLI tool not found. Command: {cli_command}")
             return ""
         except subprocess.CalledProcessError as e:
+            if raise_errors:
+                raise TranscriptionError(f"Whisper CLI returned error: {e}") from e
             logger.exception(f"Whisper CLI returned error: {e}")
             return ""
         finally:
-            # 3. Clean up temp file
-            try:
-                os.remove(tmp_wav_path)
-            except OSError:
-                pass
+            _remove_temp_wav(tmp_wav_path)
 
     else:
+        if raise_errors:
+            raise TranscriptionError(f"Unknown mode: {mode}")
         logger.error(f"Unknown mode: {mode}")
         return ""
 
+def _write_temp_wav(audio_data):
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_wav:
+        tmp_wav.write(audio_data)
+    logger.debug(f"Created temp WAV file at {tmp_wav.name}")
+    return tmp_wav.name
+
+
+def _remove_temp_wav(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _cli_command_line(cli_command, cli_args, wav_path):
+    command_parts = cli_command.split()     # e.g. ["x","127","x","/media/.../whisper-cli"]
+    extra_args = cli_args.split()           # e.g. ["-l","pl","-nt","-m","/path/to/model.bin"]
+    full_cmd = command_parts + extra_args + [wav_path]
+    logger.info(f"Running local whisper CLI: {' '.join(full_cmd)} (stderr -> /dev/null)")
+    return full_cmd
+
+
+async def transcribe_cli_async(audio_data, cli_command="whisper", cli_args="", timeout=None):
+    """
+    CLI mode for an asyncio loop: the whisper process is killed as soon as the
+    coroutine is cancelled or `timeout` seconds have passed.
+    :raise TranscriptionError: if the CLI is missing, fails or times out
+    """
+    tmp_wav_path = _write_temp_wav(audio_data)
+    proc = None
+    try:
+        full_cmd = _cli_command_line(cli_command, cli_args, tmp_wav_path)
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *full_cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+        except FileNotFoundError as e:
+            raise TranscriptionError(f"Whisper CLI tool not found. Command: {cli_command}") from e
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout or None)
+        except asyncio.TimeoutError as e:
+            raise TranscriptionError(f"Whisper CLI did not finish within {timeout}s") from e
+        if proc.returncode:
+            raise TranscriptionError(f"Whisper CLI returned error: exit status {proc.returncode}")
+        transcription = clean_transcription(stdout.decode("utf-8", errors="replace"))
+        logger.info(f"Transcription (CLI) result: {transcription}")
+        return transcription
+    finally:
+        if proc is not None and proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+            logger.info("Whisper CLI process killed.")
+        _remove_temp_wav(tmp_wav_path)
+
+
+# Words in a 400/422 error that blame the audio itself rather than, say, the
+# model name or the language
+_FORMAT_ERROR_WORDS = ("format", "codec", "decode", "unsupported", "file type")
+
+
+def _rejects_format(resp, content_type):
+    """
+    :return: True if the error response says the server can't take `content_type`
+    """
+    if resp.status_code == 415:
+        return True
+    try:
+        error = resp.text.lower()
+    except requests.exceptions.RequestException:
+        return False
+    words = _FORMAT_ERROR_WORDS + (content_type.split("/")[-1],)
+    return any(word in error for word in words)
+
+
+def _post(transport, fields, upload, stream=False):
+    """
+    POST the recording, preferring the compressed `upload`. If that request is
+    refused (400, 415, 422), send the WAV in `fields` instead; only a refusal
+    of the format itself keeps the format off this transport for good.
+    """
+    if upload and upload[2] not in transport.rejected_formats:
+        resp = transport.post_multipart(dict(fields, file=upload), timeout=120, stream=stream)
+        if resp.status_code not in (400, 415, 422):
+            return resp
+        if _rejects_format(resp, upload[2]):
+            logger.warning(f"Server rejected {upload[2]} upload (HTTP {resp.status_code}), falling back to WAV.")
+            transport.rejected_formats.add(upload[2])
+        else:
+            logger.warning(f"{upload[2]} upload failed (HTTP {resp.status_code}: {resp.text[:200]}), retrying as WAV.")
+        resp.close()
+    return transport.post_multipart(fields, timeout=120, stream=stream)
+
+
+def open_streamed_upload(whisper_url, api_key, model="whisper-1", language="en", channels=1, sample_width=2,
+                         rate=16000):
+    """
+    Start a transcription request before the recording exists: the WAV header
+    (unknown length) goes out now, the caller `write()`s PCM chunks as they are
+    recorded and hands the upload to `finish_streamed_upload()` at the end.
+    :return: transport.StreamingUpload
+    """
+    transport = get_transport(whisper_url, api_key)
+    upload = transport.start_upload({"model": model, "language": language})
+    upload.write(codec.wav_header(None, channels, sample_width, rate))
+    return upload
+
+
+def finish_streamed_upload(upload):
+    """
+    Close the body of an `open_streamed_upload()` request and read the answer.
+    :return: recognized text (str)
+    :raise TranscriptionError: if the request failed or the server rejected it
+    """
+    try:
+        resp = upload.finish()
+        resp.raise_for_status()
+        result = resp.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        raise TranscriptionError(f"Streamed upload failed: {e}") from e
+    transcription = clean_transcription(result.get("transcription") or result.get("text") or "")
+    logger.info(f"Transcription (API, streamed upload) result: {transcription}")
+    return transcription
+
+
+def _sse_deltas(resp):
+    """
+    Text deltas from a server-sent-events transcription response. Understands
+    OpenAI's `transcript.text.delta` events and vLLM's chat-style
+    `choices[0].delta.content` chunks.
+    """
+    # chunk_size=None: hand over each chunk as soon as it arrives instead of
+    # waiting for 512 bytes
+    for line in resp.iter_lines(chunk_size=None):
+        if not line.startswith(b"data:"):
+            continue
+        data = line[len(b"data:"):].strip()
+        if data == b"[DONE]":
+            return
+        try:
+            event = json.loads(data)
+        except ValueError:
+            logger.debug(f"Ignoring malformed stream event: {data[:100]!r}")
+            continue
+        if isinstance(event.get("delta"), str):
+            delta = event["delta"]
+        elif event.get("choices"):
+            delta = (event["choices"][0].get("delta") or {}).get("content")
+        else:
+            # e.g. transcript.text.done repeats the whole text
+            continue
+        if delta:
+            yield delta
+
+
+def stream_transcription(audio_data, whisper_url, api_key, model="whisper-1", language="en", upload=None,
+                         timings=None):
+    """
+    Ask the endpoint for streamed output (`stream=true`) and yield the raw text
+    deltas as they arrive. A server that ignores the flag and answers with plain
+    JSON yields its whole text at once.
+    :param timings: optional dict receiving the request timings (up to the response headers)
+    :raise TranscriptionError: if the request fails
+    """
+    fields = {
+        "file": ("recording.wav", audio_data, "audio/wav"),
+        "model": model,
+        "language": language,
+        "stream": "true",
+    }
+    try:
+        transport = get_transport(whisper_url, api_key)
+        resp = _post(transport, fields, upload, stream=True)
+        if timings is not None:
+            timings.update(resp.timings)
+        with resp:
+            resp.raise_for_status()
+            if resp.headers.get("Content-Type", "").startswith("text/event-stream"):
+                yield from _sse_deltas(resp)
+            else:
+                result = resp.json()
+                yield result.get("transcription") or result.get("text") or ""
+    except requests.exceptions.RequestException as e:
+        raise TranscriptionError(f"Error streaming audio to Whisper server: {e}") from e
+
+
 def clean_transcription(text):
     """
     Cleans the transcription text by:
@@ -113,5 +339,5 @@ def clean_transcription(text):
     :return: cleaned text
     """
     text = text.strip()
-    text = re.sub(pattern=r'^[-]+\s*', repl='', string=text)
+    text = _LEADING_DASHES.sub('', text)
     return text
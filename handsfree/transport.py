@@ -0,0 +1,317 @@
+# handsfree/transport.py
+import logging
+import queue
+import threading
+import time
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class _TimedBody:
+    """
+    File-like multipart body that records when the HTTP client starts and
+    finishes reading it, which splits a request into connect/upload/server time.
+    """
+
+    def __init__(self, parts):
+        self._parts = [memoryview(part) for part in parts]
+        self._length = sum(part.nbytes for part in self._parts)
+        self._index = 0
+        self._offset = 0
+        self.first_read = None
+        self.last_read = None
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        now = time.perf_counter()
+        if self.first_read is None:
+            self.first_read = now
+        if self._index >= len(self._parts):
+            self.last_read = now
+            return b""
+
+        part = self._parts[self._index]
+        end = part.nbytes if size is None or size < 0 else min(part.nbytes, self._offset + size)
+        block = part[self._offset:end]
+        self._offset = end
+        if self._offset >= part.nbytes:
+            self._index += 1
+            self._offset = 0
+        return block
+
+
+def _file_header(boundary, name, filename, content_type):
+    return (
+        f"--{boundary}\r\n"
+        f"Content-Disposition: form-data; name=\"{name}\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: {content_type}\r\n\r\n".encode()
+    )
+
+
+def encode_multipart(fields, boundary=None):
+    """
+    Build a multipart/form-data body without copying the file payloads.
+    :param fields: dict of name -> str value or (filename, data, content_type)
+    :return: (list of body parts, content type header value)
+    """
+    boundary = boundary or uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        if isinstance(value, tuple):
+            filename, data, content_type = value
+            parts.append(_file_header(boundary, name, filename, content_type))
+            parts.append(data)
+            parts.append(b"\r\n")
+        else:
+            parts.append(
+                f"--{boundary}\r\n"
+                f"Content-Disposition: form-data; name=\"{name}\"\r\n\r\n"
+                f"{value}\r\n".encode()
+            )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return parts, f"multipart/form-data; boundary={boundary}"
+
+
+class UploadAborted(Exception):
+    """
+    Raised inside a StreamingUpload body to drop the request half-way.
+    """
+
+
+class StreamingUpload:
+    """
+    Multipart POST whose file part is still being produced: the request starts
+    right away and the body is sent with chunked transfer encoding as `write()`
+    supplies it, so `finish()` only has to send the last chunk and the closing
+    boundary before the server can answer. Created by `HttpTransport.start_upload()`.
+    """
+
+    _END = object()
+    _ABORT = object()
+
+    def __init__(self, transport, fields, file_field, filename, content_type, timeout=120):
+        boundary = uuid.uuid4().hex
+        parts, self._content_type = encode_multipart(fields, boundary)
+        # Everything but the closing boundary, then the open file part
+        self._head = b"".join(bytes(part) for part in parts[:-1])
+        self._head += _file_header(boundary, file_field, filename, content_type)
+        self._tail = f"\r\n--{boundary}--\r\n".encode()
+        self._transport = transport
+        self._timeout = timeout
+        self._queue = queue.SimpleQueue()
+        self._done = threading.Event()
+        self._response = None
+        self._error = None
+        self.bytes_sent = 0
+        self.timings = None
+        self._started = self._first_read = self._finished = self._last_read = None
+        self._thread = threading.Thread(target=self._run, name="handsfree-upload", daemon=True)
+        self._thread.start()
+
+    def _body(self):
+        self._first_read = time.perf_counter()
+        yield self._head
+        self.bytes_sent = len(self._head)
+        while True:
+            items = [self._queue.get()]
+            # Send whatever piled up (e.g. on a slow link) as one chunk
+            while not self._queue.empty() and items[-1] not in (self._END, self._ABORT):
+                items.append(self._queue.get())
+            if items[-1] is self._ABORT:
+                raise UploadAborted("upload aborted")
+            end = items[-1] is self._END
+            data = b"".join(items[:-1] if end else items)
+            if data:
+                yield data
+                self.bytes_sent += len(data)
+            if end:
+                break
+        yield self._tail
+        self.bytes_sent += len(self._tail)
+        self._last_read = time.perf_counter()
+
+    def _run(self):
+        self._started = time.perf_counter()
+        try:
+            # A generator body makes requests send `Transfer-Encoding: chunked`;
+            # it can't be replayed, so there is no retry here
+            resp = self._transport.session.post(
+                self._transport.url,
+                data=self._body(),
+                headers={"Content-Type": self._content_type},
+                timeout=self._timeout,
+            )
+            resp.content
+            self._response = resp
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._done.set()
+
+    def write(self, data):
+        """
+        Queue the next piece of the file part (any thread, never blocks).
+        """
+        self._queue.put(data)
+
+    def finish(self, timeout=None):
+        """
+        Send the closing boundary and wait for the answer.
+        :return: requests.Response
+        :raise requests.exceptions.RequestException: if the upload failed
+        """
+        self._finished = time.perf_counter()
+        self._queue.put(self._END)
+        if not self._done.wait(timeout):
+            raise requests.exceptions.Timeout(f"No answer from {self._transport.url} within {timeout}s")
+        if self._error is not None:
+            if isinstance(self._error, requests.exceptions.RequestException):
+                raise self._error
+            raise requests.exceptions.ConnectionError(f"Streamed upload failed: {self._error!r}") from self._error
+
+        end = time.perf_counter()
+        resp = self._response
+        headers_at = self._started + resp.elapsed.total_seconds()
+        last_read = self._last_read or self._finished
+        self.timings = {
+            "connect": (self._first_read or self._started) - self._started,
+            "upload": max(0.0, last_read - self._finished),
+            "server": max(0.0, headers_at - last_read),
+            "total": end - self._finished,
+            "bytes": self.bytes_sent,
+        }
+        logger.info(
+            "Streamed upload timings after stop: upload=%.3fs server=%.3fs total=%.3fs (%d bytes)",
+            self.timings["upload"],
+            self.timings["server"],
+            self.timings["total"],
+            self.timings["bytes"],
+        )
+        return resp
+
+    def abort(self):
+        """
+        Drop the request (the connection is closed, the server sees a broken body).
+        """
+        self._queue.put(self._ABORT)
+
+
+class HttpTransport:
+    """
+    Keep-alive HTTP session for one Whisper endpoint.
+    - `prewarm()` opens a connection ahead of the upload (e.g. when recording starts),
+    - `start_keepalive()` pings the endpoint periodically so it stays warm,
+    - `post_multipart()` reports connect/upload/server timings on each response
+      (`resp.timings`; the transport is shared by concurrent requests),
+    - `start_upload()` opens a POST whose file is streamed while it is produced.
+    """
+
+    def __init__(self, url, api_key="", pool_size=8):
+        self.url = url
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+        # Content types this endpoint refused; those uploads go straight to WAV
+        self.rejected_formats = set()
+        self._keepalive_stop = threading.Event()
+        self._keepalive_thread = None
+
+    def _ping(self):
+        try:
+            # Any answer (even 404/405) leaves an open connection in the pool
+            resp = self.session.head(self.url, timeout=5)
+            resp.content
+            return True
+        except requests.exceptions.RequestException as e:
+            logger.debug(f"Warm-up request to {self.url} failed: {e}")
+            return False
+
+    def prewarm(self):
+        """
+        Open a connection in the background so the upload doesn't pay for DNS/TCP/TLS.
+        """
+        t = threading.Thread(target=self._ping, daemon=True)
+        t.start()
+        return t
+
+    def start_keepalive(self, interval):
+        if interval <= 0 or self._keepalive_thread:
+            return
+
+        def loop():
+            while not self._keepalive_stop.wait(interval):
+                self._ping()
+
+        logger.info(f"Keeping {self.url} warm every {interval}s.")
+        self._keepalive_thread = threading.Thread(target=loop, daemon=True)
+        self._keepalive_thread.start()
+
+    def post_multipart(self, fields, timeout=120, stream=False):
+        """
+        :param fields: see `encode_multipart`
+        :param stream: return as soon as the headers arrive; the caller reads
+                       (or closes) the body
+        :return: requests.Response (body already read unless `stream`) with a
+                 `timings` dict: connect, upload, server, total (seconds), bytes
+        """
+        parts, content_type = encode_multipart(fields)
+        headers = {"Content-Type": content_type}
+
+        for attempt in (1, 2):
+            body = _TimedBody(parts)
+            start = time.perf_counter()
+            try:
+                resp = self.session.post(self.url, data=body, headers=headers, timeout=timeout, stream=stream)
+                break
+            except requests.exceptions.ConnectionError as e:
+                # A pooled keep-alive connection may have been closed by the server;
+                # retry once on a fresh one (but don't wait twice for a dead host)
+                if attempt == 2 or isinstance(e, requests.exceptions.ConnectTimeout):
+                    raise
+                logger.debug(f"Connection error, retrying once: {e}")
+
+        if not stream:
+            resp.content
+        end = time.perf_counter()
+
+        headers_at = start + resp.elapsed.total_seconds()
+        first_read = body.first_read or start
+        last_read = body.last_read or first_read
+        resp.timings = timings = {
+            "connect": first_read - start,
+            "upload": last_read - first_read,
+            "server": max(0.0, headers_at - last_read),
+            "total": end - start,
+            "bytes": len(body),
+        }
+        logger.info(
+            "API timings: connect=%.3fs upload=%.3fs server=%.3fs total=%.3fs (%d bytes)",
+            timings["connect"],
+            timings["upload"],
+            timings["server"],
+            timings["total"],
+            timings["bytes"],
+        )
+        return resp
+
+    def start_upload(self, fields, file_field="file", filename="recording.wav", content_type="audio/wav",
+                     timeout=120):
+        """
+        :param fields: the other (non-file) form fields, sent first
+        :return: StreamingUpload; `write()` the file data, then `finish()`
+        """
+        return StreamingUpload(self, fields, file_field, filename, content_type, timeout=timeout)
+
+    def close(self):
+        self._keepalive_stop.set()
+        self.session.close()
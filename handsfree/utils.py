@@ -1,10 +1,9 @@
 # handsfree/utils.py
-import pyautogui
 import logging
-import playsound
 import threading
 import platform
-import subprocess
+
+from .injection import TextInjector
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +12,8 @@ IS_LINUX = (platform.system().lower() == "linux")
 def play_sound(sound_path):
     def worker():
         try:
+            import playsound
+
             playsound.playsound(sound_path, block=True)
         except Exception as e:
             logger.warning(f"Unable to play sound {sound_path}: {e}")
@@ -21,21 +22,13 @@ def play_sound(sound_path):
     t.start()
     return t
 
-def type_text(text):
-    text = text or ""
-    if not text.strip():
-        return
+_injector = None
 
-    if IS_LINUX:
-        # Attempt xdotool
-        try:
-            logger.debug(f"Using xdotool to type text (length={len(text)}).")
-            subprocess.run(["xdotool", "type", "--clearmodifiers", text], check=True)
-        except FileNotFoundError:
-            logger.warning("xdotool not found! Falling back to pyautogui.")
-            pyautogui.typewrite(text)
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"xdotool error: {e}")
-    else:
-        logger.debug(f"Using pyautogui to type text (length={len(text)}).")
-        pyautogui.typewrite(text)
+def type_text(text):
+    """
+    Type `text` into the focused window with the default (automatic) TextInjector.
+    """
+    global _injector
+    if _injector is None:
+        _injector = TextInjector()
+    _injector.type_text(text)
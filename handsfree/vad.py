@@ -0,0 +1,82 @@
+# handsfree/vad.py
+import logging
+
+import numpy as np
+
+from .codec import WavBuffer, parse_wav
+
+logger = logging.getLogger(__name__)
+
+
+def _dilate(mask, radius):
+    """
+    Extend every True run in `mask` by `radius` elements on both sides.
+    """
+    if radius <= 0:
+        return mask
+    kernel = np.ones(2 * radius + 1, dtype=np.int32)
+    return np.convolve(mask.astype(np.int32), kernel, mode="same") > 0
+
+
+def frame_rms(samples, rate, frame_ms=30):
+    """
+    RMS energy of 16-bit mono samples per `frame_ms` frame (last partial frame included).
+    """
+    frame_len = max(1, int(rate * frame_ms / 1000))
+    n_frames = -(-samples.size // frame_len)
+    padded = np.zeros(n_frames * frame_len, dtype=np.float32)
+    padded[:samples.size] = samples
+    frames = padded.reshape(n_frames, frame_len)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+
+def speech_mask(samples, rate, threshold=500, frame_ms=30):
+    """
+    Energy-based voice activity detection over 16-bit mono samples.
+    :return: boolean array with one entry per `frame_ms` frame (last partial frame included)
+    """
+    return frame_rms(samples, rate, frame_ms) >= threshold
+
+
+def trim_silence(wav_data, threshold=500, frame_ms=30, padding_ms=200, max_pause_ms=0):
+    """
+    Cut leading/trailing silence and, optionally, shorten long pauses inside the recording.
+    :param wav_data: WAV bytes or memoryview (16-bit mono PCM)
+    :param threshold: RMS level below which a frame counts as silence
+    :param frame_ms: analysis frame length
+    :param padding_ms: silence kept before the first and after the last speech frame
+    :param max_pause_ms: longer internal pauses are shortened to this (0 = keep pauses)
+    :return: WAV memoryview (`wav_data` itself if nothing was cut), or None if there is no speech
+    """
+    channels, sample_width, rate, pcm = parse_wav(wav_data)
+
+    if channels != 1 or sample_width != 2:
+        logger.debug("Silence trimming supports only 16-bit mono audio, skipping.")
+        return wav_data
+
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    voiced = speech_mask(samples, rate, threshold=threshold, frame_ms=frame_ms)
+    if not voiced.any():
+        return None
+
+    voiced_idx = np.flatnonzero(voiced)
+    pad_frames = int(padding_ms / frame_ms)
+    keep = np.zeros_like(voiced)
+    keep[max(0, voiced_idx[0] - pad_frames):voiced_idx[-1] + pad_frames + 1] = True
+    if max_pause_ms > 0:
+        # A pause survives only within max_pause_ms / 2 of the speech on either side
+        keep &= _dilate(voiced, int(max_pause_ms / frame_ms) // 2)
+
+    if keep.all():
+        return wav_data
+
+    frame_len = max(1, int(rate * frame_ms / 1000))
+    sample_keep = np.repeat(keep, frame_len)[:samples.size]
+    trimmed = samples[sample_keep]
+    logger.debug(
+        f"Silence trimming: {samples.size / rate:.2f}s -> {trimmed.size / rate:.2f}s."
+    )
+
+    out = WavBuffer()
+    out.write(memoryview(trimmed).cast("B"))
+    return out.finish(channels, sample_width, rate)
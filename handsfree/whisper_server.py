@@ -0,0 +1,145 @@
+# handsfree/whisper_server.py
+import logging
+import subprocess
+import threading
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class WhisperServer:
+    """
+    Keeps a whisper.cpp `whisper-server` process running for the lifetime of the app,
+    so the model is loaded once instead of on every recording:
+    - `start()` spawns the process and a monitor thread,
+    - the monitor health-checks it and restarts it if it dies or stops answering,
+    - `stop()` shuts it down.
+    """
+
+    def __init__(
+        self,
+        command="whisper-server",
+        args="",
+        host="127.0.0.1",
+        port=8178,
+        health_interval=5.0,
+        max_failed_checks=3
+    ):
+        """
+        :param command: e.g. "/path/to/whisper.cpp/build/bin/whisper-server"
+        :param args: e.g. "-m /path/to/ggml-large-v3.bin -l pl"
+        :param host: interface to bind (keep it on localhost)
+        :param port: port to listen on
+        :param health_interval: seconds between health checks
+        :param max_failed_checks: consecutive failed checks before a restart
+        """
+        self.command = command
+        self.args = args
+        self.host = host
+        self.port = port
+        self.health_interval = health_interval
+        self.max_failed_checks = max_failed_checks
+
+        self._process = None
+        self._ready = threading.Event()
+        self._stopping = threading.Event()
+        self._monitor_thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def url(self):
+        return f"{self.base_url}/inference"
+
+    def start(self):
+        if self._monitor_thread:
+            return
+        self._spawn()
+        self._monitor_thread = threading.Thread(target=self._monitor, daemon=True)
+        self._monitor_thread.start()
+
+    def _spawn(self):
+        cmd = self.command.split() + self.args.split() + ["--host", self.host, "--port", str(self.port)]
+        logger.info(f"Starting whisper server: {' '.join(cmd)}")
+        self._ready.clear()
+        try:
+            self._process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        except FileNotFoundError:
+            logger.error(f"Whisper server binary not found. Command: {self.command}")
+            self._process = None
+
+    def is_healthy(self):
+        try:
+            resp = requests.get(f"{self.base_url}/health", timeout=2)
+        except requests.exceptions.RequestException:
+            return False
+        # Older whisper.cpp builds have no /health route; any answer means it's up.
+        # 503 means the model is still loading.
+        return resp.status_code != 503 and resp.status_code < 500
+
+    def wait_ready(self, timeout=None):
+        """
+        Block until the server answers health checks.
+        :return: True if ready, False on timeout
+        """
+        return self._ready.wait(timeout)
+
+    def _monitor(self):
+        failed_checks = 0
+        while not self._stopping.is_set():
+            if self._process is None or self._process.poll() is not None:
+                if self._process is not None:
+                    logger.warning(
+                        f"Whisper server exited with code {self._process.returncode}, restarting."
+                    )
+                self._spawn()
+                failed_checks = 0
+            elif self.is_healthy():
+                if not self._ready.is_set():
+                    logger.info(f"Whisper server ready at {self.base_url}.")
+                    self._ready.set()
+                failed_checks = 0
+            elif self._ready.is_set():
+                failed_checks += 1
+                if failed_checks >= self.max_failed_checks:
+                    logger.warning("Whisper server stopped responding, restarting.")
+                    self._kill()
+                    self._spawn()
+                    failed_checks = 0
+
+            # Poll quickly while the model loads; otherwise (ready, or crashing on
+            # start-up) settle to the regular interval
+            loading = (
+                self._process is not None
+                and self._process.poll() is None
+                and not self._ready.is_set()
+            )
+            self._stopping.wait(0.2 if loading else self.health_interval)
+
+    def _kill(self):
+        process, self._process = self._process, None
+        self._ready.clear()
+        if process is None or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def stop(self):
+        logger.info("Stopping whisper server...")
+        self._stopping.set()
+        if self._monitor_thread:
+            self._monitor_thread.join(timeout=5)
+            self._monitor_thread = None
+        self._kill()
@@ -0,0 +1,131 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--perf", action="store_true",
+        help="run the performance regression tests (tests/test_perf.py) against the baseline",
+    )
+    parser.addoption(
+        "--update-perf-baseline", action="store_true",
+        help="run the performance regression tests and rewrite tests/perf_baseline.json",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "perf: end-to-end performance regression test (opt-in, see --perf)")
+
+
+def pytest_collection_modifyitems(config, items):
+    # The baseline was measured on one machine: only compare against it on request
+    if config.getoption("--perf") or config.getoption("--update-perf-baseline"):
+        return
+    skip = pytest.mark.skip(reason="performance test, run with --perf")
+    for item in items:
+        if "perf" in item.keywords:
+            item.add_marker(skip)
+
+
+class _StubWhisperHandler(BaseHTTPRequestHandler):
+    """
+    Minimal OpenAI-style /v1/audio/transcriptions endpoint. Behaviour is
+    controlled by attributes on the server (see `stub_server`).
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(405)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+            return self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.chunked_requests += 1
+        body = bytearray()
+        while True:
+            size = int(self.rfile.readline().split(b";")[0], 16)
+            if not size:
+                while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                    pass
+                return bytes(body)
+            body += self.rfile.read(size)
+            self.rfile.readline()
+            self.server.received = len(body)
+
+    def do_POST(self):
+        body = self._read_body()
+        self.server.bodies.append((self.headers["Content-Type"], body))
+        if b'name="file"' not in body or b'name="model"' not in body:
+            self._reply(400, {"error": "missing multipart field"})
+            return
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        reply = self.server.fail_next.pop(0) if self.server.fail_next else None
+        if reply:
+            self._reply(*reply)
+            return
+        if any(f"Content-Type: {ct}".encode() in body for ct in self.server.reject_types):
+            self._reply(415, {"error": "unsupported format"})
+            return
+        if self.server.stream_deltas is not None and b'name="stream"\r\n\r\ntrue' in body:
+            self._stream(self.server.stream_deltas)
+            return
+        self._reply(200, {"text": self.server.text})
+
+    def _stream(self, deltas):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def chunk(data):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        for delta in deltas:
+            event = {"type": "transcript.text.delta", "delta": delta}
+            chunk(f"data: {json.dumps(event)}\n\n".encode())
+            time.sleep(self.server.stream_interval)
+        chunk(b"data: [DONE]\n\n")
+        chunk(b"")
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubWhisperHandler)
+    server.connections = 0
+    server.bodies = []
+    server.chunked_requests = 0
+    server.received = 0  # bytes of the chunked body read so far
+    server.reject_types = set()
+    server.fail_next = []  # (status, payload) replies for the next requests, None = normal
+    server.text = "ok"
+    server.delay = 0.0
+    server.stream_deltas = None  # list of text deltas -> answer stream=true with SSE
+    server.stream_interval = 0.0
+    server.url = f"http://127.0.0.1:{server.server_port}/v1/audio/transcriptions"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+
+from handsfree import codec
+from handsfree.archive import RecordingArchive
+
+pytest.importorskip("soundfile")
+
+
+def _wav(seconds, rate=16000, seed=0):
+    samples = np.random.default_rng(seed).integers(-3000, 3000, int(rate * seconds), dtype=np.int16)
+    pcm = samples.tobytes()
+    return codec.wav_header(len(pcm), 1, 2, rate) + pcm
+
+
+def test_archive_compresses_and_indexes(tmp_path):
+    archive = RecordingArchive(str(tmp_path), fmt="flac")
+    wav = _wav(1.0)
+    first = archive.add(wav)
+    second = archive.add(_wav(0.5, seed=1), upload=("recording.flac", b"gotowy flac", "audio/flac"))
+    assert first != second
+    archive.update(first, transcript="Ala ma kota", backend="api", latency=0.8)
+    archive.flush()
+
+    row = archive.get(first)
+    assert row["format"] == "flac" and row["file"].endswith(".flac")
+    assert row["duration"] == 1.0
+    assert (row["transcript"], row["backend"], row["latency"]) == ("Ala ma kota", "api", 0.8)
+    assert row["bytes"] < len(wav)
+    # Kopia zakodowana podczas nagrywania jest zapisywana bez ponownego kodowania
+    with open(archive.path(second), "rb") as f:
+        assert f.read() == b"gotowy flac"
+
+    assert [r["id"] for r in archive.recent()] == [second, first]
+    assert [r["id"] for r in archive.recent(search="kota")] == [first]
+    assert archive.load_wav(first) == wav
+    archive.close()
+
+
+def test_writer_survives_a_bad_item(tmp_path):
+    archive = RecordingArchive(str(tmp_path), fmt="wav")
+    bad = archive.add(None)
+    good = archive.add(_wav(0.5))
+    archive.flush()
+
+    assert archive.get(bad) is None
+    assert archive.get(good)["duration"] == 0.5
+    archive.close()
+
+
+def test_size_cap_evicts_oldest(tmp_path):
+    archive = RecordingArchive(str(tmp_path), fmt="wav", max_bytes=2 * 32044 + 100)
+    ids = [archive.add(_wav(1.0, seed=i)) for i in range(3)]
+    archive.flush()
+    archive.close()
+
+    assert [r["id"] for r in archive.recent()] == [ids[2], ids[1]]
+    assert archive.get(ids[0]) is None
+    assert sorted(n for n in os.listdir(tmp_path) if n.endswith(".wav")) == sorted([f"{ids[1]}.wav", f"{ids[2]}.wav"])
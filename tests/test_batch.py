@@ -0,0 +1,61 @@
+import io
+import json
+import sys
+
+from handsfree.batch import collect_files, run_batch
+from handsfree.codec import wav_header
+from handsfree.transcriber import close_transports
+
+
+def _write_wav(path, seconds=0.5, rate=16000):
+    pcm = bytes(int(rate * seconds) * 2)
+    path.write_bytes(wav_header(len(pcm), 1, 2, rate) + pcm)
+    return str(path)
+
+
+def _api_kwargs(url):
+    return dict(whisper_url=url, api_key="", model="m", language="pl", mode="api")
+
+
+def test_collect_files_expands_directories(tmp_path):
+    (tmp_path / "sub").mkdir()
+    a = _write_wav(tmp_path / "a.wav")
+    b = _write_wav(tmp_path / "sub" / "b.WAV")
+    (tmp_path / "notes.txt").write_text("-")
+    assert collect_files([str(tmp_path)]) == [a, b]
+
+
+def test_batch_api_streams_jsonl_and_reports_throughput(tmp_path, stub_server):
+    stub_server.text = "- Ala ma kota"
+    files = [_write_wav(tmp_path / f"rec_{i}.wav") for i in range(5)]
+    files.append(str(tmp_path / "missing.wav"))
+    out = io.StringIO()
+    try:
+        summary = run_batch(files, _api_kwargs(stub_server.url), workers=3, out=out)
+    finally:
+        close_transports()
+
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert sorted(r["file"] for r in results) == sorted(files)
+    ok = [r for r in results if not r["error"]]
+    assert len(ok) == 5
+    assert all(r["text"] == "Ala ma kota" and r["duration"] == 0.5 for r in ok)
+    assert summary["files"] == 6
+    assert summary["failed"] == 1
+    assert summary["audio_seconds"] == 2.5
+
+
+def test_batch_cli_uses_process_pool(tmp_path):
+    script = tmp_path / "fake_whisper.py"
+    script.write_text("import sys\nprint('  plik ' + sys.argv[-1].rsplit('.', 1)[-1])\n")
+    files = [_write_wav(tmp_path / f"rec_{i}.wav") for i in range(3)]
+    kwargs = dict(
+        whisper_url="", api_key="", mode="cli",
+        cli_command=f"{sys.executable} {script}", cli_args="",
+    )
+    out = io.StringIO()
+    summary = run_batch(files, kwargs, workers=2, use_processes=True, out=out)
+
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["text"] for r in results] == ["plik wav"] * 3
+    assert summary["failed"] == 0
@@ -0,0 +1,47 @@
+import os
+import time
+
+from handsfree.cache import TranscriptionCache, cache_key
+from handsfree.codec import wav_header
+
+
+def _wav(pcm, rate=16000):
+    return wav_header(len(pcm), 1, 2, rate) + pcm
+
+
+def test_key_depends_on_samples_and_settings_not_header():
+    pcm = b"\x01\x02" * 100
+    key = cache_key(_wav(pcm), "large", "pl", "api")
+    assert key == cache_key(memoryview(_wav(pcm)), "large", "pl", "api")
+    assert key != cache_key(_wav(pcm + b"\x00\x00"), "large", "pl", "api")
+    assert key != cache_key(_wav(pcm), "large", "en", "api")
+    assert key != cache_key(_wav(pcm), "large", "pl", "cli")
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    cache = TranscriptionCache(str(tmp_path), memory_entries=1)
+    cache.put("a", "Ala ma kota")
+    cache.put("b", "Kot ma Alę")
+
+    assert cache.get("b") == "Kot ma Alę"   # pamięć
+    assert cache.get("a") == "Ala ma kota"  # dysk (wypchnięte z pamięci)
+    assert cache.get("c") is None
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+
+    # Nowa instancja widzi wpisy zapisane na dysku
+    assert TranscriptionCache(str(tmp_path)).get("b") == "Kot ma Alę"
+
+
+def test_disk_store_evicts_least_recently_used(tmp_path):
+    cache = TranscriptionCache(str(tmp_path), max_bytes=250, memory_entries=0)
+    for i, key in enumerate(["old", "used", "new"]):
+        cache.put(key, "x" * 100)
+        # Różne mtime, niezależnie od rozdzielczości zegara systemu plików
+        os.utime(tmp_path / f"{key}.txt", (time.time() - 100 + i, time.time() - 100 + i))
+    cache.get("used")
+    cache.put("newest", "x" * 100)
+
+    remaining = sorted(p.name for p in tmp_path.iterdir())
+    assert remaining == ["newest.txt", "used.txt"]
+    assert cache.stats()["disk_bytes"] <= 250
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import numpy as np
+
+from handsfree.chunking import ChunkedTranscriber, split_points, split_wav, stitch
+from handsfree.codec import parse_wav, wav_header
+
+RATE = 16000
+
+
+def _speech(seconds, pauses=()):
+    """
+    Szum o wysokiej energii z ciszą w podanych sekundach.
+    """
+    samples = np.random.default_rng(0).integers(-4000, 4000, int(seconds * RATE), dtype=np.int16)
+    for start in pauses:
+        samples[int(start * RATE):int((start + 0.3) * RATE)] = 0
+    return samples
+
+
+def _wav(samples):
+    pcm = samples.tobytes()
+    return wav_header(len(pcm), 1, 2, RATE) + pcm
+
+
+def test_cuts_land_in_pauses():
+    samples = _speech(75, pauses=(27.0, 52.0))
+    cuts = [c / RATE for c in split_points(samples, RATE, chunk_seconds=30, search_seconds=5)]
+    assert len(cuts) == 2
+    assert 27.0 <= cuts[0] <= 27.3
+    assert 52.0 <= cuts[1] <= 52.3
+
+
+def test_split_wav_overlaps_chunks():
+    samples = _speech(70, pauses=(28.0, 57.0))
+    chunks = split_wav(_wav(samples), chunk_seconds=30, overlap_seconds=1.0)
+    durations = [len(parse_wav(c)[3]) / 2 / RATE for c in chunks]
+    assert len(chunks) == 3
+    assert sum(durations) == 70 + 2.0  # dwa zakładki po 1 s
+    # Krótkie nagranie zostaje w całości
+    short = _wav(_speech(20))
+    assert split_wav(short, chunk_seconds=30) == [short]
+
+
+def test_stitch_removes_repeated_words():
+    assert stitch(["Ala ma kota,", "kota i psa.", "Koniec"]) == "Ala ma kota, i psa. Koniec"
+    assert stitch(["jeden dwa", "", "trzy"]) == "jeden dwa trzy"
+
+
+def test_chunks_are_transcribed_concurrently_and_in_order():
+    running = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def label(audio_data):
+        # Początki fragmentów to cisza, więc etykieta z końcowych próbek
+        return "/".join(map(str, np.frombuffer(parse_wav(audio_data)[3], dtype=np.int16)[-3:]))
+
+    def transcribe(audio_data, upload=None):
+        with lock:
+            running.append(1)
+            peak[0] = max(peak[0], len(running))
+        time.sleep(0.3)
+        with lock:
+            running.pop()
+        return label(audio_data)
+
+    chunker = ChunkedTranscriber(transcribe, fan_out=4, chunk_seconds=10, overlap_seconds=0.0)
+    audio = _wav(_speech(38, pauses=(9.5, 19.5, 29.5)))
+    assert chunker.should_split(audio)
+
+    start = time.perf_counter()
+    text = chunker.transcribe(audio)
+    elapsed = time.perf_counter() - start
+    chunker.close()
+
+    chunks = split_wav(audio, chunk_seconds=10, overlap_seconds=0.0, search_seconds=2.5)
+    assert text == " ".join(label(c) for c in chunks)
+    assert len(chunks) == 4 and peak[0] == 4
+    assert elapsed < 0.6
@@ -0,0 +1,91 @@
+import io
+
+import numpy as np
+import pytest
+
+from handsfree import codec
+from handsfree.transcriber import close_transports, transcribe_audio
+
+soundfile = pytest.importorskip("soundfile")
+
+RATE = 16000
+
+
+def _tone(seconds):
+    t = np.arange(int(RATE * seconds))
+    return (np.sin(t / 10.0) * 8000).astype(np.int16)
+
+
+@pytest.mark.parametrize("fmt,content_type", [("flac", "audio/flac"), ("opus", "audio/ogg")])
+def test_stream_encoder_compresses_incrementally(fmt, content_type):
+    pcm = _tone(2.0)
+    encoder = codec.create_encoder(fmt, RATE, 1)
+    for i in range(0, len(pcm), 1024):
+        encoder.write(pcm[i:i + 1024].tobytes())
+    filename, data, mime = encoder.finish()
+
+    assert mime == content_type
+    assert len(data) < pcm.nbytes / 2
+    decoded, rate = soundfile.read(io.BytesIO(data), dtype="int16")
+    assert rate == RATE
+    assert abs(len(decoded) - len(pcm)) < RATE // 10
+
+
+@pytest.mark.parametrize("fmt", ["wav", "WAV", "mp3", None])
+def test_create_encoder_returns_none_for_plain_wav(fmt):
+    assert codec.create_encoder(fmt, RATE, 1) is None
+
+
+def test_rejected_format_falls_back_to_wav(stub_server):
+    stub_server.reject_types.add("audio/flac")
+    upload = ("recording.flac", b"fLaC-data", "audio/flac")
+    try:
+        for _ in range(2):
+            text = transcribe_audio(b"RIFF-data", stub_server.url, api_key="", upload=upload)
+            assert text == "ok"
+    finally:
+        close_transports()
+
+    # flac, wav retry, then straight to wav for the rest of the session
+    sent = [b"audio/flac" in body for _, body in stub_server.bodies]
+    assert sent == [True, False, False]
+
+
+def test_other_client_errors_do_not_blacklist_format(stub_server):
+    upload = ("recording.flac", b"fLaC-data", "audio/flac")
+    stub_server.fail_next = [
+        (422, {"error": "language 'xx' is not supported"}),
+        None,
+        (400, {"error": "Invalid file format: could not decode audio"}),
+    ]
+    try:
+        for _ in range(3):
+            assert transcribe_audio(b"RIFF-data", stub_server.url, api_key="", upload=upload) == "ok"
+    finally:
+        close_transports()
+
+    # Błąd języka: jednorazowo WAV; błąd formatu: odtąd tylko WAV
+    sent = [b"audio/flac" in body for _, body in stub_server.bodies]
+    assert sent == [True, False, True, False, False]
+
+
+def test_wav_buffer_grows_and_matches_wave_module():
+    import wave
+
+    pcm = _tone(0.5).tobytes()
+    buf = codec.WavBuffer()
+    for i in range(0, len(pcm), 2048):
+        buf.write(pcm[i:i + 2048])
+    assert len(buf) == len(pcm)
+    assert buf.pcm(10, 20) == pcm[10:20]
+
+    view = buf.finish(1, 2, RATE)
+    assert isinstance(view, memoryview)
+    with wave.open(io.BytesIO(view), "rb") as wf:
+        assert (wf.getnchannels(), wf.getsampwidth(), wf.getframerate()) == (1, 2, RATE)
+        assert wf.readframes(wf.getnframes()) == pcm
+
+    channels, sample_width, rate, data = codec.parse_wav(view)
+    assert (channels, sample_width, rate) == (1, 2, RATE)
+    assert data.obj is view.obj
+    assert data == pcm
@@ -0,0 +1,215 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from handsfree.app import HandsfreeApp
+from handsfree.codec import wav_header
+from handsfree.config import load_config
+from handsfree.control import send_command
+from handsfree.headless import HeadlessGUI
+from handsfree.recorder import Recorder
+from handsfree.transcriber import close_transports
+
+
+class _FakeRecorder:
+    """
+    Nagrywarka bez PyAudio: zwraca sekundę ciszy.
+    """
+    rate = 16000
+    channels = 1
+    segmenter = None
+
+    def __init__(self):
+        self.last_timings = {}
+        self.last_upload = None
+
+    def audio_interface(self):
+        raise OSError("no audio device in tests")
+
+    def start_recording(self, on_segment=None, mute_seconds=0.0, on_audio=None):
+        pass
+
+    def stop_recording(self):
+        pcm = bytes(32000)
+        return wav_header(len(pcm), 1, 2, 16000) + pcm
+
+    def warm_up(self):
+        pass
+
+    def terminate(self):
+        pass
+
+
+class _ToneStream:
+    """
+    Blokujący strumień wejściowy bez mikrofonu: stały, niecichy sygnał.
+    """
+
+    def read(self, n, exception_on_overflow=True):
+        time.sleep(0.001)
+        return b"\x10\x00" * n
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _ToneAudio:
+    def open(self, **kwargs):
+        return _ToneStream()
+
+    def get_sample_size(self, fmt):
+        return 2
+
+    def terminate(self):
+        pass
+
+
+def _config(stub_server, **overrides):
+    config = load_config()
+    config.update(
+        WHISPER_MODE="api",
+        WHISPER_URL=stub_server.url,
+        API_KEY="",
+        SAVE_RECORDINGS=False,
+        STREAMING_TRANSCRIPTION=False,
+        STREAMING_UPLOAD=False,
+        STREAMING_RESPONSE=False,
+        CHUNKED_TRANSCRIPTION=False,
+        VAD_TRIM=False,
+        CACHE_ENABLED=False,
+        WHISPER_PREWARM=False,
+        TYPE_START_DELAY=0,
+        SOUND_START="",
+        SOUND_STOP="",
+        METRICS_FILE="",
+        REPLACEMENTS_FILE="",
+        CAPTURE_MODE="blocking",
+        MIC_ALWAYS_OPEN=False,
+    )
+    config.update(overrides)
+    return config
+
+
+@pytest.fixture
+def headless_app(stub_server, tmp_path):
+    config = _config(stub_server)
+    typed = []
+    gui = HeadlessGUI()
+    app = HandsfreeApp(config, recorder=_FakeRecorder(), gui=gui, type_text=typed.append)
+    path = str(tmp_path / "handsfree.sock")
+    app.start_control(path, on_quit=gui.request_close)
+    yield app, path, typed
+    app.shutdown()
+    close_transports()
+
+
+def test_headless_mode_loads_no_gui_toolkit():
+    code = (
+        "import sys; import handsfree.app, handsfree.control, handsfree.headless; "
+        "print(sorted(m for m in ('tkinter', 'gi', 'pynput') if m in sys.modules))"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=root).stdout
+    assert out.strip() == "[]"
+
+
+def test_dictation_through_control_socket(headless_app, stub_server):
+    app, path, typed = headless_app
+    stub_server.text = "Ala ma kota"
+
+    assert send_command(path, "status") == {"ok": True, "state": "IDLE", "recording": False, "busy": False}
+    assert send_command(path, "start") == {"ok": True, "state": "RECORDING"}
+    # Drugi start nic nie zmienia
+    assert send_command(path, "start")["state"] == "RECORDING"
+    assert send_command(path, "stop")["ok"]
+
+    deadline = time.monotonic() + 5
+    while send_command(path, "status")["state"] != "IDLE" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert typed == ["Ala ma kota"]
+    assert send_command(path, "last")["text"] == "Ala ma kota"
+    stats = send_command(path, "stats")
+    assert stats["metrics"]["total"]["count"] == 1
+    # Etapy żądania HTTP z odpowiedzi tego żądania
+    assert all(stats["metrics"][stage]["count"] == 1 for stage in ("connect", "upload", "inference"))
+    assert send_command(path, "bogus")["ok"] is False
+
+
+def test_recording_stopped_at_time_limit_is_kept(stub_server, tmp_path):
+    config = _config(
+        stub_server, SAVE_RECORDINGS=True, ARCHIVE_DIR=str(tmp_path), ARCHIVE_FORMAT="wav", MAX_RECORD_SECONDS=0.2
+    )
+    stub_server.text = "Ala ma kota"
+    typed = []
+    recorder = Recorder(max_seconds=0.2, audio_interface=_ToneAudio())
+    app = HandsfreeApp(config, recorder=recorder, gui=HeadlessGUI(), type_text=typed.append)
+    try:
+        app.on_start().result(timeout=5)
+        # Nagrywarka sama kończy nagranie po MAX_RECORD_SECONDS, użytkownik naciska stop później
+        deadline = time.monotonic() + 5
+        while recorder._is_recording and time.monotonic() < deadline:
+            time.sleep(0.01)
+        app.on_stop().result(timeout=5)
+        # Transkrypcja trafia do archiwum po wpisaniu tekstu
+        while not app.archive.recent(search="kota") and time.monotonic() < deadline:
+            app.archive.flush()
+            time.sleep(0.01)
+
+        assert typed == ["Ala ma kota"]
+        assert len(stub_server.bodies) == 1
+        [row] = app.archive.recent()
+        assert row["duration"] >= 0.2 and row["transcript"] == "Ala ma kota"
+    finally:
+        app.shutdown()
+        close_transports()
+
+
+def test_plain_text_requests_and_round_trip(headless_app):
+    app, path, _ = headless_app
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        replies = sock.makefile("rb")
+        # Zwykła linia tekstu, jak z `echo status | socat ...`
+        sock.sendall(b"status\n")
+        assert json.loads(replies.readline())["state"] == "IDLE"
+        sock.sendall(b"{nie json\n")
+        assert json.loads(replies.readline())["ok"] is False
+        sock.sendall(b'{"cmd": "status"}\n')
+        assert json.loads(replies.readline())["ok"] is True
+
+
+def test_oversized_request_is_refused(headless_app):
+    app, path, _ = headless_app
+    assert os.stat(path).st_mode & 0o077 == 0
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        replies = sock.makefile("rb")
+        sock.sendall(b"x" * 100000 + b"\n")
+        assert json.loads(replies.readline()) == {"ok": False, "error": "request line too long"}
+        # Połączenie zamknięte, serwer działa dalej
+        assert replies.readline() == b""
+    assert send_command(path, "status")["ok"]
+
+
+def test_quit_and_stale_socket(headless_app):
+    app, path, _ = headless_app
+    assert send_command(path, "quit") == {"ok": True, "state": "IDLE"}
+    assert app.gui._close_requested.wait(timeout=5)
+
+    # Drugi serwer na tym samym gnieździe jest odrzucany, pozostałość po awarii usuwana
+    with pytest.raises(OSError):
+        app.start_control(path)
+    app.control.close()
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    app.start_control(path)
+    assert send_command(path, "status")["ok"]
@@ -0,0 +1,111 @@
+import threading
+
+from handsfree import codec, cues
+from handsfree.cues import CuePlayer
+from handsfree.recorder import Recorder
+
+
+class _FakeStream:
+    def __init__(self, audio):
+        self.audio = audio
+
+    def write(self, data):
+        self.audio.written.append(bytes(data))
+        self.audio.done.set()
+
+    def get_output_latency(self):
+        return 0.02
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.audio.closed += 1
+
+
+class _FakeAudio:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.opened = []
+        self.written = []
+        self.closed = 0
+        self.done = threading.Event()
+
+    def get_format_from_width(self, width):
+        return width
+
+    def open(self, **kwargs):
+        if self.fail:
+            raise OSError("no output device")
+        self.opened.append(kwargs)
+        return _FakeStream(self)
+
+
+def _wav(tmp_path, name, seconds=0.25, rate=8000):
+    pcm = b"\x01\x00" * int(seconds * rate)
+    path = tmp_path / name
+    path.write_bytes(codec.wav_header(len(pcm), 1, 2, rate) + pcm)
+    return str(path), pcm
+
+
+def _wait_for_writes(audio, count):
+    for _ in range(100):
+        if len(audio.written) >= count:
+            return
+        audio.done.wait(0.05)
+        audio.done.clear()
+
+
+def test_cues_play_from_memory_through_one_stream(tmp_path):
+    start_path, start_pcm = _wav(tmp_path, "start.wav")
+    stop_path, stop_pcm = _wav(tmp_path, "stop.wav", seconds=0.1)
+    audio = _FakeAudio()
+    player = CuePlayer(lambda: audio)
+    player.load("start", start_path)
+    player.load("stop", stop_path)
+    player.warm_up()
+
+    (tmp_path / "start.wav").unlink()  # odtwarzanie nie czyta już pliku
+    player.play("start")
+    player.play("stop")
+    _wait_for_writes(audio, 2)
+    player.close()
+
+    assert audio.written == [start_pcm, stop_pcm]
+    assert len(audio.opened) == 1
+    assert audio.opened[0]["rate"] == 8000 and audio.opened[0]["output"]
+    assert player.latencies["start"] >= 0.0
+    assert 0.27 <= player.duration("start") < 1.0  # 0.25 s + opóźnienie urządzenia
+
+
+def test_falls_back_to_playsound_without_output_device(tmp_path, monkeypatch):
+    path, _ = _wav(tmp_path, "start.wav")
+    played = []
+    monkeypatch.setattr(cues.utils, "play_sound", played.append)
+    player = CuePlayer(lambda: _FakeAudio(fail=True))
+    player.load("start", path)
+    player.warm_up()
+    player.play("start")
+    player.close()
+    assert played == [path]
+
+
+def test_empty_path_disables_cue():
+    player = CuePlayer(lambda: _FakeAudio())
+    player.load("start", "")
+    player.play("start")
+    assert player.duration("start") == 0.0
+    assert player._thread is None
+
+
+def test_recorder_mutes_start_of_recording():
+    recorder = Recorder()
+    recorder._buffer = codec.WavBuffer()
+    recorder._mute_bytes = recorder._bytes_for(0.1)  # 1600 próbek
+    chunk = b"\x10\x00" * recorder.chunk
+    for _ in range(3):
+        recorder._handle_chunk(chunk)
+
+    pcm = bytes(recorder._buffer.pcm(0, len(recorder._buffer)))
+    assert pcm[:3200] == bytes(3200)
+    assert pcm[3200:] == b"\x10\x00" * (3 * recorder.chunk - 1600)
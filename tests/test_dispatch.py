@@ -0,0 +1,52 @@
+import threading
+import time
+
+from handsfree.dispatch import KeyEventDispatcher
+
+
+def test_listener_only_queues_slow_callbacks():
+    dispatcher = KeyEventDispatcher()
+    calls = []
+    stop_running, release_stop, done = threading.Event(), threading.Event(), threading.Event()
+
+    def slow_stop():
+        stop_running.set()
+        release_stop.wait(timeout=5)  # np. zatrzymanie nagrywania
+        calls.append(("stop", threading.current_thread().name))
+
+    def cancel():
+        calls.append(("cancel", threading.current_thread().name))
+        done.set()
+
+    on_press = dispatcher.timed(lambda key: dispatcher.post(slow_stop, "toggle")())
+    on_press("ctrl_r")
+    # Hook wrócił, choć wolny stop wciąż trwa w wątku dyspozytora
+    assert stop_running.wait(timeout=5)
+    dispatcher.post(cancel, "cancel")()
+    cancel_posted = time.perf_counter()
+    assert calls == []
+
+    released = time.perf_counter()
+    release_stop.set()
+    assert done.wait(timeout=5)
+    assert calls == [("stop", "handsfree-keys"), ("cancel", "handsfree-keys")]
+
+    stats = dispatcher.stats()
+    assert stats["hook"]["count"] == 1
+    assert stats["dispatch"]["count"] == 2
+    # cancel czekał w kolejce co najmniej do zwolnienia stopu
+    assert stats["dispatch"]["max"] >= released - cancel_posted
+    dispatcher.close()
+
+
+def test_failing_callback_does_not_stop_dispatching():
+    dispatcher = KeyEventDispatcher()
+    done = threading.Event()
+
+    def broken():
+        raise RuntimeError("boom")
+
+    dispatcher.post(broken, "toggle")()
+    dispatcher.post(done.set, "retype")()
+    assert done.wait(timeout=5)
+    dispatcher.close()
@@ -0,0 +1,80 @@
+import concurrent.futures
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from handsfree.eventloop import EventLoop
+from handsfree.transcriber import TranscriptionError, transcribe_cli_async
+
+
+@pytest.fixture
+def loop():
+    loop = EventLoop()
+    yield loop
+    loop.close()
+
+
+def _slow_cli(tmp_path, seconds):
+    script = tmp_path / "slow_whisper.py"
+    script.write_text(
+        "import os, sys, time\n"
+        f"open({str(tmp_path / 'pid')!r}, 'w').write(str(os.getpid()))\n"
+        f"time.sleep({seconds})\n"
+        "print('Ala ma kota')\n"
+    )
+    return f"{sys.executable} {script}"
+
+
+def _wait_for_pid(tmp_path):
+    for _ in range(100):
+        if (tmp_path / "pid").exists() and (tmp_path / "pid").read_text():
+            return int((tmp_path / "pid").read_text())
+        time.sleep(0.05)
+    raise AssertionError("CLI did not start")
+
+
+def test_calls_run_on_the_loop_thread_in_order(loop):
+    seen = []
+
+    def step(n):
+        seen.append((n, threading.current_thread().name))
+        return n
+
+    async def async_step(n):
+        return step(n)
+
+    futures = [loop.call(step, 1), loop.call(async_step, 2), loop.call(step, 3)]
+    assert [f.result(timeout=2) for f in futures] == [1, 2, 3]
+    assert seen == [(1, "handsfree-loop"), (2, "handsfree-loop"), (3, "handsfree-loop")]
+    # Wywołanie z wątku pętli nie czeka na samego siebie
+    assert loop.call(lambda: loop.call_sync(step, 4)).result(timeout=2) == 4
+
+
+def test_cli_transcription(loop, tmp_path):
+    future = loop.submit(transcribe_cli_async(b"RIFF", cli_command=_slow_cli(tmp_path, 0)))
+    assert future.result(timeout=10) == "Ala ma kota"
+
+
+def test_cancel_kills_cli_process(loop, tmp_path):
+    future = loop.submit(transcribe_cli_async(b"RIFF", cli_command=_slow_cli(tmp_path, 30)))
+    pid = _wait_for_pid(tmp_path)
+    future.cancel()
+    with pytest.raises(concurrent.futures.CancelledError):
+        future.result(timeout=5)
+    for _ in range(50):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("CLI process still running after cancel")
+
+
+def test_cli_timeout(loop, tmp_path):
+    future = loop.submit(transcribe_cli_async(b"RIFF", cli_command=_slow_cli(tmp_path, 30), timeout=0.5))
+    with pytest.raises(TranscriptionError, match="did not finish"):
+        future.result(timeout=10)
@@ -0,0 +1,163 @@
+import subprocess
+
+import pytest
+
+from handsfree import injection
+from handsfree.injection import TextInjector
+
+
+def _linux_with(monkeypatch, tools, run):
+    """
+    Udaje Linuksa z podanymi narzędziami; subprocess.run zastępuje `run`.
+    """
+    monkeypatch.setattr(injection, "IS_LINUX", True)
+    monkeypatch.setattr(injection, "_load_evdev", lambda: None)
+    monkeypatch.delenv("WAYLAND_DISPLAY", raising=False)
+    monkeypatch.setattr(injection.shutil, "which", lambda name: name if name in tools else None)
+    monkeypatch.setattr(injection.subprocess, "run", run)
+
+
+def test_short_text_typed_with_fast_xdotool(monkeypatch):
+    recorded = []
+    _linux_with(
+        monkeypatch, ("xdotool",),
+        lambda cmd, input=None, **kw: recorded.append((cmd, input)) or subprocess.CompletedProcess(cmd, 0),
+    )
+    injector = TextInjector(paste_threshold=200, key_delay_ms=1)
+    injector.type_text("Zażółć gęślą jaźń")
+
+    cmd, data = recorded[0]
+    assert cmd == ["xdotool", "type", "--clearmodifiers", "--delay", "1", "--file", "-"]
+    assert data == "Zażółć gęślą jaźń".encode("utf-8")
+    assert injector.last_stats["method"] == "xdotool"
+
+
+def _xclip_run(recorded, clipboard):
+    """
+    subprocess.run z udawanym schowkiem xclip.
+    """
+    def run(cmd, input=None, **kwargs):
+        recorded.append((cmd, input))
+        stdout = b""
+        if cmd[0] == "xclip":
+            if cmd[-1] == "-o":
+                stdout = clipboard["content"]
+            else:
+                clipboard["content"] = input
+        return subprocess.CompletedProcess(cmd, 0, stdout=stdout)
+    return run
+
+
+def test_auto_types_long_text_with_xdotool(monkeypatch):
+    recorded = []
+    _linux_with(monkeypatch, ("xdotool", "xclip"), _xclip_run(recorded, {"content": b""}))
+    injector = TextInjector(paste_threshold=200)
+    injector.type_text("Ala ma kota. " * 100)
+
+    # Schowek tylko na życzenie: ctrl+v nie działa w większości terminali
+    assert [cmd[:2] for cmd, _ in recorded] == [["xdotool", "type"]]
+    assert injector.last_stats["method"] == "xdotool"
+
+
+def test_auto_uses_uinput_only_without_xdotool(monkeypatch):
+    _linux_with(monkeypatch, (), lambda cmd, **kw: pytest.fail(f"unexpected {cmd}"))
+    injector = TextInjector()
+    typed = []
+    uinput = injector.backends["uinput"]
+    monkeypatch.setattr(uinput, "available", lambda: True)
+    monkeypatch.setattr(uinput, "type_text", typed.append)
+    injector.type_text("hello")
+
+    assert typed == ["hello"]
+    assert injector.last_stats["method"] == "uinput"
+
+
+def test_long_text_pasted_and_clipboard_restored(monkeypatch):
+    recorded = []
+    clipboard = {"content": b"stary schowek"}
+    _linux_with(monkeypatch, ("xdotool", "xclip"), _xclip_run(recorded, clipboard))
+    text = "Ala ma kota. " * 100
+    injector = TextInjector(method="clipboard", paste_threshold=200, clipboard_restore_delay=0)
+    injector.type_text(text)
+
+    commands = [cmd for cmd, _ in recorded]
+    assert commands[2] == ["xdotool", "key", "--clearmodifiers", "ctrl+v"]
+    assert recorded[1][1] == text.encode("utf-8")  # wklejony tekst
+    assert clipboard["content"] == b"stary schowek"  # przywrócony schowek
+    assert injector.last_stats["method"] == "clipboard"
+    assert injector.last_stats["chars"] == len(text)
+
+    # Krótki tekst jest wpisywany, schowek nietknięty
+    recorded.clear()
+    injector.type_text("krótki")
+    assert [cmd[:2] for cmd, _ in recorded] == [["xdotool", "type"]]
+
+
+def test_empty_clipboard_cleared_after_paste(monkeypatch):
+    recorded = []
+    clipboard = {"content": b""}
+    _linux_with(monkeypatch, ("xdotool", "xclip"), _xclip_run(recorded, clipboard))
+    injector = TextInjector(method="clipboard", paste_threshold=0, clipboard_restore_delay=0)
+    injector.type_text("tajny dyktowany tekst")
+
+    assert recorded[1][1] == "tajny dyktowany tekst".encode("utf-8")
+    assert clipboard["content"] == b""
+
+
+def _failing_run(recorded, failing):
+    """
+    subprocess.run, w którym polecenia zaczynające się od `failing` kończą się błędem.
+    """
+    def run(cmd, input=None, **kwargs):
+        recorded.append(cmd)
+        if cmd[:len(failing)] == failing:
+            raise subprocess.CalledProcessError(1, cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout=b"")
+    return run
+
+
+def test_failed_copy_falls_back_to_typing(monkeypatch):
+    recorded = []
+    _linux_with(monkeypatch, ("xdotool", "xsel"), _failing_run(recorded, ["xsel", "--clipboard", "--input"]))
+    injector = TextInjector(method="clipboard", paste_threshold=0)
+    injector.type_text("tekst")
+
+    # Nic nie zostało wklejone, więc tekst jest wpisywany
+    assert recorded[-1][:2] == ["xdotool", "type"]
+    assert injector.last_stats["method"] == "xdotool"
+
+
+def test_failed_paste_is_not_typed_again(monkeypatch):
+    recorded = []
+    _linux_with(monkeypatch, ("xdotool", "xsel"), _failing_run(recorded, ["xdotool", "key"]))
+    injector = TextInjector(method="clipboard", paste_threshold=0)
+    injector.type_text("tekst")
+
+    # Skrót mógł dotrzeć do aplikacji: bez ponownego wpisywania
+    assert not any(cmd[:2] == ["xdotool", "type"] for cmd in recorded)
+    assert injector.last_stats is None
+
+
+def test_xdotool_failing_mid_text_types_once(monkeypatch):
+    recorded = []
+    _linux_with(monkeypatch, ("xdotool",), _failing_run(recorded, ["xdotool", "type"]))
+    injector = TextInjector()
+    typed = []
+    uinput = injector.backends["uinput"]
+    monkeypatch.setattr(uinput, "available", lambda: True)
+    monkeypatch.setattr(uinput, "type_text", typed.append)
+    injector.type_text("hello world")
+
+    assert [cmd[:2] for cmd in recorded] == [["xdotool", "type"]]
+    assert typed == []
+
+
+def test_uinput_only_handles_us_layout():
+    typer = injection.UinputTyper()
+    assert typer.can_type("Hello, world! (1+1=2)\n")
+    assert not typer.can_type("Zażółć")
+
+
+def test_unknown_method_rejected():
+    with pytest.raises(ValueError):
+        TextInjector(method="telepathy")
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from handsfree.codec import parse_wav, wav_header
+from handsfree.jobs import COALESCE_GAP_SECONDS, JobQueue
+
+
+def _wav(seconds, rate=16000):
+    pcm = bytes(int(rate * seconds) * 2)
+    return wav_header(len(pcm), 1, 2, rate) + pcm
+
+
+class _Recorder:
+    def __init__(self, expected):
+        self.delivered = []
+        self.done = threading.Event()
+        self.idle_calls = 0
+        self._expected = expected
+
+    def deliver(self, job, text):
+        self.delivered.append(text)
+        if len(self.delivered) == self._expected:
+            self.done.set()
+
+    def on_idle(self):
+        self.idle_calls += 1
+
+
+def test_results_delivered_in_submission_order():
+    delays = {0: 0.3, 1: 0.0, 2: 0.1}
+    out = _Recorder(expected=3)
+
+    def process(job):
+        time.sleep(delays[job.seq])
+        return f"tekst {job.seq}"
+
+    queue = JobQueue(process, out.deliver, workers=3, on_idle=out.on_idle)
+    for _ in range(3):
+        queue.submit(_wav(0.1))
+    assert out.done.wait(timeout=5)
+    time.sleep(0.05)
+    queue.close()
+
+    assert out.delivered == ["tekst 0", "tekst 1", "tekst 2"]
+    assert out.idle_calls == 1
+    assert not queue.busy()
+
+
+def test_cancel_drops_undelivered_jobs():
+    release = threading.Event()
+    out = _Recorder(expected=1)
+    idle = threading.Event()
+
+    def process(job):
+        release.wait(timeout=5)
+        return f"tekst {job.seq}"
+
+    queue = JobQueue(process, out.deliver, workers=1, on_idle=idle.set)
+    queue.submit(_wav(0.1))
+    queue.submit(_wav(0.1))
+    assert queue.cancel_all() == 2
+    release.set()
+    assert idle.wait(timeout=5)
+
+    # Po anulowaniu kolejka działa dalej
+    queue.submit(_wav(0.1))
+    assert out.done.wait(timeout=5)
+    queue.close()
+    assert out.delivered == ["tekst 2"]
+
+
+def test_queued_clips_are_coalesced():
+    release = threading.Event()
+    seen = []
+    out = _Recorder(expected=3)
+
+    def process(job):
+        release.wait(timeout=5)
+        seen.append((job.seq, job.clips, len(parse_wav(job.audio_data)[3])))
+        return "ok"
+
+    queue = JobQueue(process, out.deliver, workers=1, coalesce=True, coalesce_max_seconds=2.0)
+    first = queue.submit(_wav(1.0))   # zajmuje jedynego workera
+    time.sleep(0.05)
+    second = queue.submit(_wav(0.5))  # czeka w kolejce
+    third = queue.submit(_wav(0.5))   # dołączony do drugiego
+    fourth = queue.submit(_wav(1.0))  # przekroczyłby limit długości
+    release.set()
+    assert out.done.wait(timeout=5)
+    queue.close()
+
+    assert first is not second and second is third and fourth is not third
+    gap = int(COALESCE_GAP_SECONDS * 16000) * 2
+    assert (second.seq, 2, 2 * 16000 + gap) in seen
@@ -0,0 +1,50 @@
+import json
+
+from handsfree.metrics import LatencyMetrics
+
+
+def _dictation(metrics, transcribe, audio_seconds=2.0):
+    trace = metrics.start_dictation()
+    trace.add("transcribe", transcribe)
+    trace.add("type", 0.01)
+    trace.audio_seconds = audio_seconds
+    metrics.record(trace)
+    return trace
+
+
+def test_percentiles_and_realtime_factor(tmp_path):
+    path = tmp_path / "stats.json"
+    metrics = LatencyMetrics(str(path), window=100)
+    traces = [_dictation(metrics, t / 100) for t in range(1, 101)]
+
+    assert [t.id for t in traces[:3]] == [1, 2, 3]
+    stats = json.loads(path.read_text())
+    assert stats["transcribe"]["count"] == 100
+    assert stats["transcribe"]["p50"] == 0.5
+    assert stats["transcribe"]["p95"] == 0.95
+    assert stats["transcribe"]["p99"] == 0.99
+    assert stats["realtime_factor"]["p50"] == 0.25
+    assert stats["total"]["count"] == 100
+
+
+def test_window_limits_percentiles_but_not_counts(tmp_path):
+    metrics = LatencyMetrics(window=2)
+    for t in (10.0, 0.1, 0.1):
+        _dictation(metrics, t)
+    stats = metrics.snapshot()["transcribe"]
+    assert stats["p99"] == 0.1  # wolny pomiar wypadł z okna
+    assert stats["count"] == 3
+    assert stats["sum"] == 10.2
+
+
+def test_prometheus_textfile(tmp_path):
+    path = tmp_path / "handsfree.prom"
+    metrics = LatencyMetrics(str(path), fmt="prometheus")
+    _dictation(metrics, 1.0)
+
+    text = path.read_text()
+    assert "# TYPE handsfree_stage_seconds summary" in text
+    assert 'handsfree_stage_seconds{stage="transcribe",quantile="0.95"} 1.000000' in text
+    assert 'handsfree_stage_seconds_count{stage="type"} 1' in text
+    assert 'handsfree_realtime_factor{quantile="0.5"} 0.500000' in text
+    assert metrics.status_line().startswith("last ")
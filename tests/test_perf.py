@@ -0,0 +1,239 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from handsfree.app import HandsfreeApp
+from handsfree.codec import parse_wav, wav_header
+from handsfree.config import load_config
+from handsfree.recorder import Recorder
+from handsfree.transcriber import close_transports
+
+# Pełny przepływ skrót -> Recorder -> transkrypcja -> wpisanie tekstu
+pytestmark = pytest.mark.perf
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "perf_baseline.json")
+
+# Granice regresji: czasy mogą wzrosnąć o 50% + 50 ms, pamięć o 10% + 2 MB
+TIME_FACTOR, TIME_SLACK_MS = 1.5, 50.0
+MEMORY_FACTOR, MEMORY_SLACK_MB = 1.1, 2.0
+
+# Nagranie odtwarzane 50x szybciej niż w czasie rzeczywistym
+REPLAY_SPEEDUP = 50
+STUB_DELAY = 0.05
+
+SCENARIOS = [
+    ("api", 2), ("api", 10), ("api", 60),
+    ("cli", 2), ("cli", 10),
+]
+
+
+def _speech_wav(path, seconds, rate=16000):
+    """
+    Fikstura: "mowa" (ton z obwiednią) przeplatana pauzami.
+    """
+    t = np.arange(int(seconds * rate)) / rate
+    envelope = (np.sin(2 * np.pi * 0.5 * t) > -0.3).astype(np.float64)
+    samples = (8000 * envelope * np.sin(2 * np.pi * 220 * t)).astype("<i2")
+    pcm = samples.tobytes()
+    path.write_bytes(wav_header(len(pcm), 1, 2, rate) + pcm)
+    return str(path)
+
+
+class _ReplayStream:
+    def __init__(self, audio, chunk_bytes, chunk_seconds):
+        self._audio = audio
+        self._chunk_bytes = chunk_bytes
+        self._delay = chunk_seconds / REPLAY_SPEEDUP
+        self._pos = 0
+
+    def read(self, n, exception_on_overflow=True):
+        time.sleep(self._delay)
+        data = bytes(self._audio.pcm[self._pos:self._pos + self._chunk_bytes])
+        self._pos += len(data)
+        if len(data) < self._chunk_bytes:
+            # Koniec fikstury: dalej cisza
+            self._audio.exhausted.set()
+            data += bytes(self._chunk_bytes - len(data))
+        return data
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _ReplayAudio:
+    """
+    Zamiennik pyaudio.PyAudio odtwarzający plik WAV zamiast mikrofonu.
+    """
+
+    def __init__(self, wav_path):
+        with open(wav_path, "rb") as f:
+            _, _, _, self.pcm = parse_wav(f.read())
+        self.exhausted = threading.Event()
+
+    def open(self, rate, frames_per_buffer, **kwargs):
+        return _ReplayStream(self, frames_per_buffer * 2, frames_per_buffer / rate)
+
+    def get_sample_size(self, fmt):
+        return 2
+
+    def terminate(self):
+        pass
+
+
+class _FakeGUI:
+    def __init__(self):
+        self.statuses = []
+        self.idle = threading.Event()
+
+    def set_status(self, status):
+        self.statuses.append(status)
+        if status == "IDLE":
+            self.idle.set()
+        else:
+            self.idle.clear()
+
+
+def _config(mode, url, cli_command):
+    config = load_config()
+    config.update(
+        WHISPER_MODE=mode,
+        WHISPER_URL=url,
+        API_KEY="",
+        WHISPER_CLI_COMMAND=cli_command,
+        WHISPER_CLI_ARGS="",
+        MAX_RECORD_SECONDS=600,
+        SAVE_RECORDINGS=False,
+        UPLOAD_FORMAT="wav",
+        CAPTURE_MODE="blocking",
+        MIC_ALWAYS_OPEN=False,
+        STREAMING_TRANSCRIPTION=False,
+        VAD_TRIM=False,
+        CACHE_ENABLED=False,
+        WHISPER_PREWARM=True,
+        WHISPER_KEEPALIVE_SECONDS=0,
+        TYPE_START_DELAY=0,
+        SOUND_START="",
+        SOUND_STOP="",
+    )
+    return config
+
+
+def _measure(mode, seconds, tmp_path, stub_server):
+    fixture = _speech_wav(tmp_path / f"speech_{seconds}s.wav", seconds)
+    script = tmp_path / "fake_whisper_cli.py"
+    script.write_text(
+        "import sys, time\n"
+        f"time.sleep({STUB_DELAY})\n"
+        "print('  Ala ma kota')\n"
+    )
+    stub_server.text = "Ala ma kota"
+    stub_server.delay = STUB_DELAY
+
+    audio = _ReplayAudio(fixture)
+    typed = []
+    done = threading.Event()
+
+    def type_text(text):
+        typed.append((time.perf_counter(), text))
+        done.set()
+
+    app = HandsfreeApp(
+        _config(mode, stub_server.url, f"{sys.executable} {script}"),
+        recorder=Recorder(max_seconds=600, audio_interface=audio),
+        gui=_FakeGUI(),
+        type_text=type_text,
+    )
+    transcribe_times = []
+    transcribe = app.transcribe
+
+    def timed_transcribe(audio_data, **kwargs):
+        start = time.perf_counter()
+        try:
+            return transcribe(audio_data, **kwargs)
+        finally:
+            transcribe_times.append(time.perf_counter() - start)
+
+    app.transcribe = timed_transcribe
+
+    tracemalloc.start()
+    try:
+        t0 = time.perf_counter()
+        app.on_hotkey_triggered().result(timeout=5)
+        t1 = time.perf_counter()
+        assert audio.exhausted.wait(timeout=seconds)
+        t2 = time.perf_counter()
+        app.on_hotkey_triggered().result(timeout=5)
+        t3 = time.perf_counter()
+        assert done.wait(timeout=30)
+        assert app.gui.idle.wait(timeout=5)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        app.shutdown()
+        close_transports()
+
+    assert typed[0][1] == "Ala ma kota"
+    if mode == "api":
+        _, body = stub_server.bodies[-1]
+        assert len(body) > seconds * 16000 * 2
+
+    return {
+        "start_ms": (t1 - t0) * 1000,
+        "stop_ms": (t3 - t2) * 1000,
+        "transcribe_ms": transcribe_times[0] * 1000,
+        "type_after_stop_ms": (typed[0][0] - t2) * 1000,
+        "peak_mb": peak / (1024 * 1024),
+    }
+
+
+def _regressions(name, measured, baseline):
+    problems = []
+    for metric, value in measured.items():
+        if metric not in baseline:
+            continue
+        if metric.endswith("_mb"):
+            limit = baseline[metric] * MEMORY_FACTOR + MEMORY_SLACK_MB
+        else:
+            limit = baseline[metric] * TIME_FACTOR + TIME_SLACK_MS
+        if value > limit:
+            problems.append(f"{name} {metric}: {value:.1f} > {limit:.1f} (baseline {baseline[metric]:.1f})")
+    return problems
+
+
+@pytest.fixture(scope="module")
+def perf_results(request):
+    results = {}
+    yield results
+    if request.config.getoption("--update-perf-baseline") and results:
+        rounded = {
+            name: {metric: round(value, 2) for metric, value in metrics.items()}
+            for name, metrics in sorted(results.items())
+        }
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(rounded, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+@pytest.mark.parametrize("mode,seconds", SCENARIOS)
+def test_end_to_end_latency_and_memory(mode, seconds, tmp_path, stub_server, perf_results, request):
+    name = f"{mode}_{seconds}s"
+    measured = _measure(mode, seconds, tmp_path, stub_server)
+    perf_results[name] = measured
+
+    if request.config.getoption("--update-perf-baseline"):
+        return
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        baseline = json.load(f).get(name)
+    if baseline is None:
+        pytest.skip(f"No baseline for {name} (run with --update-perf-baseline)")
+    problems = _regressions(name, measured, baseline)
+    assert not problems, "\n".join(problems)
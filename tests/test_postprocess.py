@@ -0,0 +1,72 @@
+import os
+import random
+import string
+import time
+
+import pytest
+
+from handsfree.postprocess import PostProcessor, RuleError, RuleSet, parse_rules
+
+RULES = """
+# Nazwy produktów
+chat gpt => ChatGPT
+zolw => żółw
+# Interpunkcja mówiona
+przecinek => ,
+kropka => .
+yyy =>
+re:(\\d+) procent => \\1%
+"""
+
+
+def test_literal_and_regex_rules():
+    rules = parse_rules(RULES.splitlines())
+    assert len(rules) == 6
+    text = "Zolw przecinek Chat\tGPT yyy i 50 procent kropka"
+    assert rules.apply(text) == "Żółw, ChatGPT i 50%."
+    # Tylko całe słowa
+    assert rules.apply("zolwik kropkach") == "zolwik kropkach"
+
+
+def test_longest_phrase_wins():
+    rules = RuleSet([("new", "NEW"), ("new york", "Nowy Jork"), ("new york city", "NYC")])
+    assert rules.apply("new york city, new york and new") == "NYC, Nowy Jork and NEW"
+
+
+def test_malformed_rules_name_the_line():
+    with pytest.raises(RuleError, match="<rules>:2"):
+        parse_rules(["a => b", "bez separatora"])
+    with pytest.raises(RuleError, match="invalid regex"):
+        parse_rules(["re:( => x"])
+
+
+def test_processor_reloads_changed_file(tmp_path):
+    path = tmp_path / "rules.txt"
+    path.write_text("kot => pies\n", encoding="utf-8")
+    processor = PostProcessor(str(path), collapse_whitespace=True, check_interval=0)
+    assert processor.process("  Ala ma\n kota i kot ") == "Ala ma kota i pies"
+
+    path.write_text("kot => chomik\n", encoding="utf-8")
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert processor.process("kot") == "chomik"
+
+    # Zepsuty plik: zostają poprzednie reguły
+    path.write_text("kot chomik\n", encoding="utf-8")
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 2 * 10**9))
+    assert processor.process("kot") == "chomik"
+
+
+def test_thousands_of_rules_in_one_pass():
+    rng = random.Random(0)
+    letters = string.ascii_lowercase + "ąęółżźćń"
+    words = ["".join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(5000)]
+    literals = [(w if i % 5 else f"{w} {words[i - 1]}", w.upper()) for i, w in enumerate(words)]
+    rules = RuleSet(literals)
+    assert len(rules) == len(set(p for p, _ in literals))
+
+    # Typowa dyktowana wypowiedź: kilka słów do poprawienia wśród zwykłych
+    single = [w for i, w in enumerate(words[:60]) if i % 5]
+    text = " ".join(single[:20] + ["ala", "ma", "kota"] + single[20:] + [f"{words[10]} {words[9]}"])
+    corrected = [w.upper() for w in single]
+    expected = " ".join(corrected[:20] + ["ala", "ma", "kota"] + corrected[20:] + [words[10].upper()])
+    assert rules.apply(text) == expected
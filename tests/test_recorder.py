@@ -0,0 +1,260 @@
+import logging
+import time
+
+import pytest
+
+from handsfree.codec import parse_wav
+from handsfree import recorder as recorder_module
+from handsfree.recorder import PA_INPUT_OVERFLOW, PA_INPUT_UNDERFLOW, Recorder
+
+CHUNK_BYTES = 1024 * 2
+
+
+class _FakeStream:
+    """
+    Strumień wejściowy w trybie callback: test sam "dostarcza" bufory,
+    tak jak robiłby to wątek PortAudio.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.errors = []
+        self.closed = False
+
+    def push(self, data, status=0):
+        try:
+            self.callback(data, len(data) // 2, {}, status)
+        except Exception as e:
+            self.errors.append(e)
+
+    def read(self, n, exception_on_overflow=True):
+        # Tryb blokujący: cisza
+        time.sleep(0.001)
+        return bytes(n * 2)
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class _BrokenStream(_FakeStream):
+    """
+    Strumień blokujący po odłączeniu urządzenia: każdy odczyt kończy się błędem.
+    """
+
+    def __init__(self):
+        super().__init__(None)
+        self.reads = 0
+
+    def read(self, n, exception_on_overflow=True):
+        self.reads += 1
+        raise OSError(-9988, "Stream closed")
+
+
+class _FakeAudio:
+    """
+    Zamiennik pyaudio.PyAudio. `broken` - ile kolejnych strumieni zwrócić
+    zepsutych (tryb blokujący), `reopen_error` - błąd przy otwieraniu
+    każdego strumienia poza pierwszym.
+    """
+
+    def __init__(self, broken=0):
+        self.streams = []
+        self.terminated = False
+        self.broken = broken
+        self.reopen_error = None
+
+    def open(self, format, channels, rate, input, frames_per_buffer, stream_callback=None):
+        if self.reopen_error and self.streams:
+            raise self.reopen_error
+        if self.broken:
+            self.broken -= 1
+            stream = _BrokenStream()
+        else:
+            stream = _FakeStream(stream_callback)
+        self.streams.append(stream)
+        return stream
+
+    def get_sample_size(self, fmt):
+        return 2
+
+    def terminate(self):
+        self.terminated = True
+
+
+def _chunk(value):
+    return bytes([value]) * CHUNK_BYTES
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def _recorder(audio, **attrs):
+    recorder = Recorder(audio_interface=audio)
+    recorder.capture_mode = "callback"
+    for name, value in attrs.items():
+        setattr(recorder, name, value)
+    return recorder
+
+
+@pytest.mark.parametrize("streamed", [False, True])
+def test_callback_capture_with_chunk_listener(streamed):
+    audio = _FakeAudio()
+    recorder = _recorder(audio)
+    received = []
+    recorder.start_recording(on_audio=received.append if streamed else None)
+    stream = audio.streams[-1]
+    chunks = [_chunk(i) for i in range(1, 6)]
+    for data in chunks:
+        stream.push(data)
+    wav = recorder.stop_recording()
+
+    assert stream.callback is not None
+    assert stream.errors == []
+    assert stream.closed
+    assert bytes(parse_wav(wav)[3]) == b"".join(chunks)
+    # Przesyłanie strumieniowe dostaje te same dane co nagranie
+    assert received == (chunks if streamed else [])
+
+
+def test_callback_counts_input_overflows(caplog):
+    audio = _FakeAudio()
+    recorder = _recorder(audio)
+    caplog.set_level(logging.WARNING, logger="handsfree.recorder")
+
+    recorder.start_recording()
+    stream = audio.streams[-1]
+    stream.push(_chunk(1))
+    stream.push(_chunk(2), PA_INPUT_OVERFLOW)
+    stream.push(_chunk(3), PA_INPUT_OVERFLOW | PA_INPUT_UNDERFLOW)
+    stream.push(_chunk(4))
+    wav = recorder.stop_recording()
+
+    # Flagi nie gubią danych, które mimo to przyszły
+    assert bytes(parse_wav(wav)[3]) == b"".join(_chunk(i) for i in range(1, 5))
+    assert (recorder.input_overflows, recorder.input_underflows) == (2, 1)
+    assert "2 overflow(s), 1 underflow(s)" in caplog.text
+
+    # Liczniki są łączne, ostrzeżenie dotyczy tylko bieżącego nagrania
+    caplog.clear()
+    recorder.start_recording()
+    audio.streams[-1].push(_chunk(5))
+    recorder.stop_recording()
+    assert (recorder.input_overflows, recorder.input_underflows) == (2, 1)
+    assert "glitches" not in caplog.text
+
+
+def test_always_open_prepends_preroll_across_recordings():
+    audio = _FakeAudio()
+    # 200 ms pre-roll = 3 bufory po 1024 próbki przy 16 kHz
+    recorder = _recorder(audio, always_open=True, preroll_ms=200)
+    recorder.warm_up()
+    stream = audio.streams[0]
+    capture_thread = recorder._capture_thread
+
+    for i in range(1, 6):
+        stream.push(_chunk(i))
+    _wait_until(lambda: recorder._preroll and recorder._preroll[-1] == _chunk(5))
+    recorder.start_recording()
+    stream.push(_chunk(6))
+    _wait_until(lambda: recorder._frames_recorded == 4 * 1024)
+    wav = recorder.stop_recording()
+    assert bytes(parse_wav(wav)[3]) == b"".join(_chunk(i) for i in (3, 4, 5, 6))
+
+    # Drugie nagranie: ten sam strumień, pre-roll tylko sprzed tego nagrania
+    stream.push(_chunk(7))
+    _wait_until(lambda: recorder._preroll and recorder._preroll[-1] == _chunk(7))
+    recorder.start_recording()
+    stream.push(_chunk(8))
+    _wait_until(lambda: recorder._frames_recorded == 2 * 1024)
+    wav = recorder.stop_recording()
+    assert bytes(parse_wav(wav)[3]) == _chunk(7) + _chunk(8)
+    assert len(audio.streams) == 1 and not stream.closed
+
+    recorder.terminate()
+    assert not capture_thread.is_alive()
+    assert stream.closed and audio.terminated
+    assert stream.errors == []
+
+
+def test_always_open_auto_stop_keeps_recording_and_stream():
+    audio = _FakeAudio()
+    recorder = _recorder(audio, always_open=True, max_seconds=3 * 1024 / 16000)
+    recorder.start_recording()
+    stream = audio.streams[0]
+    for i in range(1, 4):
+        stream.push(_chunk(i))
+
+    # Limit osiągnięty w wątku przechwytywania: nagranie zatrzymane, strumień nie;
+    # nagranie czeka na stop_recording() użytkownika
+    _wait_until(lambda: not recorder._is_recording)
+    assert bytes(parse_wav(recorder.stop_recording())[3]) == b"".join(_chunk(i) for i in range(1, 4))
+    assert recorder.stop_recording() is None
+    assert not stream.closed
+    recorder.start_recording()
+    stream.push(_chunk(6))
+    _wait_until(lambda: recorder._frames_recorded == 1024)
+    assert bytes(parse_wav(recorder.stop_recording())[3]) == _chunk(6)
+    recorder.terminate()
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(recorder_module, "READ_RETRY_DELAY", 0.001)
+    monkeypatch.setattr(recorder_module, "READ_RETRY_MAX_DELAY", 0.002)
+
+
+def test_failing_input_is_reopened_with_backoff(fast_retries, caplog):
+    audio = _FakeAudio(broken=1)
+    recorder = _recorder(audio, always_open=True)
+    recorder.capture_mode = "blocking"
+    recorder.open_input()
+    broken = audio.streams[0]
+
+    # Po REOPEN_AFTER_FAILURES nieudanych odczytach strumień jest otwierany na nowo
+    _wait_until(lambda: len(audio.streams) == 2)
+    assert broken.reads == recorder_module.REOPEN_AFTER_FAILURES and broken.closed
+    assert caplog.text.count("Input stream read failed") == 1
+    recorder.terminate()
+    assert audio.streams[1].closed
+
+
+def test_capture_gives_up_when_input_cannot_be_reopened(fast_retries):
+    audio = _FakeAudio(broken=1)
+    audio.reopen_error = OSError(-9996, "Invalid input device")
+    recorder = _recorder(audio, always_open=True)
+    recorder.capture_mode = "blocking"
+    recorder.start_recording()
+
+    _wait_until(lambda: recorder._capture_thread is None)
+    assert not recorder._is_recording and audio.streams[0].closed
+
+    # Następne nagranie otwiera wejście od nowa
+    audio.reopen_error = None
+    recorder.capture_mode = "callback"
+    recorder.start_recording()
+    audio.streams[-1].push(_chunk(1))
+    _wait_until(lambda: recorder._frames_recorded == 1024)
+    assert bytes(parse_wav(recorder.stop_recording())[3]) == _chunk(1)
+    recorder.terminate()
+
+
+def test_auto_stop_without_always_open_keeps_recording():
+    audio = _FakeAudio()
+    recorder = _recorder(audio, max_seconds=2 * 1024 / 16000)
+    recorder.start_recording()
+    stream = audio.streams[0]
+    for i in range(1, 4):
+        stream.push(_chunk(i))
+
+    _wait_until(lambda: not recorder._is_recording)
+    wav = recorder.stop_recording()
+    # Limit to dwa bufory; trzeci mógł jeszcze wpaść przed zamknięciem strumienia
+    assert bytes(parse_wav(wav)[3])[:2 * CHUNK_BYTES] == _chunk(1) + _chunk(2)
+    assert stream.closed
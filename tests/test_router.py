@@ -0,0 +1,78 @@
+import threading
+import time
+
+from handsfree.codec import wav_header
+from handsfree.router import Backend, TranscriptionRouter, parse_endpoints
+from handsfree.transcriber import TranscriptionError
+
+RATE = 16000
+
+
+def _wav(seconds):
+    pcm = bytes(int(RATE * seconds) * 2)
+    return wav_header(len(pcm), 1, 2, RATE) + pcm
+
+
+def _backend(name, delay=0.0, fail=False, calls=None, block=None):
+    def transcribe(audio_data, upload=None):
+        if calls is not None:
+            calls.append(name)
+        if block is not None:
+            block.wait(timeout=5)
+        time.sleep(delay)
+        if fail:
+            raise TranscriptionError(f"{name} is down")
+        return name
+    return Backend(name, transcribe)
+
+
+def test_prefers_fastest_backend_after_measuring():
+    slow, fast = _backend("slow", delay=0.2), _backend("fast", delay=0.01)
+    router = TranscriptionRouter([slow, fast], hedge_min_seconds=5.0)
+    # Bez pomiarów decyduje kolejność z konfiguracji
+    assert router.transcribe(_wav(1.0)) == "slow"
+    fast.rtf = 0.01
+    assert router.transcribe(_wav(1.0)) == "fast"
+    assert slow.rtf > fast.rtf
+
+
+def test_hedges_when_primary_is_too_slow():
+    calls = []
+    # "busy" odpowiada dopiero po zwolnieniu, więc wynik może dać tylko zapasowy
+    release_busy = threading.Event()
+    router = TranscriptionRouter(
+        [_backend("busy", calls=calls, block=release_busy), _backend("spare", calls=calls)],
+        initial_rtf=0.05,
+        hedge_factor=1.0,
+        hedge_min_seconds=0.1,
+    )
+    try:
+        assert router.transcribe(_wav(2.0)) == "spare"
+    finally:
+        release_busy.set()
+    assert calls == ["busy", "spare"]
+    assert router.stats()["hedges"] == 1
+
+
+def test_fails_over_and_cools_down_broken_backend():
+    calls = []
+    broken = _backend("broken", fail=True, calls=calls)
+    router = TranscriptionRouter([broken, _backend("ok", calls=calls)], hedge_min_seconds=5.0)
+    assert router.transcribe(_wav(0.5)) == "ok"
+    assert router.transcribe(_wav(0.5)) == "ok"
+    assert calls == ["broken", "ok", "ok"]
+    assert not broken.is_healthy()
+
+
+def test_returns_empty_string_when_all_backends_fail():
+    router = TranscriptionRouter([_backend("a", fail=True), _backend("b", fail=True)])
+    assert router.transcribe(_wav(0.5)) == ""
+
+
+def test_parse_endpoints():
+    spec = "http://a/v1, http://b/v1|whisper-1|sk-b ,,http://c/v1||sk-c"
+    assert parse_endpoints(spec, "large", "key") == [
+        ("http://a/v1", "large", "key"),
+        ("http://b/v1", "whisper-1", "sk-b"),
+        ("http://c/v1", "large", "sk-c"),
+    ]
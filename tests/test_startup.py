@@ -0,0 +1,61 @@
+import io
+import sys
+
+from handsfree.startup import HotkeyGate, StartupProfile
+
+
+class _App:
+    def __init__(self):
+        self.calls = []
+        self.during_call = None
+
+    def on_hotkey_triggered(self):
+        self.calls.append("toggle")
+        if self.during_call:
+            during_call, self.during_call = self.during_call, None
+            during_call()
+
+    def on_cancel(self):
+        self.calls.append("cancel")
+
+
+def test_gate_replays_early_presses_in_order():
+    gate = HotkeyGate()
+    toggle, cancel = gate.bind("on_hotkey_triggered"), gate.bind("on_cancel")
+    toggle()
+    cancel()
+
+    app = _App()
+    gate.open(app)
+    assert app.calls == ["toggle", "cancel"]
+
+    # Po otwarciu wywołania trafiają od razu do aplikacji
+    toggle()
+    assert app.calls == ["toggle", "cancel", "toggle"]
+
+
+def test_press_during_replay_waits_for_older_presses():
+    gate = HotkeyGate()
+    toggle, cancel = gate.bind("on_hotkey_triggered"), gate.bind("on_cancel")
+    toggle()
+    cancel()
+
+    app = _App()
+    # Kolejne naciśnięcie przychodzi w trakcie odtwarzania pierwszego
+    app.during_call = toggle
+    gate.open(app)
+    assert app.calls == ["toggle", "cancel", "toggle"]
+
+
+def test_profile_reports_phases_and_imports():
+    profile = StartupProfile()
+    sys.modules.pop("colorsys", None)
+    with profile.phase("import colorsys"):
+        import colorsys  # noqa: F401
+    profile.mark("hotkey armed")
+
+    out = io.StringIO()
+    profile.report(out)
+    lines = out.getvalue().splitlines()
+    assert lines[1].endswith("import colorsys  [imports: colorsys]")
+    assert lines[2].endswith("hotkey armed")
@@ -0,0 +1,125 @@
+import re
+import time
+
+import numpy as np
+import pytest
+
+from handsfree.codec import parse_wav, wav_header
+from handsfree.streaming import DeltaCleaner, PauseSegmenter, SegmentPipeline, chunk_rms
+from handsfree.transcriber import (
+    TranscriptionError, clean_transcription, close_transports, finish_streamed_upload, open_streamed_upload,
+    stream_transcription,
+)
+
+RATE = 16000
+CHUNK = 1024
+
+
+def _chunk(amplitude):
+    return np.full(CHUNK, amplitude, dtype=np.int16).tobytes()
+
+
+def test_chunk_rms():
+    assert chunk_rms(b"") == 0.0
+    assert chunk_rms(_chunk(0)) == 0.0
+    assert chunk_rms(_chunk(1000)) == 1000.0
+
+
+def test_segmenter_cuts_after_pause_once_segment_is_long_enough():
+    segmenter = PauseSegmenter(RATE, CHUNK, silence_threshold=500, min_pause_ms=192, min_segment_seconds=0.64)
+    # 0.64 s = 10 chunków, 192 ms = 3 chunki ciszy
+    cuts = [segmenter.feed(_chunk(3000)) for _ in range(8)]
+    cuts += [segmenter.feed(_chunk(0)) for _ in range(3)]
+    assert cuts == [False] * 10 + [True]
+
+
+def test_segmenter_does_not_cut_short_pause_or_pure_silence():
+    segmenter = PauseSegmenter(RATE, CHUNK, silence_threshold=500, min_pause_ms=192, min_segment_seconds=0.0)
+    # Sama cisza - brak mowy, więc nie ma czego wysyłać
+    assert not any(segmenter.feed(_chunk(0)) for _ in range(20))
+    assert not segmenter.has_speech
+
+    segmenter.reset()
+    assert not segmenter.feed(_chunk(3000))
+    assert not segmenter.feed(_chunk(0))
+    assert not segmenter.feed(_chunk(3000))
+    assert segmenter.has_speech
+
+
+def test_pipeline_joins_results_in_order():
+    pipeline = SegmentPipeline(lambda data: data.decode())
+    for part in ("Ala", "", "ma", "kota"):
+        pipeline.submit(part.encode())
+    assert pipeline.finish() == "Ala ma kota"
+
+
+@pytest.mark.parametrize("text", [
+    "  - Ala  ma\n kota  ", "--Tekst", " - - Tekst", "-", " \n ", "Tekst z - w środku\n\n",
+])
+@pytest.mark.parametrize("collapse", [False, True])
+def test_delta_cleaner_matches_whole_text_cleaning(text, collapse):
+    expected = clean_transcription(text)
+    if collapse:
+        expected = re.sub(r"\s+", " ", expected)
+    # Każdy możliwy podział na dwa kawałki oraz znak po znaku
+    for split in range(len(text) + 1):
+        cleaner = DeltaCleaner(collapse_whitespace=collapse)
+        assert cleaner.feed(text[:split]) + cleaner.feed(text[split:]) == expected
+    cleaner = DeltaCleaner(collapse_whitespace=collapse)
+    assert "".join(cleaner.feed(c) for c in text) == expected
+
+
+def test_stream_transcription_yields_deltas_before_response_ends(stub_server):
+    stub_server.stream_deltas = [" - Ala", " ma", " kota."]
+    stub_server.stream_interval = 0.2
+    wav = wav_header(3200, 1, 2, 16000) + bytes(3200)
+    try:
+        start = time.monotonic()
+        stream = stream_transcription(wav, stub_server.url, "", model="m", language="pl")
+        first = next(stream)
+        first_at = time.monotonic() - start
+        rest = list(stream)
+    finally:
+        close_transports()
+
+    assert [first] + rest == [" - Ala", " ma", " kota."]
+    assert first_at < 0.2  # pierwszy kawałek przed końcem odpowiedzi
+
+
+def test_stream_transcription_accepts_plain_json(stub_server):
+    stub_server.text = "Ala ma kota"
+    wav = wav_header(3200, 1, 2, 16000) + bytes(3200)
+    try:
+        assert list(stream_transcription(wav, stub_server.url, "")) == ["Ala ma kota"]
+    finally:
+        close_transports()
+
+
+def test_streamed_upload_sends_open_ended_wav(stub_server):
+    stub_server.text = " - Ala ma kota"
+    pcm = np.arange(-8000, 8000, dtype="<i2").tobytes()
+    try:
+        upload = open_streamed_upload(stub_server.url, "", model="m", language="pl")
+        for pos in range(0, len(pcm), 2048):
+            upload.write(pcm[pos:pos + 2048])
+        assert finish_streamed_upload(upload) == "Ala ma kota"
+    finally:
+        close_transports()
+
+    _, body = stub_server.bodies[0]
+    wav = body[body.index(b"RIFF"):body.rindex(b"\r\n--")]
+    # Nagłówek bez długości, dane do końca części
+    assert wav[40:44] == b"\xff\xff\xff\xff"
+    channels, sample_width, rate, data = parse_wav(wav)
+    assert (channels, sample_width, rate) == (1, 2, 16000) and data == pcm
+
+
+def test_rejected_streamed_upload_raises(stub_server):
+    stub_server.reject_types = {"audio/wav"}
+    try:
+        upload = open_streamed_upload(stub_server.url, "", model="m")
+        upload.write(bytes(3200))
+        with pytest.raises(TranscriptionError):
+            finish_streamed_upload(upload)
+    finally:
+        close_transports()
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from handsfree.transport import HttpTransport, encode_multipart
+
+
+def test_encode_multipart_keeps_payload_object():
+    audio = bytearray(b"RIFF....")
+    parts, content_type = encode_multipart({"file": ("a.wav", audio, "audio/wav"), "model": "m"})
+    boundary = content_type.split("boundary=")[1]
+    assert any(part is audio for part in parts)
+    body = b"".join(bytes(part) for part in parts)
+    assert body.startswith(f"--{boundary}\r\n".encode())
+    assert body.endswith(f"--{boundary}--\r\n".encode())
+    assert b'name="model"\r\n\r\nm\r\n' in body
+
+
+def test_post_reuses_prewarmed_connection_and_reports_timings(stub_server):
+    transport = HttpTransport(stub_server.url, api_key="secret")
+    transport.prewarm().join()
+
+    audio = b"\x00\x01" * 5000
+    for _ in range(3):
+        resp = transport.post_multipart({"file": ("recording.wav", audio, "audio/wav"), "model": "m"})
+        assert resp.json() == {"text": "ok"}
+    transport.close()
+
+    assert stub_server.connections == 1
+    content_type, body = stub_server.bodies[0]
+    assert content_type.startswith("multipart/form-data; boundary=")
+    assert audio in body
+    timings = resp.timings
+    assert set(timings) == {"connect", "upload", "server", "total", "bytes"}
+    assert timings["bytes"] == len(body)
+    assert timings["total"] >= timings["upload"]
+
+
+def test_concurrent_posts_report_their_own_timings(stub_server):
+    stub_server.delay = 0.05
+    transport = HttpTransport(stub_server.url)
+    sizes = [1000, 50000, 200000]
+    timings = {}
+
+    def post(size):
+        resp = transport.post_multipart({"file": ("recording.wav", bytes(size), "audio/wav")})
+        timings[size] = resp.timings
+
+    # Wspólny transport, równoległe żądania (JOB_WORKERS, fragmenty, routing)
+    threads = [threading.Thread(target=post, args=(size,)) for size in sizes]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    transport.close()
+
+    assert len(stub_server.bodies) == 3
+    for size in sizes:
+        assert size < timings[size]["bytes"] < size + 500
+
+
+def test_streaming_upload_sends_audio_before_finish(stub_server):
+    transport = HttpTransport(stub_server.url)
+    upload = transport.start_upload({"model": "m"})
+    chunks = [bytes([i]) * 2048 for i in range(5)]
+    for chunk in chunks:
+        upload.write(chunk)
+    # Serwer czyta dźwięk jeszcze w trakcie nagrywania
+    deadline = time.monotonic() + 5
+    while stub_server.received < 5 * 2048 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert stub_server.received >= 5 * 2048
+    upload.write(b"koniec")
+    resp = upload.finish(timeout=5)
+    transport.close()
+
+    assert resp.json() == {"text": "ok"}
+    assert stub_server.chunked_requests == 1
+    content_type, body = stub_server.bodies[0]
+    boundary = content_type.split("boundary=")[1]
+    assert b'name="model"\r\n\r\nm\r\n' in body
+    assert b"".join(chunks) + b"koniec\r\n" + f"--{boundary}--\r\n".encode() in body
+    assert upload.timings["bytes"] == len(body)
+    assert upload.timings["total"] >= upload.timings["upload"]
+
+
+def test_aborted_streaming_upload_fails(stub_server):
+    transport = HttpTransport(stub_server.url)
+    upload = transport.start_upload({"model": "m"})
+    upload.write(b"\x00" * 1024)
+    upload.abort()
+    with pytest.raises(requests.exceptions.RequestException):
+        upload.finish(timeout=5)
+    transport.close()
@@ -0,0 +1,49 @@
+import io
+import wave
+
+import numpy as np
+
+from handsfree.vad import trim_silence
+
+RATE = 16000
+
+
+def _wav(*parts):
+    """
+    parts: (seconds, amplitude) - amplitude 0 means silence
+    """
+    samples = np.concatenate([
+        (np.sign(np.sin(np.arange(int(RATE * sec)) / 5.0)) * amp).astype(np.int16)
+        for sec, amp in parts
+    ])
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(RATE)
+        wf.writeframes(samples.tobytes())
+    return buf.getvalue()
+
+
+def _duration(wav_data):
+    with wave.open(io.BytesIO(wav_data), "rb") as wf:
+        return wf.getnframes() / wf.getframerate()
+
+
+def test_trims_leading_and_trailing_silence():
+    wav_data = _wav((2.0, 0), (1.0, 3000), (3.0, 0))
+    trimmed = trim_silence(wav_data, padding_ms=210)
+    # 1 s mowy + 2 x 210 ms marginesu (z dokładnością do ramki 30 ms)
+    assert abs(_duration(trimmed) - 1.42) < 0.07
+
+
+def test_keeps_internal_pauses_unless_asked():
+    wav_data = _wav((1.0, 3000), (2.0, 0), (1.0, 3000))
+    assert trim_silence(wav_data) is wav_data
+
+    shortened = trim_silence(wav_data, max_pause_ms=600)
+    assert abs(_duration(shortened) - 2.6) < 0.07
+
+
+def test_returns_none_without_speech():
+    assert trim_silence(_wav((2.0, 100))) is None
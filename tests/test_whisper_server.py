@@ -0,0 +1,60 @@
+import socket
+import sys
+import textwrap
+import time
+
+from handsfree.whisper_server import WhisperServer
+
+# Zastępczy whisper-server: odpowiada na /health i akceptuje --host/--port
+STUB_SERVER = textwrap.dedent("""
+    import argparse
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    args, _ = parser.parse_known_args()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    HTTPServer((args.host, args.port), Handler).serve_forever()
+""")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_server_is_started_restarted_after_crash_and_stopped(tmp_path):
+    script = tmp_path / "stub_server.py"
+    script.write_text(STUB_SERVER)
+    server = WhisperServer(
+        command=sys.executable,
+        args=str(script),
+        port=_free_port(),
+        health_interval=0.1,
+    )
+    server.start()
+    try:
+        assert server.wait_ready(timeout=10)
+        first = server._process
+        first.kill()
+
+        deadline = time.monotonic() + 10
+        while server._process is first or not server.wait_ready(timeout=0.1):
+            assert time.monotonic() < deadline
+        assert server.is_healthy()
+    finally:
+        server.stop()
+
+    assert server._process is None
+    assert not server.is_healthy()